@@ -12,7 +12,7 @@ import logging
 logger = logging.getLogger("screenshare.client.discovery")
 
 class DiscoveryScanner(QObject):
-    server_found = Signal(dict)  # Emits {name, ip, port, video_port}
+    server_found = Signal(dict)  # Emits {name, ip, port, video_port, multicast}
     scan_finished = Signal()
 
     def __init__(self, parent=None):
@@ -57,7 +57,8 @@ class DiscoveryScanner(QObject):
                                     'name': message.get('name', 'Unknown'),
                                     'ip': server_ip,
                                     'port': message.get('port', COMMAND_PORT),
-                                    'video_port': message.get('video_port', VIDEO_PORT)
+                                    'video_port': message.get('video_port', VIDEO_PORT),
+                                    'multicast': message.get('multicast'),  # {group, port, ttl} or None
                                 }
                                 self._found_servers[server_ip] = server_info
                                 self.server_found.emit(server_info)
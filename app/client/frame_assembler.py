@@ -0,0 +1,297 @@
+"""
+FrameAssembler: Reassembles fragmented video frames received over UDP.
+
+Parity datagrams (see app/common/fec.py) rebuild lost chunks as soon as
+enough of their group has arrived, without asking the server again.
+
+Chunks still missing once a newer message of the stream shows up (or after
+NACK_DELAY without news) are asked again with a NACK over the command
+channel. Until the repaired frame completes or its NACK_DEADLINE passes,
+the newer frames of the stream are held back so that frames are always
+delivered in order.
+"""
+import time
+from collections import deque
+from functools import cmp_to_key
+from ..common.fec import recover
+from ..common.protocol import ChunkHeader, is_parity, unpack_chunk, unpack_parity, seq_newer
+from ..config import MAX_DATAGRAM_SIZE, MAX_FRAME_BYTES, REASSEMBLY_TIMEOUT, NACK_DEADLINE, NACK_DELAY
+import logging
+
+logger = logging.getLogger("screenshare.client.frame_assembler")
+
+
+class _PendingFrame:
+    __slots__ = ('chunks', 'received', 'first_seen', 'last_seen', 'header', 'groups', 'length', 'recovered',
+                 'nacks', 'nacked_at')
+
+    def __init__(self, header, now):
+        self.chunks = [None] * header.count
+        self.received = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.header = header
+        self.groups = {}  # first chunk -> (method, chunk count, [parity or None])
+        self.length = None  # Message size, known from the parity datagrams
+        self.recovered = False
+        self.nacks = 0
+        self.nacked_at = None
+
+
+class FrameAssembler:
+    RESTART_WINDOW = 1024
+    # NACKs sent for one frame at most, and delay before asking again
+    NACK_RETRIES = 2
+    NACK_RETRY_INTERVAL = 0.05
+
+    def __init__(self, timeout=REASSEMBLY_TIMEOUT, max_pending=8, nack_deadline=NACK_DEADLINE, nack_delay=NACK_DELAY):
+        self.timeout = timeout
+        self.max_pending = max_pending
+        # 0 disables the NACKs (and the frames are never held back)
+        self.nack_deadline = nack_deadline
+        self.nack_delay = nack_delay
+        # Bound memory: a sender cannot make us buffer more than MAX_FRAME_BYTES per frame
+        self.max_chunks = max(1, MAX_FRAME_BYTES // max(1, MAX_DATAGRAM_SIZE))
+        self._pending = {}  # (stream_id, seq) -> _PendingFrame
+        self._last_delivered = {}  # stream_id -> seq
+        self._newest = {}  # stream_id -> newest seq seen
+        self._held = {}  # stream_id -> [(seq, header, payload, pending)] waiting for an older frame
+        self._ready = deque()  # (header, payload) in delivery order
+        self.frames_completed = 0
+        self.frames_incomplete = 0
+        self.frames_skipped = 0
+        self.chunks_received = 0
+        self.chunks_rejected = 0
+        self.parity_received = 0
+        self.chunks_recovered = 0
+        self.frames_recovered = 0
+        self.nacks_sent = 0
+        self.chunks_nacked = 0
+        self.frames_repaired = 0
+        self.frames_held = 0
+
+    def reset(self):
+        self._pending.clear()
+        self._last_delivered.clear()
+        self._newest.clear()
+        self._held.clear()
+        self._ready.clear()
+
+    def push(self, datagram, now=None):
+        """Adds a chunk; returns (ChunkHeader, payload) once a frame is ready, else None.
+
+        Several frames can become ready at once (a repaired frame releases the
+        frames held behind it): the others are returned by pop_ready().
+        """
+        now = time.monotonic() if now is None else now
+        parity = None
+        try:
+            if is_parity(datagram):
+                parity, data = unpack_parity(datagram)
+                header = ChunkHeader(parity.flags, parity.stream_id, parity.seq, 0, parity.count, parity.timestamp)
+            else:
+                header, data = unpack_chunk(datagram)
+        except ValueError as e:
+            self.chunks_rejected += 1
+            logger.debug(f"[ASSEMBLER] Rejected datagram: {e}")
+            return None
+        if header.count > self.max_chunks:
+            self.chunks_rejected += 1
+            return None
+        if parity is None:
+            self.chunks_received += 1
+        else:
+            self.parity_received += 1
+
+        last = self._last_delivered.get(header.stream_id)
+        if last is not None and not seq_newer(header.seq, last):
+            if ((last - header.seq) & 0xFFFFFFFF) < self.RESTART_WINDOW:
+                # Late chunk of a frame already delivered or superseded
+                return None
+            # Sequence jumped far backwards: the sender restarted its numbering
+            del self._last_delivered[header.stream_id]
+            self._newest.pop(header.stream_id, None)
+            self._held.pop(header.stream_id, None)
+        newest = self._newest.get(header.stream_id)
+        if newest is None or seq_newer(header.seq, newest):
+            self._newest[header.stream_id] = header.seq
+
+        key = (header.stream_id, header.seq)
+        pending = self._pending.get(key)
+        if pending is None:
+            if any(seq == header.seq for seq, *_ in self._held.get(header.stream_id, ())):
+                return None  # Late chunk of a frame already complete, held back
+            if len(self._pending) >= self.max_pending:
+                self._drop(min(self._pending, key=lambda k: self._pending[k].first_seen))
+            pending = _PendingFrame(header, now)
+            self._pending[key] = pending
+        elif pending.header.count != header.count:
+            return None
+        pending.last_seen = now
+        if parity is not None:
+            if not self._add_parity(pending, parity, data):
+                return None
+        else:
+            if pending.chunks[header.index] is not None:
+                return None
+            pending.chunks[header.index] = bytes(data)
+            pending.received += 1
+            if pending.received < header.count:
+                self._repair(pending, header.index)
+
+        if pending.received < header.count:
+            return None
+
+        del self._pending[key]
+        self._complete(header.stream_id, header.seq, pending.header, b''.join(pending.chunks), pending, now)
+        return self.pop_ready()
+
+    def pop_ready(self):
+        """Returns the next frame ready for display, or None."""
+        return self._ready.popleft() if self._ready else None
+
+    def _complete(self, stream_id, seq, header, payload, pending, now):
+        if self._blocked(stream_id, seq, now):
+            # An older frame of the stream is being repaired: deliver in order
+            self._held.setdefault(stream_id, []).append((seq, header, payload, pending))
+            self.frames_held += 1
+            return
+        self._deliver(stream_id, seq, header, payload, pending)
+        self._release(stream_id, now)
+
+    def _blocked(self, stream_id, seq, now):
+        """True while an older frame of the stream can still be repaired by a NACK."""
+        if not self.nack_deadline:
+            return False
+        return any(k[0] == stream_id and seq_newer(seq, k[1]) and now - p.first_seen <= self.nack_deadline
+                   for k, p in self._pending.items())
+
+    def _deliver(self, stream_id, seq, header, payload, pending):
+        last = self._last_delivered.get(stream_id)
+        if last is not None and header.seq != (last + 1) & 0xFFFFFFFF:
+            # Messages of this stream that never completed (lost or still pending)
+            self.frames_skipped += 1
+        self._last_delivered[stream_id] = seq
+        # Older frames of this stream can no longer be displayed in order
+        for stale in [k for k in self._pending if k[0] == stream_id and seq_newer(seq, k[1])]:
+            self._drop(stale)
+        self.frames_completed += 1
+        if pending.recovered:
+            self.frames_recovered += 1
+        if pending.nacks:
+            self.frames_repaired += 1
+        self._ready.append((header, payload))
+
+    def _release(self, stream_id, now):
+        """Delivers the held frames no longer waiting for an older one."""
+        held = self._held.get(stream_id)
+        if not held:
+            return
+        held.sort(key=cmp_to_key(lambda a, b: -1 if seq_newer(b[0], a[0]) else 1 if seq_newer(a[0], b[0]) else 0))
+        while held and not self._blocked(stream_id, held[0][0], now):
+            self._deliver(stream_id, *held.pop(0))
+        if not held:
+            del self._held[stream_id]
+
+    def take_nacks(self, now=None):
+        """Returns the 'frames' of a NACK command: [[stream_id, seq, [[first, count], ...]]], possibly empty."""
+        now = time.monotonic() if now is None else now
+        if not self.nack_deadline:
+            return []
+        nacks = []
+        for (stream_id, seq), pending in self._pending.items():
+            if pending.nacks >= self.NACK_RETRIES or now - pending.first_seen > self.nack_deadline:
+                continue
+            if pending.nacked_at is not None and now - pending.nacked_at < self.NACK_RETRY_INTERVAL:
+                continue
+            # Chunks are sent in order: a newer message means the missing ones are lost
+            newer = seq_newer(self._newest.get(stream_id, seq), seq)
+            if not newer and now - pending.last_seen < self.nack_delay:
+                continue
+            missing = [i for i, chunk in enumerate(pending.chunks) if chunk is None]
+            if not missing:
+                continue
+            ranges = []
+            for i in missing:
+                if ranges and ranges[-1][0] + ranges[-1][1] == i:
+                    ranges[-1][1] += 1
+                else:
+                    ranges.append([i, 1])
+            nacks.append([stream_id, seq, ranges])
+            pending.nacks += 1
+            pending.nacked_at = now
+            self.nacks_sent += 1
+            self.chunks_nacked += len(missing)
+        return nacks
+
+    def _add_parity(self, pending, parity, data):
+        """Keeps a parity datagram and repairs its group; False when it is useless."""
+        group = pending.groups.get(parity.first)
+        if group is None:
+            group = pending.groups[parity.first] = (parity.method, parity.size, [None] * parity.parity)
+        method, size, shards = group
+        if (method, size, len(shards)) != (parity.method, parity.size, parity.parity) or shards[parity.index]:
+            return False
+        shards[parity.index] = bytes(data)
+        pending.length = parity.length
+        self._repair(pending, parity.first)
+        return True
+
+    def _repair(self, pending, index):
+        """Rebuilds the lost chunks of the group holding a chunk, when its parity allows it."""
+        for first, (method, size, shards) in pending.groups.items():
+            if first <= index < first + size:
+                break
+        else:
+            return
+        chunks = pending.chunks[first:first + size]
+        missing = [first + i for i, chunk in enumerate(chunks) if chunk is None]
+        if not missing or len(missing) > sum(shard is not None for shard in shards):
+            return
+        shard_size = len(next(shard for shard in shards if shard is not None))
+        count = pending.header.count
+        last_size = pending.length - (count - 1) * shard_size
+        if not 0 < last_size <= shard_size:
+            return
+        try:
+            rebuilt = recover(chunks, shards, method, shard_size)
+        except ValueError as e:
+            # Chunk or parity sizes that do not match: corrupted or forged datagrams
+            logger.debug(f"[ASSEMBLER] FEC group {first} not recoverable: {e}")
+            return
+        if rebuilt is None:
+            return
+        for i, chunk in zip(missing, rebuilt):
+            pending.chunks[i] = chunk if i < count - 1 else chunk[:last_size]
+        pending.received += len(missing)
+        pending.recovered = True
+        self.chunks_recovered += len(missing)
+
+    def expire(self, now=None):
+        now = time.monotonic() if now is None else now
+        for key in [k for k, p in self._pending.items() if now - p.first_seen > self.timeout]:
+            self._drop(key)
+        # Frames whose repair deadline passed no longer hold the newer ones back
+        for stream_id in list(self._held):
+            self._release(stream_id, now)
+
+    def _drop(self, key):
+        if self._pending.pop(key, None) is not None:
+            self.frames_incomplete += 1
+
+    def get_stats(self):
+        return {
+            'frames_completed': self.frames_completed,
+            'frames_incomplete': self.frames_incomplete,
+            'frames_skipped': self.frames_skipped,
+            'frames_pending': len(self._pending),
+            'chunks_received': self.chunks_received,
+            'chunks_rejected': self.chunks_rejected,
+            'parity_received': self.parity_received,
+            'chunks_recovered': self.chunks_recovered,
+            'frames_recovered': self.frames_recovered,
+            'nacks_sent': self.nacks_sent,
+            'chunks_nacked': self.chunks_nacked,
+            'frames_repaired': self.frames_repaired,
+            'frames_held': self.frames_held,
+        }
@@ -0,0 +1,204 @@
+"""
+FrameCanvas: Composites partial tile updates into a persistent frame.
+"""
+import numpy as np
+import cv2
+from ..common.delta_codec import apply_delta
+from ..common.lossless_codec import unpack_lossless
+from ..common.protocol import (
+    FLAG_FULL, MSG_KEEPALIVE, MSG_TILES, TILE_CODEC_CACHE_REF, TILE_CODEC_CACHE_STORE, TILE_CODEC_COPY,
+    TILE_CODEC_DELTA, TILE_CODEC_H264, TILE_CODEC_JPEG, TILE_CODEC_LOSSLESS, TILE_CODEC_RAW, unpack_copy,
+    unpack_message,
+)
+from ..common.raw_codec import unpack_raw
+from .h264_decoder import HAS_PYAV, H264Decoder
+from .jpeg_decoder import DECODE_SCALES, JpegDecoder
+from .tile_cache import TileCache
+import logging
+
+logger = logging.getLogger("screenshare.client.frame_canvas")
+
+
+class FrameCanvas:
+    def __init__(self):
+        self.canvas = None
+        self.has_full_frame = False
+        self._full_seq = None
+        self._full_parts = set()
+        self._h264 = None
+        self._jpeg = JpegDecoder()
+        self.tile_cache = TileCache()
+        # Frames larger than the display are decoded at 1/scale of their size
+        self.scale = 1
+        self._display_size = None
+        self.keepalives = 0
+        self.rescales = 0
+
+    def reset(self):
+        self.canvas = None
+        self.has_full_frame = False
+        self._full_seq = None
+        self._full_parts = set()
+        self._h264 = None
+        self.tile_cache.clear()
+
+    def set_display_size(self, width, height):
+        """Sets the size the frames are shown at (None or 0: full resolution)."""
+        self._display_size = (width, height) if width and height else None
+
+    def _decode_scale(self, frame_width, frame_height):
+        """Largest reduction that keeps the frame at least as large as the display."""
+        if self._display_size is None:
+            return 1
+        width, height = self._display_size
+        fitting = [d for d in DECODE_SCALES if frame_width >= width * d and frame_height >= height * d]
+        return max(fitting, default=1)
+
+    def apply(self, data):
+        """Applies a tile message; returns True when the canvas should be displayed."""
+        header, tiles = unpack_message(data)
+        if header.msg_type == MSG_KEEPALIVE:
+            # Static screen on the server: the canvas is already up to date
+            self.keepalives += 1
+            return False
+        if header.msg_type != MSG_TILES:
+            return False
+        scale = self._decode_scale(header.frame_width, header.frame_height)
+        if scale != self.scale:
+            # The canvas is rebuilt at the new scale from the next full frame
+            self.scale = scale
+            self.canvas = None
+            self.rescales += 1
+            # Cached tiles were decoded at the previous scale
+            self.tile_cache.clear()
+        shape = (-(-header.frame_height // scale), -(-header.frame_width // scale), 3)
+        if self.canvas is not None and self.canvas.shape != shape and not header.flags & FLAG_FULL:
+            # Late update of the previous quality level: wait for the new level's full frame
+            return False
+        if self.canvas is None or self.canvas.shape != shape:
+            self.canvas = np.zeros(shape, dtype=np.uint8)
+            self.has_full_frame = False
+        if header.flags & FLAG_FULL and not self.has_full_frame:
+            # A full refresh may span several stripes: wait for all of them
+            if header.seq != self._full_seq:
+                self._full_seq = header.seq
+                self._full_parts = set()
+            self._full_parts.add(header.part)
+            self.has_full_frame = len(self._full_parts) == header.parts
+        for tile in tiles:
+            self._blit(tile)
+        # Only the last stripe of a frame triggers a repaint
+        return self.has_full_frame and header.part == header.parts - 1
+
+    def _blit(self, tile):
+        if tile.codec == TILE_CODEC_COPY:
+            self._copy(tile)
+            return
+        if tile.codec == TILE_CODEC_H264:
+            self._blit_h264(tile)
+            return
+        if tile.codec == TILE_CODEC_DELTA:
+            self._blit_delta(tile)
+            return
+        if tile.codec == TILE_CODEC_LOSSLESS:
+            self._blit_pixels(tile, unpack_lossless)
+            return
+        if tile.codec == TILE_CODEC_RAW:
+            self._blit_pixels(tile, unpack_raw)
+            return
+        if tile.codec == TILE_CODEC_CACHE_REF:
+            img = self.tile_cache.get(tile.data)
+            if img is not None:
+                self._paste(tile, img)
+            return
+        if tile.codec == TILE_CODEC_CACHE_STORE:
+            self._store(tile)
+            return
+        if tile.codec != TILE_CODEC_JPEG:
+            logger.debug(f"Unsupported tile codec {tile.codec}")
+            return
+        img = self._jpeg.decode(tile.data, self.scale)
+        if img is None:
+            logger.debug(f"Failed to decode tile at {(tile.x, tile.y)}")
+            return
+        self._paste(tile, img)
+
+    def _paste(self, tile, img):
+        x, y = tile.x // self.scale, tile.y // self.scale
+        h = min(img.shape[0], self.canvas.shape[0] - y)
+        w = min(img.shape[1], self.canvas.shape[1] - x)
+        if h > 0 and w > 0:
+            self.canvas[y:y + h, x:x + w] = img[:h, :w]
+
+    def _copy(self, tile):
+        """Moves a block of the canvas (scrolling); sent before the tiles of the frame."""
+        try:
+            src_x, src_y = unpack_copy(tile.data)
+        except ValueError as e:
+            logger.debug(f"Invalid copy tile at {(tile.x, tile.y)}: {e}")
+            return
+        scale = self.scale
+        sx, sy, x, y = src_x // scale, src_y // scale, tile.x // scale, tile.y // scale
+        height, width = self.canvas.shape[:2]
+        w = min(tile.width // scale, width - sx, width - x)
+        h = min(tile.height // scale, height - sy, height - y)
+        if w > 0 and h > 0:
+            # numpy handles the overlap of the source and destination blocks
+            self.canvas[y:y + h, x:x + w] = self.canvas[sy:sy + h, sx:sx + w]
+
+    def _store(self, tile):
+        """Keeps the area just decoded by the previous tiles of the message."""
+        x, y = tile.x // self.scale, tile.y // self.scale
+        h, w = -(-tile.height // self.scale), -(-tile.width // self.scale)
+        region = self.canvas[y:y + h, x:x + w]
+        if region.shape[:2] == (h, w):
+            self.tile_cache.store(tile.data, region)
+
+    def _blit_pixels(self, tile, unpack):
+        """Blits a tile whose codec yields the pixels at full size (lossless, raw)."""
+        try:
+            img = unpack(tile.data, tile.width, tile.height)
+        except ValueError as e:
+            logger.debug(f"Failed to decode tile {tile.codec} at {(tile.x, tile.y)}: {e}")
+            return
+        if self.scale > 1:
+            size = (-(-tile.width // self.scale), -(-tile.height // self.scale))
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        self._paste(tile, img)
+
+    def _blit_delta(self, tile):
+        scale = self.scale
+        x, y = tile.x // scale, tile.y // scale
+        h, w = -(-tile.height // scale), -(-tile.width // scale)
+        region = self.canvas[y:y + h, x:x + w]
+        if region.shape[:2] != (h, w):
+            logger.debug(f"Delta tile outside the canvas at {(tile.x, tile.y)}")
+            return
+        if scale > 1:
+            # Blocks replace whole pixels: apply them on the upscaled tile, then
+            # reduce again (unchanged blocks come back identical)
+            full = np.repeat(np.repeat(region, scale, axis=0), scale, axis=1)[:tile.height, :tile.width]
+            target = np.ascontiguousarray(full)
+        else:
+            target = region
+        try:
+            apply_delta(target, tile.data)
+        except ValueError as e:
+            logger.debug(f"Failed to apply delta tile at {(tile.x, tile.y)}: {e}")
+            return
+        if scale > 1:
+            region[:] = cv2.resize(target, (w, h), interpolation=cv2.INTER_AREA)
+
+    def _blit_h264(self, tile):
+        if not HAS_PYAV:
+            logger.debug("H.264 tile received but PyAV is not installed")
+            return
+        if self._h264 is None:
+            self._h264 = H264Decoder()
+        img = self._h264.decode(tile.data)
+        if img is None:
+            return
+        if self.scale > 1:
+            size = (-(-img.shape[1] // self.scale), -(-img.shape[0] // self.scale))
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        self._paste(tile, img)
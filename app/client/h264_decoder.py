@@ -0,0 +1,37 @@
+"""
+H264Decoder: Decodes the H.264 stream (PyAV / libavcodec, CPU only).
+"""
+import logging
+
+try:
+    import av
+    HAS_PYAV = True
+except ImportError:
+    # Optional: without PyAV the client does not announce the h264 capability
+    HAS_PYAV = False
+
+logger = logging.getLogger("screenshare.client.h264_decoder")
+
+
+class H264Decoder:
+    def __init__(self):
+        if not HAS_PYAV:
+            raise RuntimeError("PyAV is not installed")
+        self._codec = None
+        self.reset()
+
+    def reset(self):
+        self._codec = av.CodecContext.create('h264', 'r')
+        # Slice threads only: frame threading would delay every picture by a frame
+        self._codec.thread_type = 'SLICE'
+
+    def decode(self, data):
+        """Decodes one access unit; returns the BGR frame or None."""
+        try:
+            frames = self._codec.decode(av.Packet(bytes(data)))
+        except av.error.FFmpegError as e:
+            logger.debug(f"H.264 decode error: {e}")
+            return None
+        if not frames:
+            return None
+        return frames[-1].to_ndarray(format='bgr24')
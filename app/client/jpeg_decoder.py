@@ -0,0 +1,58 @@
+"""
+JpegDecoder: Decodes JPEG tiles, optionally at a reduced scale (1/2, 1/4, 1/8).
+
+Reduced decoding skips most of the IDCT work inside libjpeg: PyTurboJPEG is
+used when libturbojpeg is available, otherwise OpenCV's IMREAD_REDUCED modes.
+"""
+import logging
+
+import cv2
+import numpy as np
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJFLAG_FASTDCT, TJFLAG_FASTUPSAMPLE
+    HAS_TURBOJPEG = True
+except ImportError:
+    # Optional: OpenCV decodes the tiles without it
+    HAS_TURBOJPEG = False
+
+logger = logging.getLogger("screenshare.client.jpeg_decoder")
+
+DECODE_SCALES = (1, 2, 4, 8)
+
+_CV2_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def _load_turbojpeg():
+    if not HAS_TURBOJPEG:
+        return None
+    try:
+        return TurboJPEG()
+    except (OSError, RuntimeError) as e:
+        logger.info(f"libturbojpeg unavailable, decoding with OpenCV: {e}")
+        return None
+
+
+class JpegDecoder:
+    def __init__(self, backend='auto'):
+        self._turbo = _load_turbojpeg() if backend in ('auto', 'turbojpeg') else None
+        self.name = 'turbojpeg' if self._turbo is not None else 'opencv'
+
+    def decode(self, data, scale=1):
+        """Decodes a JPEG to BGR at 1/scale of its size (rounded up); returns None on error."""
+        if self._turbo is not None:
+            try:
+                return self._turbo.decode(
+                    bytes(data), pixel_format=TJPF_BGR,
+                    scaling_factor=None if scale == 1 else (1, scale),
+                    flags=TJFLAG_FASTDCT | TJFLAG_FASTUPSAMPLE,
+                )
+            except (OSError, ValueError) as e:
+                logger.debug(f"TurboJPEG decode failed: {e}")
+                return None
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), _CV2_FLAGS[scale])
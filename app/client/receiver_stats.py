@@ -0,0 +1,107 @@
+"""
+ReceiverStats: Measures reception quality and builds the periodic receiver report.
+"""
+import time
+from ..config import RECEIVER_REPORT_INTERVAL
+
+# Datagrams closer than this (s) belong to the same burst
+TRAIN_GAP = 0.002
+# Shortest burst used to measure the link rate
+TRAIN_MIN_DATAGRAMS = 8
+
+
+class ReceiverStats:
+    def __init__(self, interval=RECEIVER_REPORT_INTERVAL):
+        self.interval = interval
+        self.reset()
+
+    def reset(self):
+        self.bytes_received = 0
+        self.datagrams = 0
+        self.jitter_ms = 0.0
+        self._decode_total = 0.0
+        self._decode_count = 0
+        self._last_transit = None
+        self._last_report_at = None
+        self._last_completed = 0
+        self._last_incomplete = 0
+        self._train_start = None
+        self._train_last = None
+        self._train_bytes = 0
+        self._train_count = 0
+        self._train_rates = []
+
+    def on_datagram(self, size, now=None):
+        """Counts a datagram and measures the link rate on bursts (packet trains).
+
+        The server sends the fragments of a message back to back: their
+        spacing on arrival is set by the slowest link on the path.
+        """
+        now = time.monotonic() if now is None else now
+        self.bytes_received += size
+        self.datagrams += 1
+        if self._train_last is not None and now - self._train_last <= TRAIN_GAP:
+            self._train_bytes += size
+            self._train_count += 1
+        else:
+            self._end_train()
+            self._train_start = now
+            # The first datagram only marks the start of the burst
+            self._train_bytes = 0
+            self._train_count = 1
+        self._train_last = now
+
+    def _end_train(self):
+        if self._train_count >= TRAIN_MIN_DATAGRAMS and self._train_last > self._train_start:
+            self._train_rates.append(self._train_bytes * 8 / (self._train_last - self._train_start))
+        self._train_count = 0
+
+    def on_message(self, timestamp_ms, now=None):
+        """Updates the interarrival jitter (RFC 3550) from a completed message."""
+        now = time.monotonic() if now is None else now
+        # The sender clock is unknown: only the variation of the transit time matters
+        transit = (int(now * 1000) - timestamp_ms) & 0xFFFFFFFF
+        if self._last_transit is not None:
+            d = (transit - self._last_transit) & 0xFFFFFFFF
+            if d & 0x80000000:
+                d = 0x100000000 - d
+            self.jitter_ms += (d - self.jitter_ms) / 16.0
+        self._last_transit = transit
+
+    def on_decode(self, seconds):
+        self._decode_total += seconds
+        self._decode_count += 1
+
+    def report_due(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self._last_report_at is None:
+            self._last_report_at = now
+            return False
+        return now - self._last_report_at >= self.interval
+
+    def build_report(self, assembler_stats, now=None):
+        """Returns the receiver_report command for the interval since the previous one."""
+        now = time.monotonic() if now is None else now
+        completed = assembler_stats['frames_completed']
+        incomplete = assembler_stats['frames_incomplete']
+        report = {
+            'type': 'receiver_report',
+            'interval': round(now - (self._last_report_at or now), 3),
+            'frames_received': completed - self._last_completed,
+            'frames_incomplete': incomplete - self._last_incomplete,
+            'bytes_received': self.bytes_received,
+            'decode_ms': round(self._decode_total * 1000 / self._decode_count, 2) if self._decode_count else 0.0,
+            'jitter_ms': round(self.jitter_ms, 2),
+        }
+        rates = sorted(self._train_rates)
+        if rates:
+            # Median: a late read of the socket buffer makes a burst look faster
+            report['link_kbps'] = round(rates[len(rates) // 2] / 1000, 1)
+        self._train_rates = []
+        self._last_report_at = now
+        self._last_completed = completed
+        self._last_incomplete = incomplete
+        self.bytes_received = 0
+        self._decode_total = 0.0
+        self._decode_count = 0
+        return report
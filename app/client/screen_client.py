@@ -2,6 +2,7 @@
 ScreenClient: Handles video stream reception and command sending.
 """
 import socket
+import select
 import json
 import threading
 import time
@@ -11,7 +12,21 @@ import cv2
 import os
 from PySide6.QtCore import QObject, Signal
 from PySide6.QtGui import QImage
-from ..config import VIDEO_PORT, COMMAND_PORT, BUFFER_SIZE, DEFAULT_WIDTH, DEFAULT_HEIGHT
+from ..config import (
+    VIDEO_PORT, COMMAND_PORT, BUFFER_SIZE, SOCKET_RCVBUF, DEFAULT_WIDTH, DEFAULT_HEIGHT, FEC_RATIO,
+    MULTICAST_INTERFACE, MULTICAST_TIMEOUT,
+)
+from ..common.protocol import (
+    CAP_TILES, CAP_CHUNKS, CAP_DELTA, CAP_H264, CAP_LOSSLESS, CAP_RAW_LZ4, CAP_RAW_ZSTD, CAP_TILE_CACHE,
+    CAP_COPY_RECT, CAP_FEC_XOR, CAP_FEC_RS, CAP_NACK, CAP_MULTICAST, TIER_FULL, is_chunk, is_parity,
+    is_protocol_message,
+)
+from ..common.multicast import open_receiver, parse_info
+from ..common.raw_codec import HAS_LZ4, HAS_ZSTD
+from .frame_assembler import FrameAssembler
+from .frame_canvas import FrameCanvas
+from .h264_decoder import HAS_PYAV
+from .receiver_stats import ReceiverStats
 import logging
 
 logger = logging.getLogger("screenshare.client.screen_client")
@@ -24,15 +39,30 @@ class ScreenClient(QObject):
     disconnected = Signal()
     error_occurred = Signal(str)
 
-    def __init__(self, parent=None):
+    # Seconds between two keyframe requests
+    KEYFRAME_REQUEST_INTERVAL = 0.5
+
+    def __init__(self, parent=None, tier=TIER_FULL):
         super().__init__(parent)
         self.server_ip = None
+        self.tier = tier
+        self.fec_ratio = FEC_RATIO
         self.display_width = DEFAULT_WIDTH
         self.display_height = DEFAULT_HEIGHT
         self.is_running = False
         self.is_connected = False
         self.latest_frame = None
+        self.canvas = FrameCanvas()
+        self.assembler = FrameAssembler()
+        self.receiver_stats = ReceiverStats()
+        self._send_lock = threading.Lock()
+        self._losses_seen = 0
+        self._keyframe_requested_at = 0.0
         self.video_socket = None
+        self.multicast_socket = None  # Joined group socket, None on unicast
+        self._multicast_info = None  # Group announced in the register reply
+        self._multicast_seen = 0.0
+        self._stream_active = True
         self.command_socket = None
         self.receive_thread = None
         self.control_thread = None
@@ -44,7 +74,7 @@ class ScreenClient(QObject):
         logger.info(f"[CONNECT] Attempting connection to server {server_ip}...")
         try:
             self.video_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.video_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SIZE)
+            self.video_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
             self.video_socket.settimeout(0.1)
             try:
                 self.video_socket.bind(('0.0.0.0', 0))
@@ -76,7 +106,10 @@ class ScreenClient(QObject):
                         bound_port = self.video_socket.getsockname()[1]
                     except Exception:
                         bound_port = 0
-                reg = {'type': 'register', 'video_port': int(bound_port)}
+                reg = {
+                    'type': 'register', 'video_port': int(bound_port),
+                    'caps': self.capabilities(), 'tier': self.tier, 'fec': self.fec_ratio,
+                }
                 self.command_socket.sendall((json.dumps(reg) + '\n').encode('utf-8'))
                 logger.info(f"[CONNECT] Sent register to server: {reg} (server should send UDP to our port {bound_port})")
             except Exception as e:
@@ -115,6 +148,7 @@ class ScreenClient(QObject):
             except:
                 pass
             self.video_socket = None
+        self._leave_multicast(notify=False)
         if self.command_socket:
             try:
                 self.command_socket.close()
@@ -122,6 +156,9 @@ class ScreenClient(QObject):
                 pass
             self.command_socket = None
         self.latest_frame = None
+        self.canvas.reset()
+        self.assembler.reset()
+        self.receiver_stats.reset()
         self.status_changed.emit("Déconnecté")
         self.disconnected.emit()
 
@@ -142,9 +179,15 @@ class ScreenClient(QObject):
                         msg = json.loads(line.decode("utf-8", errors="replace"))
                     except Exception:
                         continue
-                    if isinstance(msg, dict) and msg.get("type") == "stream":
+                    if isinstance(msg, dict) and msg.get("type") == "registered":
+                        self._multicast_info = msg.get("multicast")
+                        self._join_multicast()
+                    elif isinstance(msg, dict) and msg.get("type") == "stream":
                         state = str(msg.get("state", "")).strip().lower()
                         if state in {"started", "stopped"}:
+                            # A stopped stream leaves the group silent on purpose
+                            self._stream_active = state == "started"
+                            self._multicast_seen = time.monotonic()
                             self.stream_state_changed.emit(state)
             except socket.timeout:
                 continue
@@ -166,8 +209,26 @@ class ScreenClient(QObject):
         logger.info(f"[VIDEO-RX] Starting receive thread, listening on {bound_addr}, server_ip={self.server_ip}")
         while self.is_running:
             try:
-                packet, addr = self.video_socket.recvfrom(BUFFER_SIZE)
+                packet, addr = self._recv_video()
                 timeout_count = 0
+                if is_chunk(packet) or is_parity(packet):
+                    try:
+                        self.receiver_stats.on_datagram(len(packet))
+                        self.assembler.expire()
+                        self._send_receiver_report()
+                        completed = self.assembler.push(packet)
+                        self._send_nacks()
+                        self._check_loss()
+                        # A repaired frame also releases the newer frames held behind it
+                        while completed is not None:
+                            if self._apply_message(*completed):
+                                frame_count += 1
+                                if frame_count % 100 == 0:
+                                    logger.info(f"[VIDEO-RX] Received {frame_count} frames from {addr}")
+                            completed = self.assembler.pop_ready()
+                    except Exception as e:
+                        logger.debug(f"[VIDEO-RX] Error applying tile message: {e}")
+                    continue
                 try:
                     npdata = np.frombuffer(packet, dtype=np.uint8)
                     frame = cv2.imdecode(npdata, cv2.IMREAD_COLOR)
@@ -180,16 +241,21 @@ class ScreenClient(QObject):
                         self.latest_frame = frame
                         if frame_count % 100 == 0:
                             logger.info(f"[VIDEO-RX] Received {frame_count} frames from {addr}")
-                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        h, w, ch = frame_rgb.shape
-                        bytes_per_line = ch * w
-                        qimg = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                        self.frame_received.emit(qimg.copy())
+                        self._emit_frame(frame)
                     else:
                         logger.debug(f"[VIDEO-RX] Failed to decode frame")
                 except Exception as e:
                     logger.debug(f"[VIDEO-RX] Error decoding packet: {e}")
             except socket.timeout:
+                self._check_multicast()
+                self.assembler.expire()
+                self._send_receiver_report()
+                self._send_nacks()
+                completed = self.assembler.pop_ready()
+                while completed is not None:
+                    if self._apply_message(*completed):
+                        frame_count += 1
+                    completed = self.assembler.pop_ready()
                 timeout_count += 1
                 if timeout_count % 50 == 1:
                     logger.debug(f"[VIDEO-RX] Waiting for video... (frames_received={frame_count})")
@@ -199,6 +265,149 @@ class ScreenClient(QObject):
                     logger.error(f"[VIDEO-RX] Error in receive loop: {e}")
                     time.sleep(0.001)
 
+    def _recv_video(self):
+        """Next datagram from the unicast socket or the multicast group; socket.timeout when idle."""
+        group = self.multicast_socket
+        if group is None:
+            return self.video_socket.recvfrom(BUFFER_SIZE)
+        try:
+            readable, _, _ = select.select([self.video_socket, group], [], [], self.video_socket.gettimeout())
+        except (OSError, ValueError):
+            if group is self.multicast_socket:
+                raise
+            raise socket.timeout()  # Group left by another thread meanwhile
+        if group in readable:
+            self._multicast_seen = time.monotonic()
+            return group.recvfrom(BUFFER_SIZE)
+        if readable:
+            # Unicast keeps carrying retransmissions while the group is joined
+            self._check_multicast()
+            return self.video_socket.recvfrom(BUFFER_SIZE)
+        raise socket.timeout()
+
+    def _join_multicast(self):
+        """Joins the group announced by the server; stays on unicast when it cannot."""
+        target = parse_info(self._multicast_info)
+        # The group carries the full stream only: thumbnails stay on unicast
+        if target is None or self.multicast_socket is not None or self.tier != TIER_FULL:
+            return
+        group, port = target
+        try:
+            sock = open_receiver(group, port, MULTICAST_INTERFACE, SOCKET_RCVBUF)
+        except OSError as e:
+            logger.warning(f"[MULTICAST] Could not join {group}:{port} ({e}), staying on unicast")
+            return
+        self._multicast_seen = time.monotonic()
+        self.multicast_socket = sock
+        if self.send_command({'type': 'multicast', 'joined': True}):
+            logger.info(f"[MULTICAST] Joined {group}:{port}")
+        else:
+            self._leave_multicast(notify=False)
+
+    def _leave_multicast(self, notify=True):
+        """Leaves the group (closing the socket drops the membership) and goes back to unicast."""
+        sock, self.multicast_socket = self.multicast_socket, None
+        if sock is None:
+            return
+        try:
+            sock.close()
+        except OSError:
+            pass
+        if notify:
+            self.send_command({'type': 'multicast', 'joined': False})
+
+    def _check_multicast(self):
+        """Falls back to unicast when the group stays silent while the stream runs."""
+        if self.multicast_socket is None or not self._stream_active:
+            return
+        silence = time.monotonic() - self._multicast_seen
+        if silence > MULTICAST_TIMEOUT:
+            logger.warning(f"[MULTICAST] No group traffic for {silence:.1f}s, falling back to unicast")
+            self._leave_multicast()
+
+    def _apply_message(self, header, message):
+        """Applies a reassembled tile message to the canvas; True when the frame was updated."""
+        self.receiver_stats.on_message(header.timestamp)
+        if not is_protocol_message(message):
+            return False
+        started = time.perf_counter()
+        updated = self.canvas.apply(message)
+        self.receiver_stats.on_decode(time.perf_counter() - started)
+        if updated:
+            self.latest_frame = self.canvas.canvas.copy()
+            self._emit_frame(self.canvas.canvas)
+        return updated
+
+    def _send_nacks(self):
+        """Asks the server again for the chunks of incomplete frames (see FrameAssembler.take_nacks)."""
+        frames = self.assembler.take_nacks()
+        if frames:
+            self.send_command({'type': 'nack', 'frames': frames})
+
+    def _emit_frame(self, frame):
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = frame_rgb.shape
+        bytes_per_line = ch * w
+        qimg = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
+        self.frame_received.emit(qimg.copy())
+
+    @staticmethod
+    def capabilities():
+        """Video capabilities announced in 'register'."""
+        caps = [
+            CAP_TILES, CAP_CHUNKS, CAP_DELTA, CAP_LOSSLESS, CAP_TILE_CACHE, CAP_COPY_RECT, CAP_FEC_XOR, CAP_FEC_RS,
+            CAP_NACK, CAP_MULTICAST,
+        ]
+        if HAS_PYAV:
+            caps.append(CAP_H264)
+        if HAS_LZ4:
+            caps.append(CAP_RAW_LZ4)
+        if HAS_ZSTD:
+            caps.append(CAP_RAW_ZSTD)
+        return caps
+
+    def set_tier(self, tier):
+        """Switches the stream tier (thumbnail / full) without reconnecting."""
+        if tier == self.tier:
+            return
+        self.tier = tier
+        self.send_command({'type': 'subscribe', 'tier': tier})
+        if tier == TIER_FULL:
+            self._join_multicast()
+        else:
+            self._leave_multicast()
+
+    def set_fec_ratio(self, ratio):
+        """Asks for another FEC parity ratio (0 disables, 'auto' follows the measured loss)."""
+        if ratio == self.fec_ratio:
+            return
+        self.fec_ratio = ratio
+        self.send_command({'type': 'fec', 'ratio': ratio})
+
+    def _check_loss(self):
+        """Asks for a keyframe when messages were lost: deltas would not repair the canvas."""
+        # A canvas rebuilt at another decode scale also waits for a full frame, and a
+        # tile missing from the cache leaves a hole until the next one
+        losses = (self.assembler.frames_incomplete + self.assembler.frames_skipped + self.canvas.rescales
+                  + self.canvas.tile_cache.misses)
+        if losses == self._losses_seen:
+            return
+        self._losses_seen = losses
+        now = time.monotonic()
+        if now - self._keyframe_requested_at < self.KEYFRAME_REQUEST_INTERVAL:
+            return
+        self._keyframe_requested_at = now
+        self.send_command({'type': 'keyframe_request'})
+
+    def _send_receiver_report(self):
+        if not self.receiver_stats.report_due():
+            return
+        report = self.receiver_stats.build_report(self.assembler.get_stats())
+        tile_cache = self.canvas.tile_cache.take_report()
+        if tile_cache:
+            report['tile_cache'] = tile_cache
+        self.send_command(report)
+
     def send_command(self, command_dict):
         if not self.command_socket or not self.is_connected:
             return False
@@ -206,7 +415,9 @@ class ScreenClient(QObject):
             message = json.dumps(command_dict) + '\n'
             if os.getenv("SS_INPUT_DEBUG", "0") == "1":
                 logger.info(f"[INPUT-CLIENT] send_command: {command_dict}")
-            self.command_socket.sendall(message.encode('utf-8'))
+            # Input events (UI thread) and receiver reports (video thread) share the socket
+            with self._send_lock:
+                self.command_socket.sendall(message.encode('utf-8'))
             return True
         except Exception as e:
             if os.getenv("SS_INPUT_DEBUG", "0") == "1":
@@ -257,9 +468,19 @@ class ScreenClient(QObject):
         }
         self.send_command(command)
 
+    def get_stats(self):
+        stats = self.assembler.get_stats()
+        stats['keepalives'] = self.canvas.keepalives
+        stats['jitter_ms'] = round(self.receiver_stats.jitter_ms, 1)
+        stats['tile_cache'] = self.canvas.tile_cache.get_stats()
+        stats['multicast'] = self.multicast_socket is not None
+        return stats
+
     def get_latest_frame(self):
         return self.latest_frame
 
     def set_display_size(self, width, height):
+        """Size the stream is shown at; larger frames are decoded at 1/2, 1/4 or 1/8 scale."""
         self.display_width = width
         self.display_height = height
+        self.canvas.set_display_size(width, height)
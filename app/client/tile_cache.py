@@ -0,0 +1,81 @@
+"""
+TileCache: LRU of decoded tiles referenced by the server (see app/server/tile_cache.py).
+
+The tiles stored and evicted since the previous receiver report are sent
+back to the server, which only references the tiles the client holds.
+"""
+from collections import OrderedDict
+from ..config import TILE_CACHE_MB
+
+
+class TileCache:
+    def __init__(self, max_bytes=int(TILE_CACHE_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._tiles = OrderedDict()  # {key: pixels}, least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stored = set()
+        self._evicted = set()
+
+    def store(self, key, img):
+        """Keeps a copy of decoded pixels under the server's key."""
+        key = bytes(key)
+        previous = self._tiles.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous.nbytes
+        img = img.copy()
+        self._tiles[key] = img
+        self.bytes += img.nbytes
+        self._stored.add(key)
+        self._evicted.discard(key)
+        while self.bytes > self.max_bytes and self._tiles:
+            self._evict(next(iter(self._tiles)))
+
+    def get(self, key):
+        """Returns the pixels of a referenced tile, or None when they are not held."""
+        key = bytes(key)
+        img = self._tiles.get(key)
+        if img is None:
+            self.misses += 1
+            # The server believes we hold it: make sure the next report says otherwise
+            self._evicted.add(key)
+            return None
+        self._tiles.move_to_end(key)
+        self.hits += 1
+        return img
+
+    def clear(self):
+        """Drops every tile (the canvas changed scale or the stream restarted)."""
+        for key in list(self._tiles):
+            self._evict(key)
+
+    def _evict(self, key):
+        self.bytes -= self._tiles.pop(key).nbytes
+        self.evictions += 1
+        self._stored.discard(key)
+        self._evicted.add(key)
+
+    def take_report(self):
+        """Returns the 'tile_cache' part of the receiver report, or None when nothing changed."""
+        if not self._stored and not self._evicted:
+            return None
+        report = {
+            'stored': [key.hex() for key in self._stored],
+            'evicted': [key.hex() for key in self._evicted],
+        }
+        self._stored = set()
+        self._evicted = set()
+        return report
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._tiles),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,3 @@
+"""
+Module commun au serveur et au client (protocole vidéo)
+"""
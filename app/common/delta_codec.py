@@ -0,0 +1,91 @@
+"""
+Codec delta - Blocs modifiés d'une tuile par rapport à la frame de référence
+
+Une tuile delta ne contient que les blocs de DELTA_BLOCK pixels qui ont
+changé depuis la frame précédente, sans perte, compressés avec zlib :
+
+    taille de bloc (1 octet) | bitmap des blocs modifiés | pixels BGR des blocs
+
+Les tuiles dont la largeur ou la hauteur n'est pas multiple de la taille
+de bloc sont complétées par répétition du bord des deux côtés.
+"""
+import zlib
+from typing import Optional
+
+import numpy as np
+
+DELTA_BLOCK = 8
+# Compression rapide : le delta est calculé à chaque frame
+ZLIB_LEVEL = 1
+
+
+def _padded(region: np.ndarray, block: int) -> np.ndarray:
+    """Complète une région à un multiple de la taille de bloc."""
+    h, w = region.shape[:2]
+    pad_h, pad_w = -h % block, -w % block
+    if pad_h or pad_w:
+        region = np.pad(region, ((0, pad_h), (0, pad_w), (0, 0)), mode='edge')
+    return region
+
+
+def _blocks(region: np.ndarray, block: int) -> np.ndarray:
+    """Vue (lignes, colonnes, bloc, bloc, canaux) d'une région complétée."""
+    h, w, c = region.shape
+    return region.reshape(h // block, block, w // block, block, c).swapaxes(1, 2)
+
+
+def pack_delta(current: np.ndarray, reference: np.ndarray, block: int = DELTA_BLOCK) -> Optional[bytes]:
+    """Encode les blocs d'une tuile qui diffèrent de la référence.
+
+    Args:
+        current: Pixels BGR de la tuile dans la frame courante
+        reference: Pixels BGR de la même tuile dans la frame de référence
+        block: Côté des blocs en pixels
+
+    Returns:
+        Données compressées, ou None si aucun bloc n'a changé
+    """
+    current_blocks = _blocks(_padded(current, block), block)
+    changed = np.any(current_blocks != _blocks(_padded(reference, block), block), axis=(2, 3, 4))
+    if not changed.any():
+        return None
+    payload = b''.join((
+        bytes((block,)),
+        np.packbits(changed).tobytes(),
+        current_blocks[changed].tobytes(),
+    ))
+    return zlib.compress(payload, ZLIB_LEVEL)
+
+
+def apply_delta(region: np.ndarray, data: bytes):
+    """Applique une tuile delta sur la région correspondante du canevas.
+
+    Args:
+        region: Vue modifiable de la tuile dans le canevas BGR
+        data: Données produites par pack_delta()
+
+    Raises:
+        ValueError: Si les données ne correspondent pas à la région
+    """
+    try:
+        payload = zlib.decompress(data)
+    except zlib.error as e:
+        raise ValueError(f"Invalid delta tile: {e}")
+    if not payload:
+        raise ValueError("Empty delta tile")
+    block = payload[0]
+    h, w = region.shape[:2]
+    rows, cols = -(-h // block), -(-w // block)
+    bitmap_size = (rows * cols + 7) // 8
+    changed = np.unpackbits(
+        np.frombuffer(payload, dtype=np.uint8, count=bitmap_size, offset=1), count=rows * cols
+    ).astype(bool).reshape(rows, cols)
+    pixels = np.frombuffer(payload, dtype=np.uint8, offset=1 + bitmap_size)
+    count = int(changed.sum())
+    if pixels.size != count * block * block * 3:
+        raise ValueError(f"Delta tile size mismatch: {pixels.size} bytes for {count} blocks")
+
+    # Copie contiguë : l'affectation par masque doit écrire dans ce tableau
+    padded = np.ascontiguousarray(_padded(region, block))
+    _blocks(padded, block)[changed] = pixels.reshape(count, block, block, 3)
+    region[:] = padded[:h, :w]
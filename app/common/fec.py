@@ -0,0 +1,182 @@
+"""
+Correction d'erreurs (FEC) - Fragments de parité sur les fragments d'une frame
+
+Les fragments d'un message sont rangés en groupes ; chaque groupe reçoit
+des fragments de parité qui permettent au client de reconstruire les
+fragments perdus sans attendre d'aller-retour.
+
+    FEC_XOR : un fragment de parité (XOR) par groupe, répare une perte
+    FEC_RS  : m fragments de parité Reed-Solomon (GF(256), matrice de
+              Cauchy) par groupe de k, réparent jusqu'à m pertes
+
+Les fragments sont complétés par des zéros jusqu'à la taille commune
+(le dernier fragment d'un message est plus court).
+"""
+import math
+from typing import List, Optional
+
+import numpy as np
+
+FEC_XOR = 0
+FEC_RS = 1
+FEC_METHOD_NAMES = {FEC_XOR: 'xor', FEC_RS: 'rs'}
+
+# Fragments de données par groupe (GF(256) : k + m <= 256)
+MAX_GROUP = 32
+# Fragments de parité par groupe au plus (Reed-Solomon)
+MAX_PARITY = 16
+
+
+def _gf_tables():
+    """Tables exp/log de GF(256) (polynôme 0x11D) et table de multiplication."""
+    exp = np.zeros(512, dtype=np.int32)
+    log = np.zeros(256, dtype=np.int32)
+    value = 1
+    for power in range(255):
+        exp[power] = value
+        log[value] = power
+        value <<= 1
+        if value & 0x100:
+            value ^= 0x11D
+    exp[255:510] = exp[:255]
+    a = np.arange(256)
+    mul = exp[(log[a][:, None] + log[a][None, :])].astype(np.uint8)
+    mul[0, :] = 0
+    mul[:, 0] = 0
+    return exp, log, mul
+
+
+_EXP, _LOG, _MUL = _gf_tables()
+
+
+def _gf_inv(a: int) -> int:
+    """Inverse d'un élément non nul de GF(256)."""
+    return int(_EXP[255 - _LOG[a]])
+
+
+def _cauchy(m: int, k: int) -> np.ndarray:
+    """Matrice de Cauchy (m, k) : toute sous-matrice carrée est inversible."""
+    return np.array([[_gf_inv(j ^ (m + i)) for i in range(k)] for j in range(m)], dtype=np.uint8)
+
+
+def group_layout(count: int, ratio: float, method: int) -> list:
+    """Découpe les fragments d'un message en groupes FEC.
+
+    Args:
+        count: Nombre de fragments de données du message
+        ratio: Fragments de parité par fragment de données (0 < ratio <= 1)
+        method: FEC_XOR ou FEC_RS
+
+    Returns:
+        Liste de (premier fragment, fragments de données, fragments de parité)
+    """
+    if method == FEC_XOR:
+        size = max(1, min(MAX_GROUP, int(round(1.0 / ratio))))
+    else:
+        size = MAX_GROUP
+    groups = max(1, math.ceil(count / size))
+    # Groupes de tailles voisines plutôt qu'un dernier groupe minuscule
+    size = math.ceil(count / groups)
+    layout = []
+    for first in range(0, count, size):
+        k = min(size, count - first)
+        m = 1 if method == FEC_XOR else max(1, min(MAX_PARITY, math.ceil(k * ratio)))
+        layout.append((first, k, m))
+    return layout
+
+
+def _shards(data: List[bytes], size: int) -> np.ndarray:
+    """Fragments complétés par des zéros, en tableau (fragments, taille)."""
+    shards = np.zeros((len(data), size), dtype=np.uint8)
+    for i, shard in enumerate(data):
+        shards[i, :len(shard)] = np.frombuffer(shard, dtype=np.uint8)
+    return shards
+
+
+def encode_parity(data: List[bytes], m: int, method: int, size: int) -> List[bytes]:
+    """Calcule les fragments de parité d'un groupe.
+
+    Args:
+        data: Fragments de données du groupe
+        m: Nombre de fragments de parité (1 pour FEC_XOR)
+        method: FEC_XOR ou FEC_RS
+        size: Taille commune des fragments
+
+    Returns:
+        Liste de m fragments de parité de `size` octets
+    """
+    shards = _shards(data, size)
+    if method == FEC_XOR:
+        return [np.bitwise_xor.reduce(shards, axis=0).tobytes()]
+    matrix = _cauchy(m, len(data))
+    parity = []
+    for row in matrix:
+        acc = np.zeros(size, dtype=np.uint8)
+        for coef, shard in zip(row, shards):
+            acc ^= _MUL[coef][shard]
+        parity.append(acc.tobytes())
+    return parity
+
+
+def recover(data: List[Optional[bytes]], parity: List[Optional[bytes]], method: int,
+            size: int) -> Optional[List[bytes]]:
+    """Reconstruit les fragments de données perdus d'un groupe.
+
+    Args:
+        data: Fragments de données du groupe (None = perdu)
+        parity: Fragments de parité du groupe (None = perdu)
+        method: FEC_XOR ou FEC_RS
+        size: Taille commune des fragments
+
+    Returns:
+        Fragments reconstruits (`size` octets, à tronquer par l'appelant)
+        dans l'ordre des fragments perdus, ou None si les pertes dépassent
+        la parité reçue
+    """
+    missing = [i for i, shard in enumerate(data) if shard is None]
+    rows = [j for j, shard in enumerate(parity) if shard is not None]
+    if not missing:
+        return []
+    if len(missing) > len(rows):
+        return None
+    known = _shards([shard if shard is not None else b'' for shard in data], size)
+    if method == FEC_XOR:
+        # Le seul fragment manquant est le XOR de la parité et des autres
+        others = np.delete(known, missing[0], axis=0)
+        syndrome = np.bitwise_xor.reduce(others, axis=0) ^ np.frombuffer(parity[rows[0]], dtype=np.uint8)
+        return [syndrome.tobytes()]
+
+    rows = rows[:len(missing)]
+    matrix = _cauchy(len(parity), len(data))
+    # Syndromes : parité moins la contribution des fragments reçus
+    syndromes = []
+    for j in rows:
+        acc = np.frombuffer(parity[j], dtype=np.uint8).copy()
+        for i, shard in enumerate(data):
+            if shard is not None:
+                acc ^= _MUL[matrix[j, i]][known[i]]
+        syndromes.append(acc)
+    inverse = _gf_invert(matrix[np.ix_(rows, missing)])
+    rebuilt = []
+    for row in inverse:
+        acc = np.zeros(size, dtype=np.uint8)
+        for coef, syndrome in zip(row, syndromes):
+            acc ^= _MUL[coef][syndrome]
+        rebuilt.append(acc.tobytes())
+    return rebuilt
+
+
+def _gf_invert(matrix: np.ndarray) -> np.ndarray:
+    """Inverse d'une matrice carrée de GF(256) (Gauss-Jordan)."""
+    n = len(matrix)
+    a = [[int(v) for v in row] + [int(i == j) for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = next(r for r in range(col, n) if a[r][col])
+        a[col], a[pivot] = a[pivot], a[col]
+        inv = _gf_inv(a[col][col])
+        a[col] = [int(_MUL[inv][v]) for v in a[col]]
+        for r in range(n):
+            if r != col and a[r][col]:
+                coef = a[r][col]
+                a[r] = [v ^ int(_MUL[coef][p]) for v, p in zip(a[r], a[col])]
+    return np.array([row[n:] for row in a], dtype=np.uint8)
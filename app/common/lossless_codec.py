@@ -0,0 +1,56 @@
+"""
+Codec sans perte - Tuiles de texte et d'aplats
+
+Les pixels de la tuile sont rangés plan par plan (B, puis G, puis R) et
+compressés avec zlib au niveau le plus rapide :
+
+    plan B | plan G | plan R    (hauteur x largeur octets chacun)
+
+Rangés par plan, les aplats et les glyphes d'une couleur de texte forment
+de longues répétitions : sur du texte, le résultat est plus petit qu'un
+JPEG de qualité 90 et moins coûteux à produire, sans flou autour des
+caractères.
+"""
+import zlib
+
+import numpy as np
+
+# Compression rapide : les tuiles sont codées à chaque frame
+ZLIB_LEVEL = 1
+
+
+def pack_lossless(region: np.ndarray) -> bytes:
+    """Encode une tuile sans perte.
+
+    Args:
+        region: Pixels BGR (ou BGRA, alpha ignoré) de la tuile
+
+    Returns:
+        Données compressées
+    """
+    planes = np.ascontiguousarray(region[..., :3].transpose(2, 0, 1))
+    return zlib.compress(planes, ZLIB_LEVEL)
+
+
+def unpack_lossless(data: bytes, width: int, height: int) -> np.ndarray:
+    """Décode une tuile sans perte.
+
+    Args:
+        data: Données produites par pack_lossless()
+        width: Largeur de la tuile
+        height: Hauteur de la tuile
+
+    Returns:
+        Pixels BGR (hauteur, largeur, 3)
+
+    Raises:
+        ValueError: Si les données ne correspondent pas à la tuile
+    """
+    try:
+        payload = zlib.decompress(data)
+    except zlib.error as e:
+        raise ValueError(f"Invalid lossless tile: {e}")
+    if len(payload) != width * height * 3:
+        raise ValueError(f"Lossless tile size mismatch: {len(payload)} bytes for {width}x{height}")
+    planes = np.frombuffer(payload, dtype=np.uint8).reshape(3, height, width)
+    return np.ascontiguousarray(planes.transpose(1, 2, 0))
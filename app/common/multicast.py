@@ -0,0 +1,91 @@
+"""
+Multicast - Groupe IP du flux vidéo partagé par tous les spectateurs
+
+En mode multicast (SS_MULTICAST_GROUP), le serveur envoie chaque frame du
+flux principal une seule fois, au groupe, au lieu d'une copie par client.
+Le groupe est annoncé dans la réponse à 'register' et dans l'annonce de
+découverte ; le client qui a rejoint le groupe le signale par la commande
+{'type': 'multicast', 'joined': true} et repasse en unicast (joined: false)
+si le groupe reste muet.
+
+Test sur une seule machine Linux : SS_MULTICAST_IF=127.0.0.1 des deux
+côtés fait passer le groupe par l'interface loopback.
+"""
+import socket
+import struct
+import sys
+from typing import Optional
+
+
+def parse_info(info) -> Optional[tuple]:
+    """Valide une description de groupe reçue du serveur.
+
+    Args:
+        info: Dictionnaire {group, port} de la réponse à 'register' ou de la découverte
+
+    Returns:
+        Tuple (groupe, port), ou None si la description est absente ou invalide
+    """
+    if not isinstance(info, dict):
+        return None
+    try:
+        group, port = str(info['group']), int(info['port'])
+        first = socket.inet_aton(group)[0]
+    except (KeyError, TypeError, ValueError, OSError):
+        return None
+    # 224.0.0.0/4 : seules les adresses de classe D sont des groupes
+    if not 224 <= first <= 239 or not 0 < port < 65536:
+        return None
+    return group, port
+
+
+def configure_sender(sock: socket.socket, ttl: int, interface: str = ''):
+    """Prépare un socket UDP à envoyer au groupe.
+
+    Args:
+        sock: Socket d'envoi du flux vidéo
+        ttl: Sauts de routeur franchis par les datagrammes
+        interface: IP de l'interface de sortie (vide = choix du système)
+    """
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, max(1, ttl))
+    # Les spectateurs de la machine du serveur reçoivent aussi le groupe
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    if interface:
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+
+
+def open_receiver(group: str, port: int, interface: str = '', rcvbuf: int = 0) -> socket.socket:
+    """Ouvre un socket abonné au groupe.
+
+    Plusieurs spectateurs d'une même machine peuvent écouter le même port.
+
+    Args:
+        group: Adresse du groupe
+        port: Port UDP du groupe
+        interface: IP de l'interface qui rejoint le groupe (vide = toutes)
+        rcvbuf: Taille du tampon noyau de réception (0 = celle du système)
+
+    Returns:
+        Socket UDP lié au port du groupe
+
+    Raises:
+        OSError: Si le port ne peut pas être lié ou le groupe rejoint
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError:
+                pass
+        if rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        # Lié au groupe (pas aux autres groupes du port) sauf sous Windows, qui l'interdit
+        sock.bind(('' if sys.platform == 'win32' else group, port))
+        membership = struct.pack('4s4s', socket.inet_aton(group), socket.inet_aton(interface or '0.0.0.0'))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+    except OSError:
+        sock.close()
+        raise
+    return sock
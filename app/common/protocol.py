@@ -0,0 +1,361 @@
+"""
+Protocole vidéo - Format binaire des messages échangés sur le canal UDP
+
+Un message (les tuiles d'une frame) est découpé en fragments de la taille
+d'un MTU, chacun précédé d'un en-tête CHUNK_MAGIC. Les deux magics
+permettent de distinguer ces datagrammes d'un JPEG brut (qui commence
+par 0xFFD8) envoyé aux anciens clients.
+
+Aux clients qui le négocient, chaque message est suivi de fragments de
+parité (PARITY_MAGIC, voir fec) qui réparent les fragments perdus.
+"""
+import struct
+from typing import List, NamedTuple
+
+from .fec import FEC_METHOD_NAMES, encode_parity, group_layout
+
+MAGIC = b'SS'
+CHUNK_MAGIC = b'SF'
+PARITY_MAGIC = b'SP'
+PROTOCOL_VERSION = 1
+
+# Capacités annoncées par le client dans la commande 'register'
+CAP_TILES = 'tiles'
+CAP_CHUNKS = 'chunks'
+CAP_DELTA = 'delta'  # Tuiles delta (keyframes + blocs modifiés, voir delta_codec)
+CAP_H264 = 'h264'  # Flux H.264 (décodeur PyAV disponible côté client)
+CAP_LOSSLESS = 'lossless'  # Tuiles sans perte (texte, aplats, voir lossless_codec)
+CAP_RAW_LZ4 = 'raw-lz4'  # Tuiles brutes compressées LZ4 (mode réseau local, voir raw_codec)
+CAP_RAW_ZSTD = 'raw-zstd'  # Tuiles brutes compressées zstd
+CAP_TILE_CACHE = 'tile-cache'  # Cache LRU des tuiles décodées, références aux tuiles connues
+CAP_COPY_RECT = 'copy-rect'  # Copie d'un bloc de l'image (défilement détecté par le serveur)
+CAP_FEC_XOR = 'fec-xor'  # Fragments de parité XOR (un par groupe)
+CAP_FEC_RS = 'fec-rs'  # Fragments de parité Reed-Solomon
+CAP_NACK = 'nack'  # Fragments manquants redemandés sur le canal de commandes (voir retransmit)
+CAP_MULTICAST = 'multicast'  # Réception du flux principal par le groupe multicast du serveur
+
+# Tiers de flux auxquels un client s'abonne ('register' ou 'subscribe')
+TIER_FULL = 'full'  # Flux principal, qualité réglée par les rapports de réception
+TIER_THUMBNAIL = 'thumbnail'  # Vignette basse résolution et basse cadence
+TIERS = (TIER_FULL, TIER_THUMBNAIL)
+
+# Types de message
+MSG_TILES = 1
+MSG_KEEPALIVE = 2  # Écran inchangé : aucune tuile, maintient le flux actif
+
+# Drapeaux de message
+FLAG_FULL = 0x01  # Le message couvre toute la frame (rafraîchissement complet)
+
+# Codecs de tuile
+TILE_CODEC_JPEG = 0
+TILE_CODEC_DELTA = 1  # Blocs modifiés sans perte, compressés zlib
+TILE_CODEC_H264 = 2  # Unité d'accès H.264 Annex B couvrant toute la frame
+TILE_CODEC_LOSSLESS = 3  # Pixels sans perte rangés par plan, compressés zlib
+TILE_CODEC_RAW = 4  # Pixels BGR bruts compressés LZ4 ou zstd (mode réseau local)
+TILE_CODEC_CACHE_REF = 5  # Tuile du cache client (données : clé de 8 octets)
+TILE_CODEC_CACHE_STORE = 6  # Mémoriser la zone, décodée par les tuiles précédentes, sous cette clé
+TILE_CODEC_COPY = 7  # Copie dans le rectangle du bloc de même taille situé en (x, y) source
+
+# magic, version, type, flags, seq, largeur, hauteur, partie, nb parties, nb tuiles
+_HEADER = struct.Struct('!2sBBBIHHHHH')
+# x, y, largeur, hauteur, codec, taille des données
+_TILE = struct.Struct('!HHHHBI')
+
+# x, y source d'une tuile TILE_CODEC_COPY
+_COPY = struct.Struct('!HH')
+
+# magic, version, drapeaux, id de flux, seq de frame, index, nb fragments, horodatage (ms)
+_CHUNK = struct.Struct('!2sBBHIHHI')
+
+# magic, version, méthode FEC, drapeaux, id de flux, seq de frame, premier fragment du groupe,
+# fragments de données du groupe, index de parité, fragments de parité du groupe,
+# nb fragments de la frame, taille du message, horodatage (ms)
+_PARITY = struct.Struct('!2sBBBHIHBBBHII')
+
+HEADER_SIZE = _HEADER.size
+TILE_HEADER_SIZE = _TILE.size
+CHUNK_HEADER_SIZE = _CHUNK.size
+PARITY_HEADER_SIZE = _PARITY.size
+
+MAX_CHUNKS = 0xFFFF
+
+
+class Tile(NamedTuple):
+    """Rectangle encodé d'une frame."""
+    x: int
+    y: int
+    width: int
+    height: int
+    codec: int
+    data: bytes
+
+
+class ChunkHeader(NamedTuple):
+    """En-tête d'un fragment de frame."""
+    flags: int
+    stream_id: int
+    seq: int
+    index: int
+    count: int
+    timestamp: int
+
+
+class ParityHeader(NamedTuple):
+    """En-tête d'un fragment de parité."""
+    method: int
+    flags: int
+    stream_id: int
+    seq: int
+    first: int
+    size: int
+    index: int
+    parity: int
+    count: int
+    length: int
+    timestamp: int
+
+
+class MessageHeader(NamedTuple):
+    """En-tête commun des messages vidéo."""
+    msg_type: int
+    flags: int
+    seq: int
+    frame_width: int
+    frame_height: int
+    part: int
+    parts: int
+    count: int
+
+
+def is_protocol_message(data: bytes) -> bool:
+    """Indique si des données sont un message du protocole (et non un JPEG brut)."""
+    return len(data) >= HEADER_SIZE and data[:2] == MAGIC
+
+
+def is_chunk(data: bytes) -> bool:
+    """Indique si un datagramme est un fragment de frame."""
+    return len(data) >= CHUNK_HEADER_SIZE and data[:2] == CHUNK_MAGIC
+
+
+def is_parity(data: bytes) -> bool:
+    """Indique si un datagramme est un fragment de parité."""
+    return len(data) >= PARITY_HEADER_SIZE and data[:2] == PARITY_MAGIC
+
+
+def seq_newer(a: int, b: int) -> bool:
+    """Indique si le numéro de séquence a est postérieur à b (modulo 2^32)."""
+    return a != b and ((a - b) & 0xFFFFFFFF) < 0x80000000
+
+
+def chunk_frame(stream_id: int, seq: int, payload: bytes, max_datagram: int,
+                timestamp: int, flags: int = 0) -> List[bytes]:
+    """Découpe une frame en fragments de la taille d'un datagramme.
+
+    Args:
+        stream_id: Identifiant du flux
+        seq: Numéro de frame
+        payload: Message à fragmenter
+        max_datagram: Taille maximale d'un datagramme (en-tête compris)
+        timestamp: Horodatage d'émission en millisecondes
+        flags: Drapeaux recopiés dans chaque fragment
+
+    Returns:
+        Liste de datagrammes
+
+    Raises:
+        ValueError: Si la frame nécessite plus de MAX_CHUNKS fragments
+    """
+    chunk_size = max_datagram - CHUNK_HEADER_SIZE
+    count = max(1, (len(payload) + chunk_size - 1) // chunk_size)
+    if count > MAX_CHUNKS:
+        raise ValueError(f"Frame too large to fragment ({len(payload)} bytes)")
+
+    view = memoryview(payload)
+    seq &= 0xFFFFFFFF
+    timestamp &= 0xFFFFFFFF
+    return [
+        _CHUNK.pack(CHUNK_MAGIC, PROTOCOL_VERSION, flags, stream_id, seq, index, count, timestamp)
+        + view[index * chunk_size:(index + 1) * chunk_size]
+        for index in range(count)
+    ]
+
+
+def unpack_chunk(data: bytes):
+    """Désérialise un fragment.
+
+    Args:
+        data: Datagramme reçu
+
+    Returns:
+        Tuple (ChunkHeader, données du fragment)
+
+    Raises:
+        ValueError: Si le fragment est invalide
+    """
+    if not is_chunk(data):
+        raise ValueError("Not a chunk datagram")
+    magic, version, flags, stream_id, seq, index, count, timestamp = _CHUNK.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version {version}")
+    if count == 0 or index >= count:
+        raise ValueError(f"Invalid chunk index {index}/{count}")
+    return ChunkHeader(flags, stream_id, seq, index, count, timestamp), memoryview(data)[CHUNK_HEADER_SIZE:]
+
+
+def parity_frame(stream_id: int, seq: int, payload: bytes, max_datagram: int, timestamp: int,
+                 ratio: float, method: int, flags: int = 0) -> List[bytes]:
+    """Calcule les fragments de parité des fragments produits par chunk_frame().
+
+    Les fragments de parité portent autant de données qu'un fragment de
+    frame : ils dépassent max_datagram de PARITY_HEADER_SIZE - CHUNK_HEADER_SIZE
+    octets.
+
+    Args:
+        stream_id: Identifiant du flux
+        seq: Numéro de frame
+        payload: Message fragmenté
+        max_datagram: Taille maximale d'un fragment de frame (en-tête compris)
+        timestamp: Horodatage d'émission en millisecondes
+        ratio: Fragments de parité par fragment de données
+        method: FEC_XOR ou FEC_RS
+        flags: Drapeaux des fragments de frame
+
+    Returns:
+        Liste de datagrammes de parité
+    """
+    chunk_size = max_datagram - CHUNK_HEADER_SIZE
+    count = max(1, (len(payload) + chunk_size - 1) // chunk_size)
+    view = memoryview(payload)
+    seq &= 0xFFFFFFFF
+    timestamp &= 0xFFFFFFFF
+    datagrams = []
+    for first, k, m in group_layout(count, ratio, method):
+        data = [view[i * chunk_size:(i + 1) * chunk_size] for i in range(first, first + k)]
+        for index, shard in enumerate(encode_parity(data, m, method, chunk_size)):
+            datagrams.append(_PARITY.pack(
+                PARITY_MAGIC, PROTOCOL_VERSION, method, flags, stream_id, seq,
+                first, k, index, m, count, len(payload), timestamp,
+            ) + shard)
+    return datagrams
+
+
+def unpack_parity(data: bytes):
+    """Désérialise un fragment de parité.
+
+    Args:
+        data: Datagramme reçu
+
+    Returns:
+        Tuple (ParityHeader, données de parité)
+
+    Raises:
+        ValueError: Si le fragment est invalide
+    """
+    if not is_parity(data):
+        raise ValueError("Not a parity datagram")
+    fields = _PARITY.unpack_from(data)
+    if fields[1] != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version {fields[1]}")
+    header = ParityHeader(*fields[2:])
+    if header.method not in FEC_METHOD_NAMES:
+        raise ValueError(f"Unknown FEC method {header.method}")
+    if (header.size == 0 or header.index >= header.parity or header.count == 0
+            or header.first + header.size > header.count):
+        raise ValueError(f"Invalid parity group {header.first}+{header.size}/{header.count}")
+    return header, memoryview(data)[PARITY_HEADER_SIZE:]
+
+
+def pack_tiles(seq: int, frame_width: int, frame_height: int, tiles: List[Tile],
+               flags: int = 0, part: int = 0, parts: int = 1) -> bytes:
+    """Sérialise un message de tuiles.
+
+    Args:
+        seq: Numéro de frame
+        frame_width: Largeur de la frame complète
+        frame_height: Hauteur de la frame complète
+        tiles: Tuiles encodées
+        flags: Drapeaux du message (FLAG_FULL...)
+        part: Index de ce message parmi ceux de la frame
+        parts: Nombre de messages composant la frame (1 avec la fragmentation)
+
+    Returns:
+        Message binaire
+    """
+    out = [_HEADER.pack(MAGIC, PROTOCOL_VERSION, MSG_TILES, flags, seq & 0xFFFFFFFF,
+                        frame_width, frame_height, part, parts, len(tiles))]
+    for tile in tiles:
+        out.append(_TILE.pack(tile.x, tile.y, tile.width, tile.height, tile.codec, len(tile.data)))
+        out.append(tile.data)
+    return b''.join(out)
+
+
+def pack_copy(src_x: int, src_y: int) -> bytes:
+    """Sérialise les données d'une tuile TILE_CODEC_COPY (position du bloc source)."""
+    return _COPY.pack(src_x, src_y)
+
+
+def unpack_copy(data: bytes) -> tuple:
+    """Désérialise les données d'une tuile TILE_CODEC_COPY.
+
+    Args:
+        data: Données de la tuile
+
+    Returns:
+        Tuple (x, y) du bloc source
+
+    Raises:
+        ValueError: Si les données n'ont pas la bonne taille
+    """
+    if len(data) != _COPY.size:
+        raise ValueError(f"Invalid copy tile ({len(data)} bytes)")
+    return _COPY.unpack(data)
+
+
+def pack_keepalive(seq: int, frame_width: int, frame_height: int) -> bytes:
+    """Sérialise un message « écran inchangé ».
+
+    Args:
+        seq: Numéro de la dernière frame de tuiles envoyée
+        frame_width: Largeur de la frame
+        frame_height: Hauteur de la frame
+
+    Returns:
+        Message binaire (en-tête seul)
+    """
+    return _HEADER.pack(MAGIC, PROTOCOL_VERSION, MSG_KEEPALIVE, 0, seq & 0xFFFFFFFF,
+                        frame_width, frame_height, 0, 1, 0)
+
+
+def unpack_message(data: bytes):
+    """Désérialise un message du protocole.
+
+    Args:
+        data: Message binaire
+
+    Returns:
+        Tuple (MessageHeader, liste de Tile)
+
+    Raises:
+        ValueError: Si le message est tronqué ou invalide
+    """
+    if not is_protocol_message(data):
+        raise ValueError("Not a protocol message")
+
+    magic, version, msg_type, flags, seq, width, height, part, parts, count = _HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version {version}")
+    header = MessageHeader(msg_type, flags, seq, width, height, part, parts, count)
+
+    tiles = []
+    offset = HEADER_SIZE
+    view = memoryview(data)
+    for _ in range(count):
+        if offset + TILE_HEADER_SIZE > len(data):
+            raise ValueError("Truncated tile header")
+        x, y, w, h, codec, size = _TILE.unpack_from(data, offset)
+        offset += TILE_HEADER_SIZE
+        if offset + size > len(data):
+            raise ValueError("Truncated tile data")
+        tiles.append(Tile(x, y, w, h, codec, view[offset:offset + size]))
+        offset += size
+    return header, tiles
@@ -0,0 +1,118 @@
+"""
+Codec brut - Tuiles BGR non transformées, compressées par LZ4 ou zstd
+
+Mode réseau local : aucune transformée, seule une compression sans perte
+très rapide (LZ4, ou zstd niveau 1) réduit les aplats. Le débit est bien
+plus élevé qu'en JPEG mais le coût CPU de l'encodage est minimal.
+
+    méthode (1 octet) | pixels BGR entrelacés compressés
+
+Les deux bibliothèques sont optionnelles : un client annonce les méthodes
+qu'il sait décoder, le serveur utilise la plus rapide dont il dispose.
+"""
+import threading
+
+import numpy as np
+
+try:
+    import lz4.block
+    HAS_LZ4 = True
+except ImportError:
+    # lz4 est optionnel : sans lui, zstd ou pas de mode brut
+    HAS_LZ4 = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    # zstandard est optionnel
+    HAS_ZSTD = False
+
+RAW_LZ4 = 0
+RAW_ZSTD = 1
+RAW_METHOD_NAMES = {RAW_LZ4: 'lz4', RAW_ZSTD: 'zstd'}
+
+# Niveau zstd le plus rapide (le mode brut privilégie le CPU au débit)
+ZSTD_LEVEL = 1
+
+# Contextes zstd (non partageables entre threads d'encodage)
+_zstd = threading.local()
+
+# Erreurs des bibliothèques sur des données corrompues
+_DECODE_ERRORS = (ValueError,)
+if HAS_LZ4:
+    _DECODE_ERRORS += (lz4.block.LZ4BlockError,)
+if HAS_ZSTD:
+    _DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+def available_methods() -> list:
+    """Méthodes de compression disponibles, de la plus rapide à la plus compacte."""
+    methods = []
+    if HAS_LZ4:
+        methods.append(RAW_LZ4)
+    if HAS_ZSTD:
+        methods.append(RAW_ZSTD)
+    return methods
+
+
+def _zstd_context(name: str):
+    """Compresseur ou décompresseur zstd du thread courant."""
+    context = getattr(_zstd, name, None)
+    if context is None:
+        if name == 'compressor':
+            context = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        else:
+            context = zstandard.ZstdDecompressor()
+        setattr(_zstd, name, context)
+    return context
+
+
+def pack_raw(region: np.ndarray, method: int) -> bytes:
+    """Encode une tuile brute.
+
+    Args:
+        region: Pixels BGR de la tuile
+        method: RAW_LZ4 ou RAW_ZSTD
+
+    Returns:
+        Données compressées
+    """
+    pixels = np.ascontiguousarray(region[..., :3])
+    if method == RAW_LZ4:
+        data = lz4.block.compress(pixels, store_size=False)
+    else:
+        data = _zstd_context('compressor').compress(pixels)
+    return bytes((method,)) + data
+
+
+def unpack_raw(data: bytes, width: int, height: int) -> np.ndarray:
+    """Décode une tuile brute.
+
+    Args:
+        data: Données produites par pack_raw()
+        width: Largeur de la tuile
+        height: Hauteur de la tuile
+
+    Returns:
+        Pixels BGR (hauteur, largeur, 3)
+
+    Raises:
+        ValueError: Si la méthode est inconnue ou indisponible, ou si les
+            données ne correspondent pas à la tuile
+    """
+    if not data:
+        raise ValueError("Empty raw tile")
+    method, size = data[0], width * height * 3
+    if method not in available_methods():
+        raise ValueError(f"Unsupported raw tile method {method}")
+    try:
+        if method == RAW_LZ4:
+            payload = lz4.block.decompress(data[1:], uncompressed_size=size)
+        else:
+            payload = _zstd_context('decompressor').decompress(data[1:], max_output_size=size)
+    except _DECODE_ERRORS as e:
+        raise ValueError(f"Invalid raw tile: {e}")
+    if len(payload) != size:
+        raise ValueError(f"Raw tile size mismatch: {len(payload)} bytes for {width}x{height}")
+    return np.frombuffer(payload, dtype=np.uint8).reshape(height, width, 3)
@@ -8,9 +8,51 @@ VIDEO_PORT = 9999
 COMMAND_PORT = 9998
 DISCOVERY_PORT = 9997  # Port UDP pour la découverte des serveurs actifs
 BUFFER_SIZE = 131072  # 128KB buffer for socket recv
+SOCKET_RCVBUF = int(os.getenv("SS_SOCKET_RCVBUF", str(4 * 1024 * 1024)))  # Tampon noyau UDP (rafales de fragments)
+SEND_QUEUE_DEPTH = int(os.getenv("SS_SEND_QUEUE_DEPTH", "4"))  # Messages en attente par client avant de jeter les plus anciens
+SENDMMSG = os.getenv("SS_SENDMMSG", "1") != "0"  # Envoi groupé sendmmsg vers tous les clients (Linux)
+MULTICAST_GROUP = os.getenv("SS_MULTICAST_GROUP", "")  # Groupe multicast du flux vidéo (vide = unicast seul), ex. 239.255.42.99
+MULTICAST_PORT = int(os.getenv("SS_MULTICAST_PORT", "9996"))  # Port UDP du groupe multicast
+MULTICAST_TTL = int(os.getenv("SS_MULTICAST_TTL", "1"))  # Sauts de routeur franchis (1 = réseau local)
+MULTICAST_INTERFACE = os.getenv("SS_MULTICAST_IF", "")  # IP de l'interface multicast (127.0.0.1 : test sur une machine)
+MULTICAST_TIMEOUT = float(os.getenv("SS_MULTICAST_TIMEOUT", "3.0"))  # Silence (s) du groupe avant retour à l'unicast (client)
+MAX_DATAGRAM_SIZE = int(os.getenv("SS_MAX_DATAGRAM", "1400"))  # Taille d'un fragment vidéo (sous le MTU)
+MAX_FRAME_BYTES = int(os.getenv("SS_MAX_FRAME_BYTES", str(8 * 1024 * 1024)))  # Taille max d'une frame réassemblée
+REASSEMBLY_TIMEOUT = float(os.getenv("SS_REASSEMBLY_TIMEOUT", "0.5"))  # Secondes avant abandon d'une frame incomplète
 DEFAULT_WIDTH = int(os.getenv("SS_WIDTH", "1280"))
 DEFAULT_HEIGHT = int(os.getenv("SS_HEIGHT", "720"))
 JPEG_QUALITY = int(os.getenv("SS_JPEG_QUALITY", "90"))
+MIN_JPEG_QUALITY = int(os.getenv("SS_MIN_JPEG_QUALITY", "60"))  # En dessous, on réduit l'échelle plutôt que la qualité
+JPEG_BACKEND = os.getenv("SS_JPEG_BACKEND", "auto")  # auto, turbojpeg (PyTurboJPEG, entrée BGRA), opencv
+JPEG_SUBSAMPLING = os.getenv("SS_JPEG_SUBSAMPLING", "420")  # Chrominance : 420, 422 ou 444 (texte net)
+JPEG_FAST_DCT = os.getenv("SS_JPEG_FAST_DCT", "1") != "0"  # DCT entière rapide (turbojpeg)
+TILE_SIZE = int(os.getenv("SS_TILE_SIZE", "64"))  # Côté des tuiles pour les mises à jour partielles
+FULL_REFRESH_INTERVAL = float(os.getenv("SS_FULL_REFRESH_INTERVAL", "2.0"))  # Secondes entre deux frames complètes
+TARGET_FPS = float(os.getenv("SS_TARGET_FPS", "30"))  # Cadence de capture visée
+MIN_FPS = float(os.getenv("SS_MIN_FPS", "5"))  # Cadence plancher (écran statique, pipeline saturé)
+MAX_FPS = float(os.getenv("SS_MAX_FPS", "60"))  # Cadence plafond (contenu très animé)
+KEEPALIVE_INTERVAL = float(os.getenv("SS_KEEPALIVE_INTERVAL", "1.0"))  # Secondes entre deux messages « rien n'a changé »
+IDLE_REFRESH_INTERVAL = float(os.getenv("SS_IDLE_REFRESH_INTERVAL", "10.0"))  # Frame complète périodique sur écran statique
+FINGERPRINT_STRIDE = int(os.getenv("SS_FINGERPRINT_STRIDE", "4"))  # Une ligne sur N dans l'empreinte des frames
+ADAPTIVE_QUALITY = os.getenv("SS_ADAPTIVE_QUALITY", "1") != "0"  # Qualité/échelle/cadence réglées par client
+VIDEO_CODEC = os.getenv("SS_VIDEO_CODEC", "tiles")  # tiles (JPEG/delta) ou h264 (PyAV, clients compatibles)
+DELTA_CODEC = os.getenv("SS_DELTA_CODEC", "1") != "0"  # Keyframes + deltas pour les clients qui le négocient
+LOSSLESS_TILES = os.getenv("SS_LOSSLESS_TILES", "1") != "0"  # Texte et aplats sans perte, images en JPEG
+RAW_MODE = os.getenv("SS_RAW_MODE", "auto")  # auto (tuiles brutes LZ4/zstd si le lien le permet) ou off
+RAW_MIN_BANDWIDTH = float(os.getenv("SS_RAW_MIN_MBPS", "400")) * 1e6  # Débit mesuré (bit/s) requis pour le mode brut
+TILE_CACHE = os.getenv("SS_TILE_CACHE", "1") != "0"  # Références aux tuiles déjà dans le cache des clients
+TILE_CACHE_MB = float(os.getenv("SS_TILE_CACHE_MB", "64"))  # Mémoire du cache de tuiles décodées (client)
+SCROLL_DETECTION = os.getenv("SS_SCROLL_DETECTION", "1") != "0"  # Défilement envoyé comme copie de bloc + bande découverte
+FEC_RATIO = os.getenv("SS_FEC_RATIO", "auto")  # Parité FEC demandée (client) : auto (suit la perte) ou 0 à 1
+NACK_DEADLINE = float(os.getenv("SS_NACK_DEADLINE", "0.15"))  # Secondes pour réparer une frame par NACK (0 désactive)
+NACK_DELAY = float(os.getenv("SS_NACK_DELAY", "0.02"))  # Silence (s) après lequel les fragments manquants sont demandés
+KEYFRAME_INTERVAL = float(os.getenv("SS_KEYFRAME_INTERVAL", "10.0"))  # Secondes entre deux keyframes (mode delta)
+THUMBNAIL_WIDTH = int(os.getenv("SS_THUMBNAIL_WIDTH", "320"))  # Largeur du tier vignette
+THUMBNAIL_FPS = float(os.getenv("SS_THUMBNAIL_FPS", "5"))  # Cadence du tier vignette
+RECEIVER_REPORT_INTERVAL = float(os.getenv("SS_REPORT_INTERVAL", "1.0"))  # Secondes entre deux rapports de réception client
+CAPTURE_BACKEND = os.getenv("SS_CAPTURE_BACKEND", "auto")  # auto (mss, sinon pil), x11shm (sur demande), mss, pil, synthetic
+SYNTHETIC_SCENE = os.getenv("SS_SYNTHETIC_SCENE", "idle")  # idle, scroll, video (backend synthetic)
+ENCODER_THREADS = int(os.getenv("SS_ENCODER_THREADS", str(min(8, os.cpu_count() or 1))))  # Workers d'encodage des bandes
 
 # Simulation simple d'utilisateurs (dans une vraie app, utiliser une BDD)
 USERS = {
@@ -0,0 +1,242 @@
+"""
+Envoi groupé - sendmmsg(2) pour la diffusion vers de nombreux clients
+
+Un tour d'envoi (les messages en cours de tous les clients) part en un
+appel système par bloc de MAX_BATCH datagrammes au lieu d'un sendto par
+datagramme et par client. Les descripteurs (mmsghdr, iovec) sont remplis
+avec numpy : la table des iovec d'une liste de datagrammes est construite
+une fois, puis partagée par tous les clients du même flux.
+
+Disponible sous Linux (glibc ou musl) ; ailleurs HAS_SENDMMSG est faux et
+les files d'envoi gardent la boucle sendto.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import socket
+import struct
+import sys
+
+import numpy as np
+
+# Datagrammes par appel (UIO_MAXIOV)
+MAX_BATCH = 1024
+# Adresses converties gardées au plus
+MAX_ADDRESSES = 4096
+# Tables d'iovec gardées au plus (listes de datagrammes des derniers messages)
+MAX_TABLES = 64
+# En dessous, la préparation des descripteurs coûte plus que les sendto évités
+MIN_BATCH_DATAGRAMS = 64
+
+_BLOCKING_ERRNOS = {errno.EAGAIN, errno.EWOULDBLOCK}
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.c_void_p), ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr), ('msg_len', ctypes.c_uint)]
+
+
+def _dtype(structure, fields) -> np.dtype:
+    """dtype numpy de même disposition mémoire qu'une structure ctypes."""
+    names, formats, offsets = [], [], []
+    for name, fmt, offset in fields:
+        names.append(name)
+        formats.append(fmt)
+        offsets.append(offset)
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                     'itemsize': ctypes.sizeof(structure)})
+
+
+_IOVEC_DTYPE = _dtype(_IoVec, [
+    ('base', np.uintp, _IoVec.iov_base.offset),
+    ('len', np.uintp, _IoVec.iov_len.offset),
+])
+_MMSGHDR_DTYPE = _dtype(_MMsgHdr, [
+    ('name', np.uintp, _MsgHdr.msg_name.offset),
+    ('namelen', np.uint32, _MsgHdr.msg_namelen.offset),
+    ('iov', np.uintp, _MsgHdr.msg_iov.offset),
+    ('iovlen', np.uintp, _MsgHdr.msg_iovlen.offset),
+])
+
+
+def _load_sendmmsg():
+    """Fonction sendmmsg de la libc, ou None si indisponible."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        function = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    function.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    function.restype = ctypes.c_int
+    return function
+
+
+_sendmmsg = _load_sendmmsg()
+HAS_SENDMMSG = _sendmmsg is not None
+
+
+def _sockaddr_in(address: tuple):
+    """struct sockaddr_in d'une adresse IPv4 (ip, port), ou None si elle n'est pas numérique."""
+    try:
+        packed = socket.inet_aton(address[0])
+        port = struct.pack('!H', address[1])
+    except (OSError, TypeError, struct.error, IndexError):
+        return None
+    return ctypes.create_string_buffer(struct.pack('=H', socket.AF_INET) + port + packed + bytes(8), 16)
+
+
+class BatchSender:
+    """Envoi d'un tour de datagrammes vers plusieurs destinations en appels sendmmsg."""
+
+    def __init__(self, sock):
+        """Initialise l'envoi groupé.
+
+        Args:
+            sock: Socket UDP IPv4 (non bloquant)
+
+        Raises:
+            OSError: Si sendmmsg n'est pas disponible
+        """
+        if not HAS_SENDMMSG:
+            raise OSError(errno.ENOSYS, "sendmmsg is not available")
+        self._fd = sock.fileno()
+        self._addresses = {}  # {(ip, port): sockaddr_in}
+        # {id(datagrammes): (datagrammes, gardés, iovec)} : un message reste en file plusieurs
+        # tours (un client par tour ne l'a pas encore reçu), sa table resservira
+        self._tables = {}
+
+        # Stats
+        self.calls = 0
+        self.datagrams = 0
+
+    def accepts(self, address: tuple) -> bool:
+        """Indique si une destination peut être servie par sendmmsg (IPv4 numérique)."""
+        return self._sockaddr(address) is not None
+
+    def _sockaddr(self, address: tuple):
+        """sockaddr_in d'une destination, gardé pour les tours suivants."""
+        sockaddr = self._addresses.get(address)
+        if sockaddr is None and address not in self._addresses:
+            sockaddr = self._addresses[address] = _sockaddr_in(address)
+        return sockaddr
+
+    def _trim(self):
+        """Limite les caches, entre deux appels seulement : les mmsghdr d'un appel pointent dedans."""
+        while len(self._tables) > MAX_TABLES:
+            del self._tables[next(iter(self._tables))]
+        if len(self._addresses) > MAX_ADDRESSES:
+            self._addresses.clear()
+
+    def send(self, batches: list) -> tuple:
+        """Envoie la suite des datagrammes de chaque destination, dans l'ordre.
+
+        Args:
+            batches: Liste de (adresse, datagrammes, premier indice à envoyer)
+
+        Returns:
+            Tuple (résultats, bloqué) : un (indice atteint, octets envoyés,
+            erreur ou None) par destination, et True si le tampon du socket
+            est plein (les destinations suivantes n'ont pas avancé)
+        """
+        try:
+            return self._send(batches)
+        finally:
+            self._trim()
+
+    def _send(self, batches: list) -> tuple:
+        """Corps de send() ; les caches ne sont pas réduits pendant l'appel."""
+        starts = []
+        total = 0
+        for _, datagrams, start in batches:
+            starts.append(total)
+            total += len(datagrams) - start
+        # Tables et adresses de l'appel, référencées ici jusqu'à sa fin : msgs pointe dedans
+        tables = [self._table(datagrams) for _, datagrams, _ in batches]
+        sockaddrs = [self._sockaddr(address) for address, _, _ in batches]
+        # Tableau mis à zéro en entier : les champs non remplis (msg_control...) restent nuls
+        msgs = np.zeros(total, dtype=_MMSGHDR_DTYPE)
+        for (_, datagrams, start), begin, iovecs, sockaddr in zip(batches, starts, tables, sockaddrs):
+            part = msgs[begin:begin + len(datagrams) - start]
+            part['name'] = ctypes.addressof(sockaddr)
+            part['namelen'] = 16
+            part['iov'] = iovecs.ctypes.data + np.arange(start, len(datagrams), dtype=np.uintp) * _IOVEC_DTYPE.itemsize
+            part['iovlen'] = 1
+        ends = starts[1:] + [total]
+
+        # Position atteinte par destination, et erreurs
+        reached = list(starts)
+        errors = [None] * len(batches)
+        position, current, blocked = 0, 0, False
+        while position < total:
+            while ends[current] <= position:
+                current += 1
+            count = min(MAX_BATCH, total - position)
+            sent = _sendmmsg(self._fd, msgs.ctypes.data + position * _MMSGHDR_DTYPE.itemsize, count, 0)
+            self.calls += 1
+            if sent < 0:
+                code = ctypes.get_errno()
+                if code == errno.EINTR:
+                    continue
+                if code in _BLOCKING_ERRNOS:
+                    blocked = True
+                    break
+                error = OSError(code, os.strerror(code))
+                if code in (errno.EBADF, errno.ENOTSOCK):
+                    raise error
+                # Le datagramme en tête est refusé : sa destination abandonne son message
+                reached[current] = position
+                errors[current] = error
+                position = ends[current]
+                continue
+            self.datagrams += sent
+            position += sent
+            # Destinations entièrement parcourues par cet appel
+            while current < len(batches) and ends[current] <= position:
+                reached[current] = ends[current]
+                current += 1
+            if current < len(batches):
+                reached[current] = max(reached[current], position)
+
+        results = []
+        for (_, _, start), begin, end, error, iovecs in zip(batches, starts, reached, errors, tables):
+            sent = end - begin
+            size = int(iovecs['len'][start:start + sent].sum()) if sent else 0
+            results.append((start + sent, size, error))
+        return results, blocked
+
+    def _table(self, datagrams: list) -> np.ndarray:
+        """Table des iovec d'une liste de datagrammes, partagée entre destinations et tours."""
+        entry = self._tables.get(id(datagrams))
+        # La liste elle-même est gardée : son id ne peut pas être réutilisé par une autre
+        if entry is not None and entry[0] is datagrams:
+            return entry[2]
+        # Les datagrammes (convertis en bytes) restent référencés tant que la table sert
+        kept = [d if type(d) is bytes else bytes(d) for d in datagrams]
+        iovecs = self._iovecs(kept)
+        self._tables[id(datagrams)] = (datagrams, kept, iovecs)
+        return iovecs
+
+    @staticmethod
+    def _iovecs(datagrams: list) -> np.ndarray:
+        """Table des iovec d'une liste de datagrammes (bytes)."""
+        iovecs = np.zeros(len(datagrams), dtype=_IOVEC_DTYPE)
+        iovecs['base'] = np.fromiter(
+            (ctypes.cast(d, ctypes.c_void_p).value for d in datagrams), dtype=np.uintp, count=len(datagrams)
+        )
+        iovecs['len'] = np.fromiter(map(len, datagrams), dtype=np.uintp, count=len(datagrams))
+        return iovecs
@@ -0,0 +1,60 @@
+"""
+Backends de capture d'écran
+"""
+import logging
+
+from ...config import CAPTURE_BACKEND
+from .base import (
+    CaptureBackend,
+    PIXEL_FORMAT_BGR,
+    PIXEL_FORMAT_BGRA,
+    register_backend,
+    available_backends,
+    get_backend_class,
+)
+from .frame_pool import FramePool
+from .mss_backend import MssCapture, HAS_MSS
+from .pil_backend import PilCapture
+from .synthetic import SyntheticCapture
+from .x11shm_backend import X11ShmCapture, HAS_X11SHM
+
+logger = logging.getLogger("screenshare.server.capture")
+
+
+def create_capture(monitor_manager, name: str = None) -> CaptureBackend:
+    """Crée le backend de capture demandé.
+
+    Args:
+        monitor_manager: Instance de MonitorManager
+        name: Nom du backend (SS_CAPTURE_BACKEND par défaut) ; 'auto'
+            choisit mss s'il est installé, sinon PIL. La mémoire partagée
+            X11 reste à demander explicitement (SS_CAPTURE_BACKEND=x11shm)
+            tant que tools/check_x11shm.py n'a pas été validé sous Xvfb
+
+    Returns:
+        Instance de CaptureBackend
+    """
+    name = name or CAPTURE_BACKEND
+    if name != 'auto' and get_backend_class(name) is None:
+        logger.warning(f"Unknown capture backend '{name}', available: {available_backends()}")
+        name = 'auto'
+    if name == 'auto':
+        name = 'mss' if HAS_MSS else 'pil'
+    return get_backend_class(name)(monitor_manager)
+
+
+__all__ = [
+    'CaptureBackend',
+    'FramePool',
+    'PIXEL_FORMAT_BGR',
+    'PIXEL_FORMAT_BGRA',
+    'register_backend',
+    'available_backends',
+    'create_capture',
+    'MssCapture',
+    'PilCapture',
+    'SyntheticCapture',
+    'X11ShmCapture',
+    'HAS_MSS',
+    'HAS_X11SHM',
+]
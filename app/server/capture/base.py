@@ -0,0 +1,107 @@
+"""
+Interface des backends de capture et registre par nom
+"""
+import logging
+import numpy as np
+
+from .frame_pool import FramePool
+
+logger = logging.getLogger("screenshare.server.capture")
+
+# Formats de pixel des frames retournées par grab()
+PIXEL_FORMAT_BGR = 'bgr'
+PIXEL_FORMAT_BGRA = 'bgra'
+
+_BACKENDS = {}
+
+
+def register_backend(name: str):
+    """Décorateur enregistrant une classe de backend sous un nom.
+
+    Args:
+        name: Nom utilisé dans SS_CAPTURE_BACKEND
+    """
+    def decorator(cls):
+        cls.name = name
+        _BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def available_backends() -> list:
+    """Retourne les noms des backends enregistrés."""
+    return sorted(_BACKENDS)
+
+
+def get_backend_class(name: str):
+    """Retourne la classe enregistrée sous ce nom, ou None."""
+    return _BACKENDS.get(name)
+
+
+class CaptureBackend:
+    """Source de frames pour le streamer vidéo.
+
+    Un backend est ouvert paresseusement par le thread de capture (ou
+    explicitement via open()), produit des frames avec grab() et peut
+    indiquer les zones modifiées depuis la capture précédente.
+    """
+
+    name = None
+    pixel_format = PIXEL_FORMAT_BGR
+
+    def __init__(self, monitor_manager):
+        """Initialise le backend.
+
+        Args:
+            monitor_manager: Instance de MonitorManager (moniteur sélectionné)
+        """
+        self.monitor_manager = monitor_manager
+        # Buffers des frames retournées par grab(), rendus via release()
+        self.frame_pool = FramePool()
+
+        # Stats
+        self.grab_count = 0
+        self.error_count = 0
+
+    def open(self):
+        """Prépare les ressources de capture."""
+
+    def close(self):
+        """Libère les ressources de capture."""
+
+    def grab(self) -> np.ndarray:
+        """Capture une frame.
+
+        La frame peut provenir du pool du backend : l'appelant la rend
+        avec release() quand il n'en a plus besoin.
+
+        Returns:
+            Frame au format pixel_format, ou None si indisponible
+        """
+        raise NotImplementedError
+
+    def release(self, frame: np.ndarray):
+        """Rend au backend une frame dont le contenu n'est plus utilisé.
+
+        Args:
+            frame: Frame retournée par grab()
+        """
+        self.frame_pool.release(frame)
+
+    def damage(self):
+        """Zones modifiées entre les deux dernières captures.
+
+        Returns:
+            Liste de rectangles (x, y, largeur, hauteur) en coordonnées de
+            la frame, [] si rien n'a changé, ou None si inconnu
+        """
+        return None
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques du backend."""
+        return {
+            'backend': self.name,
+            'grabs': self.grab_count,
+            'errors': self.error_count,
+            'pool': self.frame_pool.get_stats(),
+        }
@@ -0,0 +1,98 @@
+"""
+Pool de frames - Buffers de capture préalloués et réutilisés
+"""
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger("screenshare.server.capture.pool")
+
+
+class FramePool:
+    """Buffers numpy de taille fixe, recyclés entre les captures.
+
+    Le backend de capture écrit chaque frame dans un buffer obtenu par
+    acquire() ; l'étage d'encodage le rend par release() une fois la frame
+    convertie. Les buffers ne sont réalloués qu'au changement de géométrie
+    (moniteur ou résolution).
+    """
+
+    def __init__(self, name: str = "capture"):
+        """Initialise le pool.
+
+        Args:
+            name: Nom du pool (pour les statistiques)
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._shape = None
+        self._dtype = None
+        self._free = []
+        self._owned = {}  # id() -> buffer du pool pour la géométrie courante
+
+        # Stats
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape: tuple, dtype=np.uint8) -> np.ndarray:
+        """Retourne un buffer libre de la forme demandée.
+
+        Args:
+            shape: Forme du buffer (hauteur, largeur, canaux)
+            dtype: Type des éléments
+
+        Returns:
+            Buffer numpy (contenu indéfini)
+        """
+        shape = tuple(shape)
+        with self._lock:
+            if shape != self._shape or dtype != self._dtype:
+                if self._shape is not None:
+                    logger.info(f"Frame pool '{self.name}' resized: {self._shape} -> {shape}")
+                # Les buffers en circulation de l'ancienne géométrie seront ignorés au retour
+                self._shape = shape
+                self._dtype = dtype
+                self._free.clear()
+                self._owned.clear()
+            if self._free:
+                self.reuses += 1
+                return self._free.pop()
+            self.allocations += 1
+        buffer = np.empty(shape, dtype=dtype)
+        with self._lock:
+            if shape == self._shape:
+                self._owned[id(buffer)] = buffer
+        return buffer
+
+    def release(self, buffer: np.ndarray):
+        """Rend un buffer au pool (ignoré s'il n'en provient pas).
+
+        Args:
+            buffer: Buffer obtenu par acquire()
+        """
+        if buffer is None:
+            return
+        with self._lock:
+            if self._owned.get(id(buffer)) is buffer:
+                self._free.append(buffer)
+
+    def clear(self):
+        """Libère tous les buffers."""
+        with self._lock:
+            self._shape = None
+            self._dtype = None
+            self._free.clear()
+            self._owned.clear()
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques du pool.
+
+        Returns:
+            Dictionnaire {allocations, reuses, free}
+        """
+        with self._lock:
+            return {
+                'allocations': self.allocations,
+                'reuses': self.reuses,
+                'free': len(self._free),
+            }
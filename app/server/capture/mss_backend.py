@@ -0,0 +1,148 @@
+"""
+Capture mss - Contexte mss persistant pour tous les moniteurs
+"""
+import threading
+import time
+import logging
+import numpy as np
+
+try:
+    import mss
+    HAS_MSS = True
+except ImportError:
+    HAS_MSS = False
+
+from .base import CaptureBackend, PIXEL_FORMAT_BGRA, register_backend
+
+logger = logging.getLogger("screenshare.server.capture.mss")
+
+# Délai avant une nouvelle tentative après un échec de recréation du contexte
+RETRY_DELAY = 1.0
+
+
+@register_backend('mss')
+class MssCapture(CaptureBackend):
+    """Capture via un contexte mss unique et réutilisé.
+
+    Gère tous les moniteurs, y compris l'écran virtuel combiné (id 0). En
+    cas d'erreur, le contexte est recréé au lieu de basculer sur PIL.
+    Le contexte est ouvert paresseusement par le thread de capture, mss
+    n'étant pas utilisable depuis un autre thread sous Windows.
+
+    Les frames sont des vues BGRA sur le buffer de la capture mss, sans
+    copie ; la conversion en BGR est faite par l'étage d'encodage.
+    """
+
+    pixel_format = PIXEL_FORMAT_BGRA
+
+    def __init__(self, monitor_manager):
+        """Initialise le backend.
+
+        Args:
+            monitor_manager: Instance de MonitorManager (moniteur sélectionné)
+        """
+        super().__init__(monitor_manager)
+        self._sct = None
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+        self._failing = False  # Évite de répéter l'avertissement à chaque tentative
+
+        # Stats
+        self.recovery_count = 0
+
+    def open(self):
+        """Crée le contexte mss s'il n'existe pas."""
+        with self._lock:
+            if self._sct is None:
+                self._open_context()
+
+    def close(self):
+        """Ferme le contexte mss."""
+        with self._lock:
+            self._close_context()
+
+    def grab(self) -> np.ndarray:
+        """Capture le moniteur sélectionné.
+
+        Returns:
+            Frame BGRA, ou None si la capture est momentanément indisponible
+        """
+        with self._lock:
+            if self._sct is None and not self._open_context():
+                return None
+
+            try:
+                frame = self._grab_once()
+            except Exception as e:
+                self.error_count += 1
+                logger.warning(f"mss grab failed: {e}, recreating context")
+                self._close_context()
+                if not self._open_context():
+                    return None
+                try:
+                    frame = self._grab_once()
+                    self.recovery_count += 1
+                except Exception as e:
+                    self.error_count += 1
+                    logger.warning(f"mss grab failed after recreating context: {e}")
+                    self._close_context()
+                    self._retry_at = time.monotonic() + RETRY_DELAY
+                    return None
+
+            self.grab_count += 1
+            self._failing = False
+            return frame
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques du backend."""
+        stats = super().get_stats()
+        stats['recoveries'] = self.recovery_count
+        return stats
+
+    def _open_context(self) -> bool:
+        """Crée le contexte mss (avec délai entre deux échecs)."""
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            self._sct = mss.mss()
+            logger.info("mss capture context created")
+            return True
+        except Exception as e:
+            self.error_count += 1
+            log = logger.debug if self._failing else logger.warning
+            log(f"Failed to create mss context: {e}")
+            self._failing = True
+            self._sct = None
+            self._retry_at = time.monotonic() + RETRY_DELAY
+            return False
+
+    def _close_context(self):
+        """Ferme le contexte sans prendre le verrou."""
+        if self._sct is not None:
+            try:
+                self._sct.close()
+            except Exception:
+                pass
+            self._sct = None
+
+    def _region(self) -> dict:
+        """Retourne la zone mss correspondant au moniteur sélectionné."""
+        monitors = self._sct.monitors
+        selected = self.monitor_manager.selected_monitor
+        if 0 <= selected < len(monitors):
+            # monitors[0] = écran virtuel combiné (« Tous les écrans »)
+            return monitors[selected]
+
+        info = self.monitor_manager.monitor_info
+        if info:
+            return {
+                'left': info['left'], 'top': info['top'],
+                'width': info['width'], 'height': info['height'],
+            }
+        return monitors[0]
+
+    def _grab_once(self) -> np.ndarray:
+        """Réalise une capture et retourne une vue BGRA sur ses pixels."""
+        sct_img = self._sct.grab(self._region())
+        # mss retourne un buffer BGRA neuf à chaque capture : simple vue, sans copie
+        return np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
@@ -0,0 +1,40 @@
+"""
+Capture PIL - Repli via pyscreenshot/PIL quand mss n'est pas installé
+"""
+import logging
+import cv2
+import numpy as np
+
+try:
+    import pyscreenshot as ImageGrab
+except ImportError:
+    from PIL import ImageGrab
+
+from .base import CaptureBackend, register_backend
+
+logger = logging.getLogger("screenshare.server.capture.pil")
+
+
+@register_backend('pil')
+class PilCapture(CaptureBackend):
+    """Capture via pyscreenshot/PIL ImageGrab (lent, sans contexte persistant)."""
+
+    def grab(self) -> np.ndarray:
+        """Capture la zone du moniteur sélectionné.
+
+        Returns:
+            Frame BGR, ou None en cas d'erreur
+        """
+        bbox = self.monitor_manager.get_capture_bbox()
+        try:
+            if bbox:
+                img_pil = ImageGrab.grab(bbox=bbox)
+            else:
+                img_pil = ImageGrab.grab()
+        except Exception as e:
+            self.error_count += 1
+            logger.debug(f"PIL capture failed: {e}")
+            return None
+        self.grab_count += 1
+        frame = np.array(img_pil, dtype=np.uint8)
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
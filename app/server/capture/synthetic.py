@@ -0,0 +1,217 @@
+"""
+Capture synthétique - Source déterministe pour benchmarks et tests sans écran
+"""
+import logging
+import cv2
+import numpy as np
+
+from ...config import SYNTHETIC_SCENE
+from .base import CaptureBackend, register_backend
+
+logger = logging.getLogger("screenshare.server.capture.synthetic")
+
+SCENES = ('idle', 'scroll', 'video', 'switch')
+
+# Hauteur d'une ligne de texte du document défilant
+LINE_HEIGHT = 22
+# Défilement du document (pixels par frame)
+SCROLL_SPEED = 4
+# Période de clignotement du curseur (frames)
+CARET_PERIOD = 30
+# Frames entre deux changements de fenêtre (scène switch)
+SWITCH_PERIOD = 20
+
+_WORDS = (
+    "def", "return", "self", "frame", "capture", "encode", "send", "client",
+    "server", "stream", "tile", "socket", "import", "numpy", "width", "height",
+)
+
+
+@register_backend('synthetic')
+class SyntheticCapture(CaptureBackend):
+    """Génère un bureau artificiel identique d'une exécution à l'autre.
+
+    Scènes disponibles :
+        idle   - bureau statique avec un curseur texte clignotant
+        scroll - document texte qui défile en continu
+        video  - rectangle « vidéo » animé qui se déplace sur le bureau
+        switch - alternance (Alt-Tab) entre l'éditeur et un second document
+
+    Chaque appel à grab() avance d'une frame, indépendamment de l'horloge,
+    et damage() renvoie exactement les zones modifiées.
+    """
+
+    def __init__(self, monitor_manager, scene: str = None, seed: int = 0):
+        """Initialise la source.
+
+        Args:
+            monitor_manager: Instance de MonitorManager (dimensions de l'écran)
+            scene: Nom de la scène (SS_SYNTHETIC_SCENE par défaut)
+            seed: Graine du générateur pseudo-aléatoire
+        """
+        super().__init__(monitor_manager)
+        scene = scene or SYNTHETIC_SCENE
+        if scene not in SCENES:
+            logger.warning(f"Unknown synthetic scene '{scene}', using 'idle'")
+            scene = 'idle'
+        self.scene = scene
+        self.seed = seed
+        self.frame_index = 0
+        self._desktop = None
+        self._document = None
+        self._texture = None
+        self._video_rect = None
+        self._damage = None
+
+    def open(self):
+        """Pré-calcule le bureau et les contenus animés."""
+        if self._desktop is not None:
+            return
+        width = int(self.monitor_manager.screen_width)
+        height = int(self.monitor_manager.screen_height)
+        rng = np.random.default_rng(self.seed)
+
+        self._desktop = self._render_desktop(width, height)
+        if self.scene in ('scroll', 'switch'):
+            self._document = self._render_document(self._text_area(width, height), rng)
+        elif self.scene == 'video':
+            rw, rh = width // 3, height // 3
+            texture = rng.integers(0, 256, (rh * 2, rw * 2, 3), dtype=np.uint8)
+            # Une variante teintée par canal, pour ne rien allouer pendant grab()
+            self._texture = []
+            for channel in range(3):
+                tinted = texture.copy()
+                tinted[..., channel] //= 2
+                self._texture.append(tinted)
+        self.frame_index = 0
+        self._video_rect = None
+        logger.info(f"Synthetic capture ready: scene={self.scene} size={width}x{height}")
+
+    def close(self):
+        """Libère les images pré-calculées."""
+        self._desktop = None
+        self._document = None
+        self._texture = None
+        self.frame_pool.clear()
+
+    def grab(self) -> np.ndarray:
+        """Produit la frame suivante de la scène.
+
+        Returns:
+            Frame BGR
+        """
+        if self._desktop is None:
+            self.open()
+        index = self.frame_index
+        self.frame_index += 1
+        self.grab_count += 1
+
+        frame = self.frame_pool.acquire(self._desktop.shape)
+        np.copyto(frame, self._desktop)
+        if self.scene == 'idle':
+            self._draw_caret(frame, index)
+        elif self.scene == 'scroll':
+            self._draw_scroll(frame, index)
+        elif self.scene == 'switch':
+            self._draw_switch(frame, index)
+        else:
+            self._draw_video(frame, index)
+        if index == 0:
+            # Première frame : tout est nouveau
+            self._damage = None
+        return frame
+
+    def damage(self):
+        """Zones modifiées par la dernière frame produite."""
+        return self._damage
+
+    def _text_area(self, width: int, height: int) -> tuple:
+        """Zone (x, y, largeur, hauteur) de la fenêtre d'éditeur."""
+        return width // 8, height // 8, width * 3 // 4, height * 3 // 4
+
+    def _render_desktop(self, width: int, height: int) -> np.ndarray:
+        """Dessine le fond d'écran, la barre des tâches et une fenêtre."""
+        ramp = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+        desktop = np.empty((height, width, 3), dtype=np.uint8)
+        desktop[..., 0] = (120 + 90 * ramp).astype(np.uint8)
+        desktop[..., 1] = (80 + 60 * ramp).astype(np.uint8)
+        desktop[..., 2] = (40 + 30 * ramp).astype(np.uint8)
+
+        # Barre des tâches et icônes
+        cv2.rectangle(desktop, (0, height - 40), (width, height), (48, 48, 48), -1)
+        for i in range(6):
+            x = 20 + i * 90
+            cv2.rectangle(desktop, (x, 30), (x + 56, 86), (200, 200 - i * 20, 80 + i * 25), -1)
+            cv2.putText(desktop, f"app{i}", (x, 106), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (240, 240, 240), 1)
+
+        # Fenêtre d'éditeur
+        x, y, w, h = self._text_area(width, height)
+        cv2.rectangle(desktop, (x, y - 28), (x + w, y), (90, 90, 90), -1)
+        cv2.putText(desktop, "editor.py", (x + 10, y - 9), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (230, 230, 230), 1)
+        cv2.rectangle(desktop, (x, y), (x + w, y + h), (250, 250, 250), -1)
+        for row in range(h // LINE_HEIGHT):
+            line = " ".join(_WORDS[(row * 7 + k) % len(_WORDS)] for k in range(6))
+            cv2.putText(desktop, line, (x + 8, y + 16 + row * LINE_HEIGHT),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (30, 30, 30), 1)
+        return desktop
+
+    def _render_document(self, area: tuple, rng) -> np.ndarray:
+        """Dessine un long document texte destiné à défiler dans l'éditeur."""
+        _, _, w, h = area
+        lines = max(1, h * 4 // LINE_HEIGHT)
+        document = np.full((lines * LINE_HEIGHT, w, 3), 250, dtype=np.uint8)
+        for row in range(lines):
+            count = int(rng.integers(3, 10))
+            words = [_WORDS[int(k)] for k in rng.integers(0, len(_WORDS), count)]
+            indent = int(rng.integers(0, 4)) * 24
+            cv2.putText(document, f"{row:04d}  " + " ".join(words), (8 + indent, 16 + row * LINE_HEIGHT),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (30, 30, 30), 1)
+        return document
+
+    def _draw_caret(self, frame: np.ndarray, index: int):
+        """Curseur texte clignotant dans l'éditeur."""
+        x, y, _, _ = self._text_area(frame.shape[1], frame.shape[0])
+        caret = (x + 300, y + 4 + 3 * LINE_HEIGHT, 2, LINE_HEIGHT - 4)
+        cx, cy, cw, ch = caret
+        if (index // CARET_PERIOD) % 2 == 0:
+            frame[cy:cy + ch, cx:cx + cw] = 0
+        self._damage = [caret] if index % CARET_PERIOD == 0 else []
+
+    def _draw_scroll(self, frame: np.ndarray, index: int):
+        """Fenêtre de l'éditeur affichant le document décalé."""
+        x, y, w, h = self._text_area(frame.shape[1], frame.shape[0])
+        span = self._document.shape[0] - h
+        offset = (index * SCROLL_SPEED) % max(1, span)
+        frame[y:y + h, x:x + w] = self._document[offset:offset + h]
+        self._damage = [(x, y, w, h)]
+
+    def _draw_switch(self, frame: np.ndarray, index: int):
+        """Éditeur et second document affichés tour à tour."""
+        x, y, w, h = self._text_area(frame.shape[1], frame.shape[0])
+        if (index // SWITCH_PERIOD) % 2:
+            frame[y:y + h, x:x + w] = self._document[:h]
+        self._damage = [(x, y, w, h)] if index % SWITCH_PERIOD == 0 else []
+
+    def _draw_video(self, frame: np.ndarray, index: int):
+        """Rectangle animé rebondissant sur le bureau."""
+        height, width = frame.shape[:2]
+        texture = self._texture[index % 3]
+        rh, rw = texture.shape[0] // 2, texture.shape[1] // 2
+        # Trajectoire en triangle (aller-retour) sur chaque axe
+        span_x = max(1, width - rw)
+        span_y = max(1, height - 40 - rh)
+        px = (index * 7) % (2 * span_x)
+        py = (index * 5) % (2 * span_y)
+        rx = px if px < span_x else 2 * span_x - px
+        ry = py if py < span_y else 2 * span_y - py
+
+        # Contenu qui change à chaque frame : texture qui glisse + teinte
+        tx = (index * 3) % rw
+        ty = (index * 2) % rh
+        patch = frame[ry:ry + rh, rx:rx + rw]
+        np.copyto(patch, texture[ty:ty + rh, tx:tx + rw])
+
+        rect = (rx, ry, rw, rh)
+        previous = self._video_rect
+        self._video_rect = rect
+        self._damage = [rect] if previous is None else [previous, rect]
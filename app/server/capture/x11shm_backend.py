@@ -0,0 +1,477 @@
+"""
+Capture X11 - Mémoire partagée MIT-SHM et zones modifiées via XDamage
+
+Les bibliothèques Xlib sont chargées avec ctypes : aucune dépendance Python
+supplémentaire. XDamage (et XFixes, nécessaire pour lire les régions) est
+facultatif ; sans lui le streamer revient à la comparaison de pixels.
+"""
+import os
+import sys
+import ctypes
+import ctypes.util
+import threading
+import time
+import logging
+import numpy as np
+
+from .base import CaptureBackend, PIXEL_FORMAT_BGRA, register_backend
+
+logger = logging.getLogger("screenshare.server.capture.x11shm")
+
+# Délai avant une nouvelle tentative après un échec d'ouverture
+RETRY_DELAY = 1.0
+
+# Constantes Xlib / SysV IPC
+_ZPIXMAP = 2
+_ALL_PLANES = ctypes.c_ulong(-1).value
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+_XDAMAGE_REPORT_NON_EMPTY = 3
+# Taille de l'union XEvent (24 longs)
+_XEVENT_SIZE = 24 * ctypes.sizeof(ctypes.c_long)
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ('shmseg', ctypes.c_ulong),
+        ('shmid', ctypes.c_int),
+        ('shmaddr', ctypes.c_void_p),
+        ('readOnly', ctypes.c_int),
+    ]
+
+
+class _XImage(ctypes.Structure):
+    # Seuls les champs lus sont déclarés (la structure est allouée par Xlib)
+    _fields_ = [
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('xoffset', ctypes.c_int),
+        ('format', ctypes.c_int),
+        ('data', ctypes.c_void_p),
+        ('byte_order', ctypes.c_int),
+        ('bitmap_unit', ctypes.c_int),
+        ('bitmap_bit_order', ctypes.c_int),
+        ('bitmap_pad', ctypes.c_int),
+        ('depth', ctypes.c_int),
+        ('bytes_per_line', ctypes.c_int),
+        ('bits_per_pixel', ctypes.c_int),
+    ]
+
+
+class _XRectangle(ctypes.Structure):
+    _fields_ = [
+        ('x', ctypes.c_short),
+        ('y', ctypes.c_short),
+        ('width', ctypes.c_ushort),
+        ('height', ctypes.c_ushort),
+    ]
+
+
+class _XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_int),
+        ('display', ctypes.c_void_p),
+        ('resourceid', ctypes.c_ulong),
+        ('serial', ctypes.c_ulong),
+        ('error_code', ctypes.c_ubyte),
+        ('request_code', ctypes.c_ubyte),
+        ('minor_code', ctypes.c_ubyte),
+    ]
+
+
+_XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(_XErrorEvent))
+
+
+def _load(name: str):
+    """Charge une bibliothèque partagée par son nom court, ou None."""
+    path = ctypes.util.find_library(name)
+    if not path:
+        return None
+    try:
+        return ctypes.CDLL(path)
+    except OSError:
+        return None
+
+
+def _declare(lib, name: str, restype, *argtypes):
+    """Déclare la signature d'une fonction C."""
+    func = getattr(lib, name)
+    func.restype = restype
+    func.argtypes = argtypes
+    return func
+
+
+class _Xlib:
+    """Fonctions Xlib, XShm, XDamage et XFixes utilisées par le backend."""
+
+    def __init__(self):
+        x11 = _load('X11')
+        xext = _load('Xext')
+        libc = _load('c')
+        if x11 is None or xext is None or libc is None:
+            raise OSError("libX11/libXext not found")
+        vp, ul, i = ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int
+
+        self.XOpenDisplay = _declare(x11, 'XOpenDisplay', vp, ctypes.c_char_p)
+        self.XCloseDisplay = _declare(x11, 'XCloseDisplay', i, vp)
+        self.XDefaultScreen = _declare(x11, 'XDefaultScreen', i, vp)
+        self.XRootWindow = _declare(x11, 'XRootWindow', ul, vp, i)
+        self.XDefaultVisual = _declare(x11, 'XDefaultVisual', vp, vp, i)
+        self.XDefaultDepth = _declare(x11, 'XDefaultDepth', i, vp, i)
+        self.XDisplayWidth = _declare(x11, 'XDisplayWidth', i, vp, i)
+        self.XDisplayHeight = _declare(x11, 'XDisplayHeight', i, vp, i)
+        self.XSync = _declare(x11, 'XSync', i, vp, i)
+        self.XPending = _declare(x11, 'XPending', i, vp)
+        self.XNextEvent = _declare(x11, 'XNextEvent', i, vp, vp)
+        self.XFree = _declare(x11, 'XFree', i, vp)
+        self.XDestroyImage = _declare(x11, 'XDestroyImage', i, ctypes.POINTER(_XImage))
+        self.XSetErrorHandler = _declare(x11, 'XSetErrorHandler', vp, _XErrorHandler)
+
+        seg = ctypes.POINTER(_XShmSegmentInfo)
+        self.XShmQueryExtension = _declare(xext, 'XShmQueryExtension', i, vp)
+        self.XShmCreateImage = _declare(
+            xext, 'XShmCreateImage', ctypes.POINTER(_XImage),
+            vp, vp, ctypes.c_uint, i, vp, seg, ctypes.c_uint, ctypes.c_uint,
+        )
+        self.XShmAttach = _declare(xext, 'XShmAttach', i, vp, seg)
+        self.XShmDetach = _declare(xext, 'XShmDetach', i, vp, seg)
+        self.XShmGetImage = _declare(xext, 'XShmGetImage', i, vp, ul, ctypes.POINTER(_XImage), i, i, ul)
+
+        self.shmget = _declare(libc, 'shmget', i, i, ctypes.c_size_t, i)
+        self.shmat = _declare(libc, 'shmat', vp, i, vp, i)
+        self.shmdt = _declare(libc, 'shmdt', i, vp)
+        self.shmctl = _declare(libc, 'shmctl', i, i, i, vp)
+
+        # XDamage + XFixes : facultatifs
+        self.has_damage = False
+        xdamage = _load('Xdamage')
+        xfixes = _load('Xfixes')
+        if xdamage is not None and xfixes is not None:
+            ip = ctypes.POINTER(ctypes.c_int)
+            self.XDamageQueryExtension = _declare(xdamage, 'XDamageQueryExtension', i, vp, ip, ip)
+            self.XDamageQueryVersion = _declare(xdamage, 'XDamageQueryVersion', i, vp, ip, ip)
+            self.XDamageCreate = _declare(xdamage, 'XDamageCreate', ul, vp, ul, i)
+            self.XDamageDestroy = _declare(xdamage, 'XDamageDestroy', None, vp, ul)
+            self.XDamageSubtract = _declare(xdamage, 'XDamageSubtract', None, vp, ul, ul, ul)
+            self.XFixesQueryVersion = _declare(xfixes, 'XFixesQueryVersion', i, vp, ip, ip)
+            self.XFixesCreateRegion = _declare(xfixes, 'XFixesCreateRegion', ul, vp, vp, i)
+            self.XFixesDestroyRegion = _declare(xfixes, 'XFixesDestroyRegion', None, vp, ul)
+            self.XFixesFetchRegion = _declare(
+                xfixes, 'XFixesFetchRegion', ctypes.POINTER(_XRectangle), vp, ul, ip,
+            )
+            self.has_damage = True
+
+
+_xlib = None
+if sys.platform.startswith('linux'):
+    try:
+        _xlib = _Xlib()
+    except (OSError, AttributeError) as e:
+        logger.debug(f"X11 shared memory capture unavailable: {e}")
+
+HAS_X11SHM = _xlib is not None
+
+# Dernière erreur X reçue (le gestionnaire par défaut de Xlib termine le processus)
+_last_x_error = [0]
+
+
+@_XErrorHandler
+def _on_x_error(display, event):
+    _last_x_error[0] = event.contents.error_code or 1
+    return 0
+
+
+@register_backend('x11shm')
+class X11ShmCapture(CaptureBackend):
+    """Capture X11 dans un segment de mémoire partagée réutilisé.
+
+    XShmGetImage copie l'écran directement dans le segment partagé avec le
+    serveur X (pas de transfert par le socket X). Quand XDamage est
+    disponible, damage() renvoie les rectangles redessinés depuis la
+    capture précédente et le streamer n'a plus à comparer les pixels.
+    """
+
+    pixel_format = PIXEL_FORMAT_BGRA
+
+    def __init__(self, monitor_manager, display: str = None):
+        """Initialise le backend.
+
+        Args:
+            monitor_manager: Instance de MonitorManager (moniteur sélectionné)
+            display: Nom du display X (variable DISPLAY par défaut)
+        """
+        super().__init__(monitor_manager)
+        self.display_name = display
+        self._lock = threading.Lock()
+        self._display = None
+        self._root = 0
+        self._screen = 0
+        self._image = None
+        self._shminfo = None
+        self._buffer = None
+        self._region = None
+        self._damage_handle = 0
+        self._damage_region = 0
+        self._damage = None
+        self._retry_at = 0.0
+        self._failing = False
+
+        # Stats
+        self.damage_rects = 0
+
+    @staticmethod
+    def is_supported(display: str = None) -> bool:
+        """Vérifie que le display X est joignable et dispose de MIT-SHM.
+
+        Args:
+            display: Nom du display X (variable DISPLAY par défaut)
+
+        Returns:
+            True si la capture par mémoire partagée est utilisable
+        """
+        if _xlib is None or not (display or os.environ.get('DISPLAY')):
+            return False
+        handle = _xlib.XOpenDisplay(display.encode() if display else None)
+        if not handle:
+            return False
+        try:
+            return bool(_xlib.XShmQueryExtension(handle))
+        finally:
+            _xlib.XCloseDisplay(handle)
+
+    @property
+    def has_damage(self) -> bool:
+        """True si les zones modifiées sont suivies par XDamage."""
+        return bool(self._damage_handle)
+
+    def open(self):
+        """Ouvre la connexion X et le segment partagé."""
+        with self._lock:
+            if self._display is None:
+                self._open_display()
+
+    def close(self):
+        """Libère le segment partagé, XDamage et la connexion X."""
+        with self._lock:
+            self._close_display()
+
+    def grab(self) -> np.ndarray:
+        """Capture le moniteur sélectionné dans le segment partagé.
+
+        Returns:
+            Frame BGRA, ou None si la capture est momentanément indisponible
+        """
+        with self._lock:
+            if self._display is None and not self._open_display():
+                return None
+
+            region = self._capture_region()
+            if region != self._region:
+                # Changement de moniteur ou de résolution : nouveau segment
+                self._destroy_image()
+                if not self._create_image(region):
+                    self._fail("failed to allocate shared memory image")
+                    return None
+                self._damage = None
+            elif self._damage_handle:
+                self._damage = self._collect_damage()
+            else:
+                self._damage = None
+
+            x, y, _, _ = region
+            _last_x_error[0] = 0
+            ok = _xlib.XShmGetImage(self._display, self._root, self._image, x, y, _ALL_PLANES)
+            if not ok or _last_x_error[0]:
+                self._fail(f"XShmGetImage failed (error {_last_x_error[0]})")
+                return None
+
+            self.grab_count += 1
+            self._failing = False
+            # Le segment est réécrit à la capture suivante : copie dans un buffer du pool
+            frame = self.frame_pool.acquire(self._buffer.shape)
+            np.copyto(frame, self._buffer)
+            return frame
+
+    def damage(self):
+        """Zones redessinées depuis la capture précédente (None sans XDamage)."""
+        return self._damage
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques du backend."""
+        stats = super().get_stats()
+        stats['xdamage'] = self.has_damage
+        stats['damage_rects'] = self.damage_rects
+        return stats
+
+    def _fail(self, message: str):
+        """Compte une erreur, ferme la connexion et programme une nouvelle tentative."""
+        self.error_count += 1
+        log = logger.debug if self._failing else logger.warning
+        log(f"X11 capture error: {message}")
+        self._failing = True
+        self._close_display()
+        self._retry_at = time.monotonic() + RETRY_DELAY
+
+    def _open_display(self) -> bool:
+        """Ouvre la connexion X et active XDamage (avec délai entre deux échecs)."""
+        if _xlib is None or time.monotonic() < self._retry_at:
+            return False
+        name = self.display_name.encode() if self.display_name else None
+        display = _xlib.XOpenDisplay(name)
+        if not display:
+            self._fail(f"cannot open display {self.display_name or os.environ.get('DISPLAY')}")
+            return False
+        if not _xlib.XShmQueryExtension(display):
+            _xlib.XCloseDisplay(display)
+            self._fail("MIT-SHM extension not available")
+            return False
+
+        _xlib.XSetErrorHandler(_on_x_error)
+        self._display = display
+        self._screen = _xlib.XDefaultScreen(display)
+        self._root = _xlib.XRootWindow(display, self._screen)
+        self._region = None
+        self._open_damage()
+        logger.info(f"X11 shared memory capture ready (xdamage={self.has_damage})")
+        return True
+
+    def _open_damage(self):
+        """Abonne la fenêtre racine à XDamage si l'extension est présente."""
+        if not _xlib.has_damage:
+            return
+        event_base, error_base = ctypes.c_int(), ctypes.c_int()
+        major, minor = ctypes.c_int(1), ctypes.c_int(1)
+        if not _xlib.XDamageQueryExtension(self._display, ctypes.byref(event_base), ctypes.byref(error_base)):
+            return
+        # Les versions doivent être négociées avant toute requête
+        _xlib.XFixesQueryVersion(self._display, ctypes.byref(ctypes.c_int(5)), ctypes.byref(ctypes.c_int(0)))
+        _xlib.XDamageQueryVersion(self._display, ctypes.byref(major), ctypes.byref(minor))
+        self._damage_handle = _xlib.XDamageCreate(self._display, self._root, _XDAMAGE_REPORT_NON_EMPTY)
+        self._damage_region = _xlib.XFixesCreateRegion(self._display, None, 0)
+
+    def _collect_damage(self) -> list:
+        """Récupère et vide la région endommagée, en coordonnées de la frame.
+
+        Appelé avant XShmGetImage : un dessin intervenu entre les deux
+        figure à la fois dans l'image et dans la région suivante.
+        """
+        display = self._display
+        # Vider la file d'événements (un DamageNotify par passage à non vide)
+        event = ctypes.create_string_buffer(_XEVENT_SIZE)
+        while _xlib.XPending(display):
+            _xlib.XNextEvent(display, event)
+
+        _xlib.XDamageSubtract(display, self._damage_handle, 0, self._damage_region)
+        count = ctypes.c_int()
+        rects = _xlib.XFixesFetchRegion(display, self._damage_region, ctypes.byref(count))
+        if not rects:
+            return None
+        left, top, width, height = self._region
+        damage = []
+        try:
+            for k in range(count.value):
+                r = rects[k]
+                x0, y0 = max(r.x - left, 0), max(r.y - top, 0)
+                x1, y1 = min(r.x + r.width - left, width), min(r.y + r.height - top, height)
+                if x1 > x0 and y1 > y0:
+                    damage.append((x0, y0, x1 - x0, y1 - y0))
+        finally:
+            _xlib.XFree(rects)
+        self.damage_rects += len(damage)
+        return damage
+
+    def _capture_region(self) -> tuple:
+        """Zone (x, y, largeur, hauteur) du moniteur sélectionné sur l'écran X."""
+        screen_w = _xlib.XDisplayWidth(self._display, self._screen)
+        screen_h = _xlib.XDisplayHeight(self._display, self._screen)
+        bbox = self.monitor_manager.get_capture_bbox()
+        if not bbox:
+            return 0, 0, screen_w, screen_h
+        left, top = max(0, bbox[0]), max(0, bbox[1])
+        right, bottom = min(screen_w, bbox[2]), min(screen_h, bbox[3])
+        if right <= left or bottom <= top:
+            return 0, 0, screen_w, screen_h
+        return left, top, right - left, bottom - top
+
+    def _create_image(self, region: tuple) -> bool:
+        """Alloue l'XImage et son segment partagé pour la zone donnée."""
+        _, _, width, height = region
+        display, screen = self._display, self._screen
+        shminfo = _XShmSegmentInfo()
+        image = _xlib.XShmCreateImage(
+            display, _xlib.XDefaultVisual(display, screen), _xlib.XDefaultDepth(display, screen),
+            _ZPIXMAP, None, ctypes.byref(shminfo), width, height,
+        )
+        if not image:
+            return False
+        info = image.contents
+        if info.bits_per_pixel != 32:
+            logger.warning(f"Unsupported X11 pixel depth: {info.bits_per_pixel} bpp")
+            _xlib.XDestroyImage(image)
+            return False
+
+        size = info.bytes_per_line * height
+        shminfo.shmid = _xlib.shmget(_IPC_PRIVATE, size, _IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            _xlib.XDestroyImage(image)
+            return False
+        address = _xlib.shmat(shminfo.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            _xlib.shmctl(shminfo.shmid, _IPC_RMID, None)
+            _xlib.XDestroyImage(image)
+            return False
+        shminfo.shmaddr = address
+        shminfo.readOnly = 0
+        info.data = address
+
+        _last_x_error[0] = 0
+        _xlib.XShmAttach(display, ctypes.byref(shminfo))
+        _xlib.XSync(display, 0)
+        # Le segment sera détruit automatiquement quand les deux côtés l'auront détaché
+        _xlib.shmctl(shminfo.shmid, _IPC_RMID, None)
+        if _last_x_error[0]:
+            info.data = None
+            _xlib.XDestroyImage(image)
+            _xlib.shmdt(address)
+            return False
+
+        raw = (ctypes.c_ubyte * size).from_address(address)
+        pixels = np.ctypeslib.as_array(raw).reshape(height, info.bytes_per_line // 4, 4)
+        self._buffer = pixels[:, :width]
+        self._image = image
+        self._shminfo = shminfo
+        self._region = region
+        return True
+
+    def _destroy_image(self):
+        """Détache et libère le segment partagé courant."""
+        if self._image is None:
+            return
+        self._buffer = None
+        _xlib.XShmDetach(self._display, ctypes.byref(self._shminfo))
+        _xlib.XSync(self._display, 0)
+        # Les données appartiennent au segment : XDestroyImage ne doit pas les libérer
+        self._image.contents.data = None
+        _xlib.XDestroyImage(self._image)
+        _xlib.shmdt(self._shminfo.shmaddr)
+        self._image = None
+        self._shminfo = None
+        self._region = None
+
+    def _close_display(self):
+        """Ferme la connexion X sans prendre le verrou."""
+        if self._display is None:
+            return
+        try:
+            self._destroy_image()
+            if self._damage_handle:
+                _xlib.XDamageDestroy(self._display, self._damage_handle)
+                _xlib.XFixesDestroyRegion(self._display, self._damage_region)
+            _xlib.XCloseDisplay(self._display)
+        except Exception as e:
+            logger.debug(f"Error closing X11 capture: {e}")
+        self._display = None
+        self._damage_handle = 0
+        self._damage_region = 0
+        self._damage = None
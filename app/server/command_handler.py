@@ -4,10 +4,16 @@ Gestionnaire de commandes - Exécution des commandes souris et clavier
 import platform
 import time
 import logging
-from pynput.mouse import Controller as MouseController, Button
-from pynput.keyboard import Controller as KeyboardController
 import os
 
+try:
+    from pynput.mouse import Controller as MouseController, Button
+    from pynput.keyboard import Controller as KeyboardController
+    HAS_PYNPUT = True
+except ImportError:
+    # pynput exige un serveur d'affichage sous Linux (machine headless)
+    HAS_PYNPUT = False
+
 from .keyboard_utils import (
     get_pynput_key,
     press_arrow_key_windows,
@@ -36,7 +42,7 @@ class CommandHandler:
         "left": Button.left,
         "right": Button.right,
         "middle": Button.middle
-    }
+    } if HAS_PYNPUT else {}
     
     def __init__(self, screen_width: int = 1920, screen_height: int = 1080):
         """Initialise le gestionnaire de commandes.
@@ -45,8 +51,8 @@ class CommandHandler:
             screen_width: Largeur de l'écran pour le calcul des coordonnées
             screen_height: Hauteur de l'écran pour le calcul des coordonnées
         """
-        self.mouse = MouseController()
-        self.keyboard = KeyboardController()
+        self.mouse = MouseController() if HAS_PYNPUT else None
+        self.keyboard = KeyboardController() if HAS_PYNPUT else None
         self.screen_width = screen_width
         self.screen_height = screen_height
         # Offset of the current capture region (left, top) in global coordinates
@@ -89,6 +95,10 @@ class CommandHandler:
         """
         cmd_type = command.get('type')
         
+        if not HAS_PYNPUT:
+            logger.debug(f"pynput unavailable, ignoring {cmd_type} command")
+            return
+        
         if cmd_type == 'mouse':
             self._handle_mouse(command)
         elif cmd_type == 'key':
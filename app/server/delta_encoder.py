@@ -0,0 +1,171 @@
+"""
+Encodeur delta - Frame de référence d'un flux en mode keyframes + deltas
+"""
+import threading
+from typing import Optional
+
+import numpy as np
+
+from ..common.delta_codec import DELTA_BLOCK, pack_delta
+
+# Débit (bits par pixel de la tuile) au-delà duquel le JPEG est préféré au delta
+DELTA_MAX_BPP = 3.0
+# Fraction de tuiles modifiées à partir de laquelle on envoie une keyframe
+SCENE_CHANGE_FRACTION = 0.6
+
+
+class DeltaEncoder:
+    """Suit le contenu envoyé au client pour coder les tuiles en delta.
+
+    La référence est la frame source (non compressée) telle qu'envoyée :
+    une keyframe la remplace entièrement, chaque tuile encodée (delta ou
+    JPEG) la met à jour. Les tuiles dont le message a été abandonné avant
+    envoi sont invalidées et repartent en JPEG. Une tuile dont le delta
+    était trop gros (vidéo, photo) reste en JPEG jusqu'à la keyframe
+    suivante, sans retenter la compression à chaque frame.
+    """
+
+    def __init__(self, tile_size: int, block: int = DELTA_BLOCK):
+        """Initialise l'encodeur.
+
+        Args:
+            tile_size: Côté des tuiles de la grille du comparateur
+            block: Côté des blocs delta en pixels
+        """
+        self.tile_size = tile_size
+        self.block = block
+        self._reference = None
+        self._invalid = None  # Masque des tuiles dont la référence n'est plus fiable
+        self._jpeg = None  # Masque des tuiles dont le delta ne vaut pas le JPEG
+        self._lock = threading.Lock()  # Les bandes sont encodées en parallèle
+
+        # Stats
+        self.keyframes = 0
+        self.delta_tiles = 0
+        self.delta_bytes = 0
+        self.fallback_tiles = 0
+
+    def keyframe(self, frame: np.ndarray):
+        """Prend une frame complète comme nouvelle référence.
+
+        Args:
+            frame: Frame BGR envoyée en keyframe
+        """
+        if self._reference is None or self._reference.shape != frame.shape:
+            self._reference = frame.copy()
+        else:
+            np.copyto(self._reference, frame)
+        with self._lock:
+            self._invalid = None
+            self._jpeg = None
+            self.keyframes += 1
+
+    def is_scene_change(self, dirty: np.ndarray) -> bool:
+        """Indique si la frame change trop pour qu'un delta soit rentable."""
+        return float(dirty.mean()) >= SCENE_CHANGE_FRACTION
+
+    def invalidate(self, mask: np.ndarray):
+        """Marque des tuiles jamais envoyées : elles seront renvoyées en JPEG.
+
+        Args:
+            mask: Masque booléen (lignes, colonnes) des tuiles
+        """
+        with self._lock:
+            if self._invalid is None or self._invalid.shape != mask.shape:
+                self._invalid = mask.copy()
+            else:
+                self._invalid |= mask
+
+    def encode(self, frame: np.ndarray, x: int, y: int, w: int, h: int) -> Optional[bytes]:
+        """Encode un rectangle en delta et met à jour la référence.
+
+        Args:
+            frame: Frame BGR courante
+            x, y, w, h: Rectangle (aligné sur la grille de tuiles)
+
+        Returns:
+            Données delta, b'' si le rectangle n'a pas changé, ou None si le
+            rectangle doit être envoyé en JPEG (référence invalide, delta trop gros)
+        """
+        reference = self._reference
+        if reference is None or reference.shape != frame.shape or self._use_jpeg(x, y, w, h):
+            self._update(frame, x, y, w, h)
+            return None
+        current = frame[y:y + h, x:x + w]
+        data = pack_delta(current, reference[y:y + h, x:x + w], self.block)
+        reference[y:y + h, x:x + w] = current
+        if data is None:
+            return b''
+        if len(data) * 8 > DELTA_MAX_BPP * w * h:
+            with self._lock:
+                self.fallback_tiles += 1
+                if self._jpeg is None:
+                    self._jpeg = np.zeros(self._grid(frame.shape), dtype=bool)
+                self._tiles(self._jpeg, x, y, w, h)[:] = True
+            return None
+        with self._lock:
+            self.delta_tiles += 1
+            self.delta_bytes += len(data)
+        return data
+
+    def update(self, frame: np.ndarray, x: int, y: int, w: int, h: int):
+        """Met à jour la référence d'un rectangle envoyé autrement qu'en delta (cache de tuiles).
+
+        Args:
+            frame: Frame BGR courante
+            x, y, w, h: Rectangle (aligné sur la grille de tuiles)
+        """
+        # Le rectangle est de nouveau connu du client : l'invalidation tombe
+        self._use_jpeg(x, y, w, h)
+        self._update(frame, x, y, w, h)
+
+    def move(self, src_x: int, src_y: int, x: int, y: int, w: int, h: int):
+        """Applique à la référence la copie de bloc envoyée au client (défilement).
+
+        Args:
+            src_x, src_y: Position du bloc source
+            x, y, w, h: Rectangle de destination
+        """
+        if self._reference is not None:
+            self._reference[y:y + h, x:x + w] = self._reference[src_y:src_y + h, src_x:src_x + w]
+
+    def _grid(self, shape: tuple) -> tuple:
+        """Nombre de tuiles (lignes, colonnes) d'une frame."""
+        ts = self.tile_size
+        return (shape[0] + ts - 1) // ts, (shape[1] + ts - 1) // ts
+
+    def _tiles(self, mask: np.ndarray, x: int, y: int, w: int, h: int) -> np.ndarray:
+        """Vue du masque sur les tuiles couvertes par un rectangle."""
+        ts = self.tile_size
+        return mask[y // ts:(y + h - 1) // ts + 1, x // ts:(x + w - 1) // ts + 1]
+
+    def _use_jpeg(self, x: int, y: int, w: int, h: int) -> bool:
+        """Indique si le rectangle doit partir en JPEG (tuile invalidée, revalidée au passage)."""
+        with self._lock:
+            use_jpeg = False
+            if self._invalid is not None:
+                tiles = self._tiles(self._invalid, x, y, w, h)
+                use_jpeg = bool(tiles.any())
+                tiles[:] = False
+            if self._jpeg is not None:
+                use_jpeg = use_jpeg or bool(self._tiles(self._jpeg, x, y, w, h).any())
+            return use_jpeg
+
+    def _update(self, frame: np.ndarray, x: int, y: int, w: int, h: int):
+        """Recopie un rectangle envoyé en JPEG dans la référence."""
+        if self._reference is not None and self._reference.shape == frame.shape:
+            self._reference[y:y + h, x:x + w] = frame[y:y + h, x:x + w]
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques de l'encodeur.
+
+        Returns:
+            Dictionnaire {keyframes, delta_tiles, delta_bytes, fallback_tiles}
+        """
+        with self._lock:
+            return {
+                'keyframes': self.keyframes,
+                'delta_tiles': self.delta_tiles,
+                'delta_bytes': self.delta_bytes,
+                'fallback_tiles': self.fallback_tiles,
+            }
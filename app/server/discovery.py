@@ -15,13 +15,15 @@ logger = logging.getLogger("screenshare.server.discovery")
 class DiscoveryBroadcaster:
     """Gère le broadcast UDP pour annoncer le serveur sur le réseau."""
     
-    def __init__(self, sharer_name: str = "Unknown"):
+    def __init__(self, sharer_name: str = "Unknown", multicast: dict = None):
         """Initialise le broadcaster.
         
         Args:
             sharer_name: Nom affiché pour la découverte réseau
+            multicast: Groupe multicast du flux vidéo {group, port, ttl} (None = unicast seul)
         """
         self.sharer_name = sharer_name
+        self.multicast = multicast
         self._socket = None
         self._thread = None
         self._running = False
@@ -115,13 +117,16 @@ class DiscoveryBroadcaster:
         Args:
             local_ip: Adresse IP locale à annoncer
         """
-        announcement = json.dumps({
+        announcement = {
             "type": "screen_share_announcement",
             "name": self.sharer_name,
             "ip": local_ip,
             "port": COMMAND_PORT,
             "video_port": VIDEO_PORT
-        })
+        }
+        if self.multicast:
+            announcement["multicast"] = self.multicast
+        announcement = json.dumps(announcement)
         
         data = announcement.encode('utf-8')
         
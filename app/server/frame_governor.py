@@ -0,0 +1,178 @@
+"""
+Régulateur de fréquence d'images - Cadence de capture sans dérive et adaptative
+"""
+import time
+import logging
+
+from ..config import TARGET_FPS, MIN_FPS, MAX_FPS
+
+logger = logging.getLogger("screenshare.server.frame_governor")
+
+# Fraction de frames inchangées au-delà de laquelle l'écran est considéré statique
+IDLE_RATIO = 0.9
+# Fraction de frames modifiées et de tuiles modifiées caractérisant un contenu animé
+MOTION_RATIO = 0.8
+MOTION_DIRTY_FRACTION = 0.25
+# Fraction d'échéances manquées (ou de captures écrasées) qui fait ralentir
+MISS_RATIO = 0.1
+# Facteurs d'ajustement de la cadence
+SLOWDOWN = 0.8
+SPEEDUP = 1.25
+
+
+class FrameRateGovernor:
+    """Cadence la boucle de capture sur des échéances d'horloge monotone.
+
+    Chaque échéance est calculée à partir de la précédente (et non de la fin
+    du travail), si bien que la cadence ne dérive pas. Une échéance manquée
+    n'est pas rattrapée par une rafale : la suivante repart de l'instant
+    présent.
+
+    La cadence est réévaluée sur des fenêtres de `window` secondes à partir
+    de l'activité rapportée par le streamer :
+        écran statique       -> descend vers min_fps
+        échéances manquées   -> ralentit (le pipeline ne suit pas)
+        contenu très animé   -> monte vers max_fps
+        sinon                -> revient vers target_fps
+    """
+
+    def __init__(self, target_fps: float = TARGET_FPS, min_fps: float = MIN_FPS,
+                 max_fps: float = MAX_FPS, window: float = 0.5):
+        """Initialise le régulateur.
+
+        Args:
+            target_fps: Cadence visée en régime normal
+            min_fps: Cadence minimale (écran statique, pipeline saturé)
+            max_fps: Cadence maximale (contenu très animé)
+            window: Durée en secondes d'une fenêtre d'évaluation
+        """
+        self.target_fps = float(target_fps)
+        self.min_fps = min(float(min_fps), self.target_fps)
+        self.max_fps = max(float(max_fps), self.target_fps)
+        self.window = window
+        self.current_fps = self.target_fps
+        self._interval = 1.0 / self.current_fps
+        self._deadline = None
+
+        # Fenêtre d'évaluation en cours
+        self._window_start = None
+        self._window_ticks = 0
+        self._window_misses = 0
+        self._last_activity = None
+
+        # Stats
+        self.achieved_fps = 0.0
+        self.tick_count = 0
+        self.deadline_misses = 0
+        self.state = 'normal'
+
+    def reset(self):
+        """Repart de la cadence cible (début de streaming)."""
+        self._set_fps(self.target_fps)
+        self._deadline = None
+        self._window_start = None
+        self._window_ticks = 0
+        self._window_misses = 0
+        self._last_activity = None
+        self.achieved_fps = 0.0
+        self.tick_count = 0
+        self.deadline_misses = 0
+        self.state = 'normal'
+
+    def wait(self):
+        """Attend l'échéance de la prochaine capture."""
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = now
+            self._window_start = now
+        self.tick_count += 1
+        self._window_ticks += 1
+
+        self._deadline += self._interval
+        delay = self._deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        elif -delay >= self._interval:
+            # Capture + dépôt ont dépassé une période entière : on saute l'échéance
+            self.deadline_misses += 1
+            self._window_misses += 1
+            self._deadline = now
+
+    def adapt(self, activity: dict):
+        """Réévalue la cadence si la fenêtre d'évaluation est écoulée.
+
+        Args:
+            activity: Compteurs cumulés du streamer {changed, unchanged,
+                drops, dirty_sum, dirty_samples}
+        """
+        now = time.monotonic()
+        if self.state == 'idle' and self._last_activity is not None \
+                and activity['changed'] > self._last_activity['changed']:
+            # Reprise d'activité : ne pas attendre la fin de la fenêtre
+            logger.debug(f"Frame rate idle -> normal: {self.current_fps:.1f} -> {self.target_fps:.1f} fps")
+            self.state = 'normal'
+            self._set_fps(self.target_fps)
+            self._last_activity = dict(activity)
+            self._window_start = now
+            self._window_ticks = 0
+            self._window_misses = 0
+            return
+        if self._window_start is None or now - self._window_start < self.window:
+            return
+        elapsed = now - self._window_start
+        self.achieved_fps = self._window_ticks / elapsed
+
+        previous = self._last_activity or dict.fromkeys(activity, 0)
+        delta = {key: activity[key] - previous.get(key, 0) for key in activity}
+        self._last_activity = dict(activity)
+        ticks = max(1, self._window_ticks)
+        misses = self._window_misses
+        self._window_start = now
+        self._window_ticks = 0
+        self._window_misses = 0
+
+        frames = delta['changed'] + delta['unchanged']
+        if frames == 0:
+            # Aucune frame n'a atteint l'encodeur pendant la fenêtre
+            return
+        changed_ratio = delta['changed'] / frames
+        dirty = delta['dirty_sum'] / delta['dirty_samples'] if delta['dirty_samples'] else 1.0
+        saturated = (misses + delta['drops']) / ticks >= MISS_RATIO
+
+        if saturated:
+            state, fps = 'saturated', max(self.min_fps, self.current_fps * SLOWDOWN)
+        elif delta['unchanged'] / frames >= IDLE_RATIO:
+            state, fps = 'idle', max(self.min_fps, self.current_fps * SLOWDOWN)
+        elif changed_ratio >= MOTION_RATIO and dirty >= MOTION_DIRTY_FRACTION:
+            state, fps = 'motion', min(self.max_fps, max(self.target_fps, self.current_fps * SPEEDUP))
+        elif self.state in ('saturated', 'recovering') and self.current_fps < self.target_fps:
+            # Remonter progressivement pour ne pas resaturer le pipeline aussitôt
+            state, fps = 'recovering', min(self.target_fps, self.current_fps * SPEEDUP)
+        else:
+            # Contenu qui change : revenir immédiatement à la cadence cible
+            state, fps = 'normal', self.target_fps
+
+        if state != self.state:
+            logger.debug(f"Frame rate {self.state} -> {state}: {self.current_fps:.1f} -> {fps:.1f} fps")
+        self.state = state
+        self._set_fps(fps)
+
+    def _set_fps(self, fps: float):
+        """Change la cadence courante (effective dès la prochaine échéance)."""
+        self.current_fps = fps
+        self._interval = 1.0 / fps
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques de cadence.
+
+        Returns:
+            Dictionnaire {target_fps, current_fps, achieved_fps, deadline_misses, state}
+            où state vaut normal, idle, motion, saturated ou recovering
+        """
+        return {
+            'target_fps': self.target_fps,
+            'current_fps': round(self.current_fps, 1),
+            'achieved_fps': round(self.achieved_fps, 1),
+            'deadline_misses': self.deadline_misses,
+            'state': self.state,
+        }
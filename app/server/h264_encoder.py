@@ -0,0 +1,126 @@
+"""
+Encodeur H.264 - Flux vidéo logiciel (PyAV / libx264) pour les liens lents
+
+Chaque frame devient une unité d'accès H.264 au format Annex B, envoyée
+comme tuile unique TILE_CODEC_H264 par le transport fragmenté. Les
+keyframes (IDR) ne sont produites qu'à la demande : rafraîchissement
+périodique, nouveau client, perte signalée par un client.
+"""
+import logging
+from fractions import Fraction
+
+import numpy as np
+
+try:
+    import av
+    HAS_PYAV = True
+except ImportError:
+    # PyAV est optionnel : sans lui, le mode H.264 n'est pas proposé
+    HAS_PYAV = False
+
+from ..config import ENCODER_THREADS
+
+logger = logging.getLogger("screenshare.server.h264")
+
+# Préréglages x264 : encodage le plus rapide, aucune frame retardée (pas de B-frames)
+H264_PRESET = 'ultrafast'
+H264_TUNE = 'zerolatency'
+
+
+def quality_to_crf(quality: int) -> int:
+    """Convertit une qualité JPEG (1-100) en CRF x264 de qualité perçue voisine."""
+    return int(round(min(51, max(0, 18 + (90 - quality) * 0.35))))
+
+
+class H264Encoder:
+    """Encodeur libx264 d'un niveau de flux, sur CPU uniquement."""
+
+    def __init__(self, quality: int, fps: float):
+        """Initialise l'encodeur (le contexte est créé à la première frame).
+
+        Args:
+            quality: Qualité JPEG équivalente du niveau
+            fps: Cadence nominale (aide au contrôle de débit de x264)
+        """
+        if not HAS_PYAV:
+            raise RuntimeError("PyAV is not installed")
+        self.crf = quality_to_crf(quality)
+        self.fps = fps
+        self._codec = None
+        self._size = None
+        self._pts = 0
+
+        # Stats
+        self.frames = 0
+        self.keyframes = 0
+        self.bytes = 0
+
+    def _open(self, width: int, height: int):
+        """Crée le contexte libx264 pour une taille de frame."""
+        codec = av.CodecContext.create('libx264', 'w')
+        codec.width = width
+        codec.height = height
+        codec.pix_fmt = 'yuv420p'
+        codec.time_base = Fraction(1, 1000)
+        codec.framerate = Fraction(int(round(self.fps)), 1)
+        # Pas de GOP fixe : les IDR sont demandées explicitement
+        codec.gop_size = 1 << 30
+        codec.thread_count = max(1, ENCODER_THREADS)
+        codec.options = {
+            'preset': H264_PRESET,
+            'tune': H264_TUNE,
+            'crf': str(self.crf),
+        }
+        codec.open()
+        self._codec = codec
+        self._size = (width, height)
+        logger.info(f"H.264 encoder opened: {width}x{height} crf={self.crf} preset={H264_PRESET}")
+
+    def encode(self, frame: np.ndarray, keyframe: bool = False, timestamp_ms: int = None) -> tuple:
+        """Encode une frame BGR.
+
+        Args:
+            frame: Frame BGR (largeur et hauteur paires)
+            keyframe: Force une IDR
+            timestamp_ms: Horodatage de la capture en millisecondes
+
+        Returns:
+            Tuple (unité d'accès Annex B, True si IDR)
+        """
+        height, width = frame.shape[:2]
+        if self._size != (width, height):
+            self.close()
+            self._open(width, height)
+            keyframe = True
+
+        video_frame = av.VideoFrame.from_ndarray(frame, format='bgr24')
+        self._pts = max(self._pts + 1, timestamp_ms or 0)
+        video_frame.pts = self._pts
+        if keyframe:
+            video_frame.pict_type = av.video.frame.PictureType.I
+
+        packets = self._codec.encode(video_frame)
+        data = b''.join(bytes(packet) for packet in packets)
+        is_keyframe = any(packet.is_keyframe for packet in packets)
+        self.frames += 1
+        self.keyframes += int(is_keyframe)
+        self.bytes += len(data)
+        return data, is_keyframe
+
+    def close(self):
+        """Libère le contexte libx264."""
+        self._codec = None
+        self._size = None
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques de l'encodeur.
+
+        Returns:
+            Dictionnaire {frames, keyframes, bytes, crf}
+        """
+        return {
+            'frames': self.frames,
+            'keyframes': self.keyframes,
+            'bytes': self.bytes,
+            'crf': self.crf,
+        }
@@ -0,0 +1,160 @@
+"""
+Encodeurs JPEG - Backends d'encodage des tuiles et des frames brutes
+
+Deux backends sont disponibles :
+
+- turbojpeg : PyTurboJPEG (libjpeg-turbo), accepte directement les frames
+  BGRA de la capture, ce qui évite la conversion BGRA -> BGR ;
+- opencv : cv2.imencode, sur des frames BGR.
+
+Les deux exposent le sous-échantillonnage de la chrominance (4:2:0, 4:2:2,
+4:4:4). Ni le codage Huffman optimisé ni le mode progressif ne sont
+utilisés : ils coûtent une seconde passe sur chaque tuile pour quelques
+pour cent d'octets, et le progressif n'apporte rien à une tuile décodée
+d'un bloc.
+"""
+import logging
+from typing import Optional
+
+import cv2
+import numpy as np
+
+try:
+    from turbojpeg import (
+        TurboJPEG, TJPF_BGR, TJPF_BGRA, TJSAMP_420, TJSAMP_422, TJSAMP_444, TJFLAG_FASTDCT,
+    )
+    HAS_TURBOJPEG = True
+except ImportError:
+    # PyTurboJPEG est optionnel : sans lui, encodage par OpenCV
+    HAS_TURBOJPEG = False
+
+from ..config import JPEG_BACKEND, JPEG_FAST_DCT, JPEG_SUBSAMPLING
+
+logger = logging.getLogger("screenshare.server.jpeg")
+
+SUBSAMPLINGS = ('420', '422', '444')
+
+_CV2_SAMPLING = {
+    '420': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+    '422': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+    '444': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444,
+}
+
+
+class OpenCVJpegEncoder:
+    """Encodeur cv2.imencode (frames BGR uniquement)."""
+
+    name = 'opencv'
+    accepts_bgra = False
+
+    def __init__(self, subsampling: str = '420', fast_dct: bool = True):
+        """Initialise l'encodeur.
+
+        Args:
+            subsampling: Sous-échantillonnage de la chrominance ('420', '422', '444')
+            fast_dct: Ignoré (OpenCV ne permet pas de choisir la DCT)
+        """
+        self.subsampling = subsampling
+        self.fast_dct = False
+        self._params = [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, _CV2_SAMPLING[subsampling]]
+
+    def encode(self, image: np.ndarray, quality: int) -> Optional[bytes]:
+        """Encode une image BGR.
+
+        Args:
+            image: Image BGR (une vue sur une tuile convient)
+            quality: Qualité JPEG (1-100)
+
+        Returns:
+            Bytes JPEG, ou None en cas d'erreur
+        """
+        encoded, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)] + self._params)
+        if not encoded:
+            return None
+        return buffer.tobytes()
+
+
+class TurboJpegEncoder:
+    """Encodeur libjpeg-turbo (frames BGR ou BGRA)."""
+
+    name = 'turbojpeg'
+    accepts_bgra = True
+
+    def __init__(self, subsampling: str = '420', fast_dct: bool = True):
+        """Initialise l'encodeur.
+
+        Args:
+            subsampling: Sous-échantillonnage de la chrominance ('420', '422', '444')
+            fast_dct: DCT entière rapide (légèrement moins précise)
+
+        Raises:
+            RuntimeError: Si PyTurboJPEG ou la bibliothèque libturbojpeg est absente
+        """
+        if not HAS_TURBOJPEG:
+            raise RuntimeError("PyTurboJPEG is not installed")
+        try:
+            self._turbo = TurboJPEG()
+        except (OSError, RuntimeError) as e:
+            raise RuntimeError(f"libturbojpeg could not be loaded: {e}")
+        self.subsampling = subsampling
+        self.fast_dct = fast_dct
+        self._subsample = {'420': TJSAMP_420, '422': TJSAMP_422, '444': TJSAMP_444}[subsampling]
+        self._flags = TJFLAG_FASTDCT if fast_dct else 0
+
+    def encode(self, image: np.ndarray, quality: int) -> Optional[bytes]:
+        """Encode une image BGR ou BGRA.
+
+        Args:
+            image: Image BGR ou BGRA (une vue sur une tuile convient : le
+                pas des lignes est transmis à libjpeg-turbo)
+            quality: Qualité JPEG (1-100)
+
+        Returns:
+            Bytes JPEG, ou None en cas d'erreur
+        """
+        pixel_format = TJPF_BGRA if image.shape[2] == 4 else TJPF_BGR
+        try:
+            return self._turbo.encode(
+                image, quality=int(quality), pixel_format=pixel_format,
+                jpeg_subsample=self._subsample, flags=self._flags,
+            )
+        except (OSError, ValueError) as e:
+            logger.debug(f"TurboJPEG encode failed: {e}")
+            return None
+
+
+def create_jpeg_encoder(name: str = None, subsampling: str = None, fast_dct: bool = None):
+    """Crée l'encodeur JPEG demandé.
+
+    Args:
+        name: Backend (SS_JPEG_BACKEND par défaut) ; 'auto' choisit
+            libjpeg-turbo s'il est utilisable, sinon OpenCV
+        subsampling: Sous-échantillonnage (SS_JPEG_SUBSAMPLING par défaut)
+        fast_dct: DCT rapide (SS_JPEG_FAST_DCT par défaut)
+
+    Returns:
+        Instance de OpenCVJpegEncoder ou TurboJpegEncoder
+    """
+    name = name or JPEG_BACKEND
+    subsampling = subsampling or JPEG_SUBSAMPLING
+    fast_dct = JPEG_FAST_DCT if fast_dct is None else fast_dct
+    if subsampling not in SUBSAMPLINGS:
+        logger.warning(f"Unknown JPEG subsampling '{subsampling}', using 420")
+        subsampling = '420'
+    if name not in ('auto', 'turbojpeg', 'opencv'):
+        logger.warning(f"Unknown JPEG backend '{name}', using auto")
+        name = 'auto'
+
+    if name in ('auto', 'turbojpeg') and HAS_TURBOJPEG:
+        try:
+            encoder = TurboJpegEncoder(subsampling, fast_dct)
+            logger.info(f"JPEG encoder: turbojpeg subsampling={subsampling} fast_dct={fast_dct}")
+            return encoder
+        except RuntimeError as e:
+            if name == 'turbojpeg':
+                logger.warning(f"{e}, falling back to OpenCV")
+    elif name == 'turbojpeg':
+        logger.warning("PyTurboJPEG is not installed, falling back to OpenCV")
+
+    logger.info(f"JPEG encoder: opencv subsampling={subsampling}")
+    return OpenCVJpegEncoder(subsampling, fast_dct)
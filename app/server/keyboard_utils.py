@@ -2,7 +2,13 @@
 Utilitaires clavier - Mapping des touches et gestion des touches spéciales
 """
 import platform
-from pynput.keyboard import Key
+
+try:
+    from pynput.keyboard import Key
+    HAS_PYNPUT = True
+except ImportError:
+    # pynput exige un serveur d'affichage sous Linux (machine headless)
+    HAS_PYNPUT = False
 
 # Import pour la gestion des touches spéciales sur Windows
 if platform.system() == 'Windows':
@@ -10,57 +16,59 @@ if platform.system() == 'Windows':
 
 
 # Mapping des touches spéciales vers pynput
-KEY_MAPPING = {
-    'enter': Key.enter,
-    'backspace': Key.backspace,
-    'tab': Key.tab,
-    'esc': Key.esc,
-    'space': Key.space,
-    'delete': Key.delete,
-    'home': Key.home,
-    'end': Key.end,
-    'left': Key.left,
-    'right': Key.right,
-    'up': Key.up,
-    'down': Key.down,
-    'arrow_left': Key.left,
-    'arrow_right': Key.right,
-    'arrow_up': Key.up,
-    'arrow_down': Key.down,
-    'page_up': Key.page_up,
-    'page_down': Key.page_down,
-    'shift': Key.shift_l,
-    'shift_l': Key.shift_l,
-    'shift_r': Key.shift_r,
-    'ctrl': Key.ctrl_l,
-    'ctrl_l': Key.ctrl_l,
-    'ctrl_r': Key.ctrl_r,
-    'alt': Key.alt_l,
-    'alt_l': Key.alt_l,
-    'alt_r': Key.alt_r,
-    'cmd': Key.cmd,
-    'cmd_l': Key.cmd,
-    'cmd_r': Key.cmd_r,
-    'win': Key.cmd,
-    'win_l': Key.cmd,
-    'win_r': Key.cmd_r,
-    'caps_lock': Key.caps_lock,
-    'insert': Key.insert,
-    'pause': Key.pause,
-    'print_screen': Key.print_screen,
-    'f1': Key.f1,
-    'f2': Key.f2,
-    'f3': Key.f3,
-    'f4': Key.f4,
-    'f5': Key.f5,
-    'f6': Key.f6,
-    'f7': Key.f7,
-    'f8': Key.f8,
-    'f9': Key.f9,
-    'f10': Key.f10,
-    'f11': Key.f11,
-    'f12': Key.f12,
-}
+KEY_MAPPING = {}
+if HAS_PYNPUT:
+    KEY_MAPPING.update({
+        'enter': Key.enter,
+        'backspace': Key.backspace,
+        'tab': Key.tab,
+        'esc': Key.esc,
+        'space': Key.space,
+        'delete': Key.delete,
+        'home': Key.home,
+        'end': Key.end,
+        'left': Key.left,
+        'right': Key.right,
+        'up': Key.up,
+        'down': Key.down,
+        'arrow_left': Key.left,
+        'arrow_right': Key.right,
+        'arrow_up': Key.up,
+        'arrow_down': Key.down,
+        'page_up': Key.page_up,
+        'page_down': Key.page_down,
+        'shift': Key.shift_l,
+        'shift_l': Key.shift_l,
+        'shift_r': Key.shift_r,
+        'ctrl': Key.ctrl_l,
+        'ctrl_l': Key.ctrl_l,
+        'ctrl_r': Key.ctrl_r,
+        'alt': Key.alt_l,
+        'alt_l': Key.alt_l,
+        'alt_r': Key.alt_r,
+        'cmd': Key.cmd,
+        'cmd_l': Key.cmd,
+        'cmd_r': Key.cmd_r,
+        'win': Key.cmd,
+        'win_l': Key.cmd,
+        'win_r': Key.cmd_r,
+        'caps_lock': Key.caps_lock,
+        'insert': Key.insert,
+        'pause': Key.pause,
+        'print_screen': Key.print_screen,
+        'f1': Key.f1,
+        'f2': Key.f2,
+        'f3': Key.f3,
+        'f4': Key.f4,
+        'f5': Key.f5,
+        'f6': Key.f6,
+        'f7': Key.f7,
+        'f8': Key.f8,
+        'f9': Key.f9,
+        'f10': Key.f10,
+        'f11': Key.f11,
+        'f12': Key.f12,
+    })
 
 # Liste des modificateurs
 MODIFIER_KEYS = (
@@ -0,0 +1,136 @@
+"""
+Pipeline vidéo - Buffers inter-étages « le plus récent gagne »
+"""
+import threading
+import time
+
+
+class LatestSlot:
+    """Buffer borné à une seule place entre deux étages du pipeline.
+
+    Un dépôt écrase l'élément en attente (compté comme perte) : l'étage
+    aval travaille toujours sur la donnée la plus récente et un étage lent
+    ne bloque jamais l'étage amont.
+    """
+
+    def __init__(self, name: str, merge=None, on_discard=None):
+        """Initialise le buffer.
+
+        Args:
+            name: Nom de l'étage (pour les statistiques)
+            merge: Fonction optionnelle merge(écrasé, nouveau) -> élément,
+                pour reporter dans le nouvel élément des informations de
+                l'élément écrasé (zones modifiées...)
+            on_discard: Fonction optionnelle on_discard(élément), appelée
+                pour l'élément en attente jeté par close() ou reset(), et pour
+                un élément déposé dans un buffer fermé (buffers à rendre...)
+        """
+        self.name = name
+        self._merge = merge
+        self._on_discard = on_discard
+        self._cond = threading.Condition()
+        self._item = None
+        self._has_item = False
+        self._closed = False
+
+        # Stats
+        self.put_count = 0
+        self.drop_count = 0
+
+    def put(self, item):
+        """Dépose un élément, en remplaçant celui en attente s'il existe.
+
+        Args:
+            item: Élément à transmettre à l'étage suivant
+
+        Returns:
+            L'élément écrasé (jamais consommé), ou None
+        """
+        with self._cond:
+            closed = self._closed
+        if closed:
+            # Plus aucun consommateur : l'élément ne serait jamais récupéré
+            self._discard(item)
+            return None
+        with self._cond:
+            displaced = None
+            if self._has_item:
+                self.drop_count += 1
+                displaced = self._item
+                if self._merge is not None:
+                    item = self._merge(displaced, item)
+            self._item = item
+            self._has_item = True
+            self.put_count += 1
+            self._cond.notify()
+            return displaced
+
+    def get(self, timeout: float = None):
+        """Récupère l'élément en attente.
+
+        Args:
+            timeout: Délai maximal d'attente en secondes (None = infini)
+
+        Returns:
+            L'élément, ou None si délai écoulé ou buffer fermé
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._has_item and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            if not self._has_item:
+                return None
+            item = self._item
+            self._item = None
+            self._has_item = False
+            return item
+
+    def close(self):
+        """Ferme le buffer, jette l'élément en attente et réveille les consommateurs."""
+        with self._cond:
+            self._closed = True
+            pending = self._take()
+            self._cond.notify_all()
+        self._discard(pending)
+
+    def reset(self):
+        """Réouvre le buffer (élément en attente jeté) et remet les compteurs à zéro."""
+        with self._cond:
+            self._closed = False
+            pending = self._take()
+            self.put_count = 0
+            self.drop_count = 0
+        self._discard(pending)
+
+    def _take(self):
+        """Retire l'élément en attente (sous le verrou) ; None s'il n'y en a pas."""
+        item = self._item if self._has_item else None
+        self._item = None
+        self._has_item = False
+        return item
+
+    def _discard(self, item):
+        """Transmet un élément jeté à on_discard (hors du verrou)."""
+        if item is not None and self._on_discard is not None:
+            self._on_discard(item)
+
+    @property
+    def depth(self) -> int:
+        """Nombre d'éléments en attente (0 ou 1)."""
+        return 1 if self._has_item else 0
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques du buffer.
+
+        Returns:
+            Dictionnaire {depth, puts, drops}
+        """
+        with self._cond:
+            return {
+                'depth': self.depth,
+                'puts': self.put_count,
+                'drops': self.drop_count,
+            }
@@ -0,0 +1,342 @@
+"""
+Contrôle de qualité par client - Boucle de régulation sur les rapports de réception
+
+Chaque client compatible envoie périodiquement un rapport de réception sur
+le canal de commandes TCP. Le contrôleur associé place le client sur un
+échelon de QUALITY_LEVELS : il descend dès que le client perd des frames,
+que la gigue explose ou que le décodage ne suit pas, et remonte prudemment
+après plusieurs rapports sans perte si la capacité mesurée le permet.
+
+Un client abonné au tier vignette reçoit un niveau fixe (THUMBNAIL_LEVEL),
+hors de l'échelle : son échelon est conservé pour le retour au flux principal.
+
+Au meilleur échelon, un client capable de décoder les tuiles brutes passe
+en mode brut (LZ4/zstd, CPU minimal côté serveur) quand le débit de son
+lien, mesuré par le client sur les rafales de fragments, dépasse
+RAW_MIN_BANDWIDTH. La moindre perte le ramène au JPEG pour RAW_BACKOFF.
+
+Un client qui décode la parité FEC demande un taux de parité fixe ou
+'auto' : le taux suit alors la perte mesurée (FEC_LOSS_FACTOR fois la
+perte, au plus FEC_MAX_RATIO) et redescend d'un pas par rapport sans perte.
+"""
+import math
+import time
+import logging
+from typing import NamedTuple, Optional
+
+from ..common.protocol import TIER_FULL, TIER_THUMBNAIL
+from ..config import (
+    DEFAULT_WIDTH, JPEG_QUALITY, TARGET_FPS, THUMBNAIL_WIDTH, THUMBNAIL_FPS, RAW_MODE, RAW_MIN_BANDWIDTH,
+)
+from .rate_model import quality_shape
+
+logger = logging.getLogger("screenshare.server.quality")
+
+
+class QualityLevel(NamedTuple):
+    """Échelon de qualité : fraction de DEFAULT_WIDTH, qualité JPEG, cadence max."""
+    scale: float
+    quality: int
+    fps: Optional[float]
+
+
+# Du meilleur au plus économe ; fps None = cadence de capture
+QUALITY_LEVELS = (
+    QualityLevel(1.0, JPEG_QUALITY, None),
+    QualityLevel(1.0, min(JPEG_QUALITY, 75), None),
+    QualityLevel(1.0, min(JPEG_QUALITY, 60), None),
+    QualityLevel(0.75, min(JPEG_QUALITY, 60), 20),
+    QualityLevel(0.5, min(JPEG_QUALITY, 50), 15),
+    QualityLevel(0.5, min(JPEG_QUALITY, 40), 8),
+)
+
+# Tier vignette : un seul niveau, partagé par toutes les vignettes
+THUMBNAIL_LEVEL = QualityLevel(THUMBNAIL_WIDTH / DEFAULT_WIDTH, min(JPEG_QUALITY, 70), THUMBNAIL_FPS)
+THUMBNAIL_LEVEL_ID = len(QUALITY_LEVELS)
+
+# Tous les niveaux encodables, indexés par identifiant de niveau
+STREAM_LEVELS = QUALITY_LEVELS + (THUMBNAIL_LEVEL,)
+
+# Perte au-delà de laquelle on descend, en deçà de laquelle le rapport est « bon »
+LOSS_HIGH = 0.05
+LOSS_LOW = 0.01
+# Gigue inter-arrivée (ms) : au-delà on descend, en deçà le rapport peut être « bon »
+JITTER_HIGH_MS = 80.0
+JITTER_LOW_MS = 30.0
+# Fraction du temps que le décodage peut occuper sur le client
+DECODE_BUDGET = 0.8
+# Rapports « bons » consécutifs avant de remonter d'un échelon
+UPGRADE_REPORTS = 3
+# Délais (s) sans remontée après une descente / après une remontée
+DOWNGRADE_HOLD = 5.0
+UPGRADE_HOLD = 2.0
+# Durée de validité (s) de la capacité mesurée lors d'une congestion
+CAPACITY_TTL = 30.0
+# Fraction de la capacité mesurée que le débit prévu peut atteindre
+CAPACITY_MARGIN = 0.85
+# Délai (s) avant de retenter le mode brut après l'avoir quitté
+RAW_BACKOFF = 30.0
+# Taux de parité FEC : plafond, pas (les clients d'un même taux partagent la parité),
+# parité par fragment perdu et perte en deçà de laquelle le mode 'auto' n'en ajoute pas
+FEC_MAX_RATIO = 0.5
+FEC_RATIO_STEP = 0.05
+FEC_LOSS_FACTOR = 2.0
+FEC_MIN_LOSS = 0.005
+FEC_AUTO = 'auto'
+
+
+def level_width(level: QualityLevel) -> int:
+    """Largeur des frames d'un échelon (paire, pour le sous-échantillonnage JPEG)."""
+    return max(16, int(DEFAULT_WIDTH * level.scale) // 2 * 2)
+
+
+def level_cost(level: QualityLevel) -> float:
+    """Débit relatif d'un échelon (pixels × taille JPEG relative × cadence)."""
+    return level.scale ** 2 * quality_shape(level.quality) * (level.fps or TARGET_FPS)
+
+
+class ClientQualityController:
+    """Régulation de l'échelon de qualité d'un client à partir de ses rapports."""
+
+    def __init__(self, client_id: str, level: int = 0, levels: tuple = QUALITY_LEVELS,
+                 adaptive: bool = True, tier: str = TIER_FULL, raw_capable: bool = False,
+                 fec_method: Optional[int] = None):
+        """Initialise le contrôleur.
+
+        Args:
+            client_id: Identifiant du client (pour les logs)
+            level: Échelon initial (0 = meilleure qualité)
+            levels: Échelle des niveaux de qualité
+            adaptive: False pour seulement mesurer, sans changer d'échelon
+            tier: Tier de flux auquel le client est abonné
+            raw_capable: Le client et le serveur partagent une méthode de tuiles brutes
+            fec_method: Méthode FEC décodée par le client (None = pas de parité)
+        """
+        self.client_id = client_id
+        self.levels = levels
+        self.adaptive = adaptive
+        self.tier = tier
+        self.level = max(0, min(level, len(levels) - 1))
+        self.capacity_bps = None
+        self._capacity_at = 0.0
+        self._hold_until = 0.0
+        self._good_reports = 0
+        self._bytes_sent = 0
+        self._byte_loss = 0.0
+        self.raw_capable = raw_capable and RAW_MODE != 'off'
+        self.raw = False
+        self.link_bps = None  # Débit du lien mesuré par le client
+        self._raw_hold_until = 0.0
+        self.fec_method = fec_method
+        self.fec_requested = FEC_AUTO  # Taux demandé par le client, ou 'auto'
+        self._fec_auto = 0.0
+
+        # Stats (dernier rapport)
+        self.reports = 0
+        self.downgrades = 0
+        self.upgrades = 0
+        self.raw_switches = 0
+        self.loss = 0.0
+        self.jitter_ms = 0.0
+        self.decode_ms = 0.0
+        self.received_bps = 0.0
+
+    @property
+    def stream_level(self) -> int:
+        """Identifiant du niveau effectivement envoyé au client (index de STREAM_LEVELS)."""
+        return THUMBNAIL_LEVEL_ID if self.tier == TIER_THUMBNAIL else self.level
+
+    @property
+    def uses_raw(self) -> bool:
+        """Indique si le client reçoit les tuiles brutes (flux principal uniquement)."""
+        return self.raw and self.tier == TIER_FULL
+
+    @property
+    def fec_ratio(self) -> float:
+        """Fragments de parité par fragment de données envoyés au client (0 = aucun)."""
+        if self.fec_method is None:
+            return 0.0
+        ratio = self._fec_auto if self.fec_requested == FEC_AUTO else self.fec_requested
+        # Arrondi au pas supérieur : les clients d'un même pas partagent la parité
+        return min(FEC_MAX_RATIO, math.ceil(round(ratio / FEC_RATIO_STEP, 6)) * FEC_RATIO_STEP)
+
+    def set_fec(self, ratio) -> bool:
+        """Change le taux de parité demandé par le client.
+
+        Args:
+            ratio: Fragments de parité par fragment de données (0 désactive),
+                ou 'auto' pour suivre la perte mesurée
+
+        Returns:
+            False si la valeur est invalide
+        """
+        if ratio == FEC_AUTO:
+            self.fec_requested = FEC_AUTO
+            return True
+        try:
+            ratio = float(ratio)
+        except (TypeError, ValueError):
+            return False
+        if not 0.0 <= ratio <= 1.0:
+            return False
+        self.fec_requested = min(ratio, FEC_MAX_RATIO)
+        return True
+
+    def set_tier(self, tier: str) -> bool:
+        """Change le tier du client.
+
+        Args:
+            tier: TIER_FULL ou TIER_THUMBNAIL
+
+        Returns:
+            True si le niveau envoyé au client a changé
+        """
+        if tier == self.tier:
+            return False
+        logger.info(f"Client {self.client_id}: tier {self.tier} -> {tier}")
+        self.tier = tier
+        self._good_reports = 0
+        return True
+
+    def on_report(self, report: dict, bytes_sent: int, now: float = None) -> bool:
+        """Traite un rapport de réception et ajuste l'échelon.
+
+        Args:
+            report: Rapport du client {interval, frames_received,
+                frames_incomplete, bytes_received, decode_ms, jitter_ms,
+                link_kbps}
+            bytes_sent: Octets envoyés à ce client depuis sa connexion
+            now: Instant courant (horloge monotone)
+
+        Returns:
+            True si l'échelon ou le mode brut a changé
+        """
+        now = time.monotonic() if now is None else now
+        interval = max(0.1, float(report.get('interval', 1.0)))
+        received = max(0, int(report.get('bytes_received', 0)))
+        completed = max(0, int(report.get('frames_received', 0)))
+        incomplete = max(0, int(report.get('frames_incomplete', 0)))
+        self.decode_ms = max(0.0, float(report.get('decode_ms', 0.0)))
+        self.jitter_ms = max(0.0, float(report.get('jitter_ms', 0.0)))
+
+        sent = max(0, bytes_sent - self._bytes_sent)
+        self._bytes_sent = bytes_sent
+        frames = completed + incomplete
+        frame_loss = incomplete / frames if frames else 0.0
+        byte_loss = max(0.0, 1.0 - received / sent) if sent else 0.0
+        # Les octets encore en vol au moment du rapport ressemblent à des pertes :
+        # seules les pertes d'octets vues sur deux rapports consécutifs comptent
+        self.loss = max(frame_loss, min(byte_loss, self._byte_loss))
+        self._byte_loss = byte_loss
+        self.received_bps = received * 8 / interval
+        link_kbps = report.get('link_kbps')
+        if link_kbps:
+            self.link_bps = float(link_kbps) * 1000
+        self.reports += 1
+        # Parité 'auto' : montée immédiate, descente d'un pas par rapport
+        target = min(FEC_MAX_RATIO, FEC_LOSS_FACTOR * self.loss) if self.loss >= FEC_MIN_LOSS else 0.0
+        self._fec_auto = max(target, self._fec_auto - FEC_RATIO_STEP)
+        if not self.adaptive or self.tier != TIER_FULL:
+            # Les mesures du tier vignette ne disent rien de la capacité du flux principal
+            return False
+
+        # Le client passe trop de temps à décoder pour suivre le flux
+        decode_limited = self.decode_ms * completed > DECODE_BUDGET * interval * 1000.0
+        if self.raw and (self.loss > LOSS_LOW or self.jitter_ms > JITTER_LOW_MS or decode_limited):
+            # Le mode brut est un luxe : première marche de la descente
+            self._set_raw(False, now, f"loss={self.loss:.1%} jitter={self.jitter_ms:.0f}ms "
+                                      f"decode={self.decode_ms:.1f}ms")
+            return True
+        if self.loss > LOSS_HIGH or self.jitter_ms > JITTER_HIGH_MS or decode_limited:
+            # Capacité réelle du lien (ou du client) : ce qu'il a pu recevoir
+            self.capacity_bps = self.received_bps
+            self._capacity_at = now
+            self._good_reports = 0
+            self._hold_until = now + DOWNGRADE_HOLD
+            if self.level < len(self.levels) - 1:
+                self._change_level(
+                    self.level + 1,
+                    f"loss={self.loss:.1%} jitter={self.jitter_ms:.0f}ms decode={self.decode_ms:.1f}ms",
+                )
+                self.downgrades += 1
+                return True
+            return False
+
+        if self.loss > LOSS_LOW or self.jitter_ms > JITTER_LOW_MS:
+            self._good_reports = 0
+            return False
+
+        self._good_reports += 1
+        if self.raw and self.link_bps is not None and self.received_bps > self.link_bps * CAPACITY_MARGIN:
+            # Le flux brut approche le débit du lien : retour au JPEG avant les pertes
+            self._set_raw(False, now, f"received={self.received_bps / 1e6:.0f}Mbit/s "
+                                      f"link={self.link_bps / 1e6:.0f}Mbit/s")
+            return True
+        if self._raw_allowed(now):
+            self._set_raw(True, now, f"link={self.link_bps / 1e6:.0f}Mbit/s")
+            return True
+        if self.level == 0 or self._good_reports < UPGRADE_REPORTS or now < self._hold_until:
+            return False
+
+        if self.capacity_bps is not None and now - self._capacity_at < CAPACITY_TTL:
+            # Débit prévu à l'échelon supérieur, extrapolé du débit actuel
+            ratio = level_cost(self.levels[self.level - 1]) / level_cost(self.levels[self.level])
+            expected = sent * 8 / interval * ratio
+            if expected > self.capacity_bps * CAPACITY_MARGIN:
+                return False
+
+        self._good_reports = 0
+        self._hold_until = now + UPGRADE_HOLD
+        self._change_level(self.level - 1, "no loss")
+        self.upgrades += 1
+        return True
+
+    def _raw_allowed(self, now: float) -> bool:
+        """Indique si le client peut passer en mode brut."""
+        return (self.raw_capable and not self.raw and self.level == 0
+                and self._good_reports >= UPGRADE_REPORTS and now >= self._raw_hold_until
+                and self.link_bps is not None and self.link_bps >= RAW_MIN_BANDWIDTH)
+
+    def _set_raw(self, raw: bool, now: float, reason: str):
+        """Active ou quitte le mode brut et le journalise."""
+        logger.info(f"Client {self.client_id}: raw tiles {'on' if raw else 'off'} ({reason})")
+        self.raw = raw
+        self.raw_switches += 1
+        self._good_reports = 0
+        if not raw:
+            self._raw_hold_until = now + RAW_BACKOFF
+
+    def _change_level(self, level: int, reason: str):
+        """Change d'échelon et le journalise."""
+        old, new = self.levels[self.level], self.levels[level]
+        logger.info(
+            f"Client {self.client_id}: quality level {self.level} -> {level} "
+            f"(width={level_width(old)}->{level_width(new)}, q={old.quality}->{new.quality}, "
+            f"fps={old.fps or 'max'}->{new.fps or 'max'}) {reason}"
+        )
+        self.level = level
+
+    def get_stats(self) -> dict:
+        """Retourne l'état du contrôleur.
+
+        Returns:
+            Dictionnaire {tier, level, raw, reports, downgrades, upgrades,
+            raw_switches, loss, jitter_ms, decode_ms, received_kbps,
+            capacity_kbps, link_kbps, fec_ratio}
+        """
+        return {
+            'tier': self.tier,
+            'level': self.level,
+            'raw': self.raw,
+            'reports': self.reports,
+            'downgrades': self.downgrades,
+            'upgrades': self.upgrades,
+            'raw_switches': self.raw_switches,
+            'loss': round(self.loss, 3),
+            'jitter_ms': round(self.jitter_ms, 1),
+            'decode_ms': round(self.decode_ms, 1),
+            'received_kbps': round(self.received_bps / 1000, 1),
+            'capacity_kbps': round(self.capacity_bps / 1000, 1) if self.capacity_bps is not None else None,
+            'link_kbps': round(self.link_bps / 1000, 1) if self.link_bps is not None else None,
+            'fec_ratio': round(self.fec_ratio, 2),
+        }
@@ -0,0 +1,180 @@
+"""
+Modèle de débit JPEG - Prédiction de la taille encodée d'une frame
+
+Le modèle suppose :
+    octets ≈ pixels × (complexité + COMPLEXITY_OFFSET) × k × forme(qualité)
+où la complexité est le gradient moyen d'une version sous-échantillonnée de
+la frame, forme() une courbe empirique de l'effet de la qualité JPEG et k
+un coefficient appris sur les frames récentes.
+"""
+import math
+import logging
+import numpy as np
+
+logger = logging.getLogger("screenshare.server.rate_model")
+
+# Taille relative du JPEG en fonction de la qualité (1.0 à qualité 90),
+# mesurée sur du contenu bureautique (texte, photos, bruit)
+_QUALITY_SHAPE = (
+    (10, 0.25), (30, 0.39), (45, 0.48), (60, 0.56),
+    (75, 0.68), (90, 1.0), (100, 1.8),
+)
+
+
+def quality_shape(quality: int) -> float:
+    """Interpole la courbe de taille relative pour une qualité donnée."""
+    points = _QUALITY_SHAPE
+    if quality <= points[0][0]:
+        return points[0][1]
+    for (q0, s0), (q1, s1) in zip(points, points[1:]):
+        if quality <= q1:
+            return s0 + (s1 - s0) * (quality - q0) / (q1 - q0)
+    return points[-1][1]
+
+
+class JpegRateModel:
+    """Choisit qualité et échelle pour tenir dans un budget en un seul encodage."""
+
+    COMPLEXITY_OFFSET = 1.0
+    QUALITY_STEP = 5
+    INITIAL_COEFFICIENT = 0.0055
+
+    def __init__(self, max_quality: int, min_quality: int = 60, min_width: int = 200,
+                 alpha: float = 0.3, margin: float = 0.9):
+        """Initialise le modèle.
+
+        Args:
+            max_quality: Qualité JPEG maximale (celle de la configuration)
+            min_quality: Qualité en dessous de laquelle on réduit plutôt l'échelle
+            min_width: Largeur minimale de l'image encodée
+            alpha: Poids des nouvelles observations (moyenne exponentielle)
+            margin: Fraction du budget visée, pour absorber l'erreur de prédiction
+        """
+        self.max_quality = max_quality
+        self.min_quality = min(min_quality, max_quality)
+        self.min_width = min_width
+        self.alpha = alpha
+        self.margin = margin
+        self.coefficient = self.INITIAL_COEFFICIENT
+
+        # Stats
+        self.predictions = 0
+        self.misses = 0
+        self.failures = 0
+        self._error_sum = 0.0
+
+    @staticmethod
+    def complexity(frame: np.ndarray) -> float:
+        """Mesure la complexité d'une frame (gradient moyen, 1 pixel sur 4).
+
+        Args:
+            frame: Frame BGR
+
+        Returns:
+            Complexité (0 pour une image uniforme)
+        """
+        # Le canal vert suffit comme approximation de la luminance
+        luma = frame[::4, ::4, 1].astype(np.int16)
+        if luma.shape[0] < 2 or luma.shape[1] < 2:
+            return 0.0
+        dx = np.abs(np.diff(luma, axis=1)).mean()
+        dy = np.abs(np.diff(luma, axis=0)).mean()
+        return float(dx + dy)
+
+    def predict(self, pixels: int, quality: int, complexity: float) -> float:
+        """Prédit la taille encodée en octets."""
+        return pixels * (complexity + self.COMPLEXITY_OFFSET) * self.coefficient * quality_shape(quality)
+
+    def choose(self, width: int, height: int, complexity: float, budget: int) -> tuple:
+        """Choisit la qualité et l'échelle pour tenir dans le budget.
+
+        La qualité est réduite par paliers jusqu'à min_quality, puis
+        l'échelle est réduite si cela ne suffit pas.
+
+        Args:
+            width: Largeur de la frame
+            height: Hauteur de la frame
+            complexity: Complexité mesurée par complexity()
+            budget: Taille maximale en octets
+
+        Returns:
+            Tuple (qualité, échelle dans ]0, 1])
+        """
+        target = budget * self.margin
+        pixels = width * height
+        for quality in range(self.max_quality, self.min_quality - 1, -self.QUALITY_STEP):
+            if self.predict(pixels, quality, complexity) <= target:
+                return quality, 1.0
+
+        predicted = self.predict(pixels, self.min_quality, complexity)
+        scale = math.sqrt(target / predicted) if predicted > 0 else 1.0
+        scale = max(scale, min(1.0, self.min_width / max(1, width)))
+        return self.min_quality, min(1.0, scale)
+
+    def correct(self, quality: int, scale: float, size: int, budget: int) -> tuple:
+        """Calcule un nouveau choix à partir d'un encodage qui a dépassé le budget.
+
+        La taille réellement obtenue sert de point de référence : seule la
+        forme de la courbe qualité et l'effet de l'échelle sont extrapolés.
+
+        Args:
+            quality: Qualité utilisée
+            scale: Échelle utilisée
+            size: Taille obtenue en octets
+            budget: Taille maximale en octets
+
+        Returns:
+            Tuple (qualité, échelle)
+        """
+        # Cible un peu plus basse qu'au premier essai : il n'y aura pas d'autre correction
+        factor = budget * self.margin * self.margin / max(1, size)
+        shape = quality_shape(quality)
+        for candidate in range(quality - self.QUALITY_STEP, self.min_quality - 1, -self.QUALITY_STEP):
+            if quality_shape(candidate) / shape <= factor:
+                return candidate, scale
+
+        quality_gain = quality_shape(self.min_quality) / shape
+        new_scale = scale * math.sqrt(factor / quality_gain)
+        return min(quality, self.min_quality), min(scale, new_scale)
+
+    def observe(self, pixels: int, quality: int, complexity: float, size: int, budget: int,
+                corrective: bool = False):
+        """Met à jour le modèle avec la taille réellement obtenue.
+
+        Args:
+            pixels: Nombre de pixels encodés
+            quality: Qualité utilisée
+            complexity: Complexité de la frame
+            size: Taille obtenue en octets
+            budget: Budget visé
+            corrective: True pour le réencodage correctif
+        """
+        predicted = self.predict(pixels, quality, complexity)
+        if corrective:
+            if size > budget:
+                self.failures += 1
+        else:
+            self.predictions += 1
+            if predicted > 0:
+                self._error_sum += abs(size - predicted) / predicted
+            if size > budget:
+                self.misses += 1
+
+        if predicted > 0 and size > 0:
+            # Moyenne exponentielle sur le log du rapport observé / prédit
+            ratio = size / predicted
+            self.coefficient *= math.exp(self.alpha * math.log(ratio))
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques de prédiction.
+
+        Returns:
+            Dictionnaire {predictions, misses, miss_rate, failures, mean_error}
+        """
+        return {
+            'predictions': self.predictions,
+            'misses': self.misses,
+            'miss_rate': self.misses / self.predictions if self.predictions else 0.0,
+            'failures': self.failures,
+            'mean_error': self._error_sum / self.predictions if self.predictions else 0.0,
+        }
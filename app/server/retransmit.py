@@ -0,0 +1,116 @@
+"""
+Retransmission sélective - Fragments envoyés récemment, renvoyés sur NACK
+
+Le client qui constate des fragments manquants les redemande sur le canal
+de commandes ({'type': 'nack', 'frames': [[flux, seq, [[premier, nombre], ...]]]}).
+Le serveur garde, par flux, les fragments de données des messages envoyés
+pendant les NACK_DEADLINE dernières secondes (tampon circulaire borné en
+octets) et ne renvoie que ceux demandés. Un fragment demandé trop tard
+(sorti du tampon) compte comme une échéance manquée : le client attendra
+la prochaine frame complète.
+"""
+import threading
+from collections import deque
+
+from ..config import NACK_DEADLINE
+
+# Octets de fragments gardés au plus par flux
+MAX_BUFFER_BYTES = 16 * 1024 * 1024
+# Fragments demandés au plus par NACK (un message de MAX_FRAME_BYTES et plus ne se répare pas)
+MAX_NACK_CHUNKS = 4096
+
+
+class RetransmitBuffer:
+    """Tampon circulaire des fragments envoyés, par flux."""
+
+    def __init__(self, deadline: float = NACK_DEADLINE, max_bytes: int = MAX_BUFFER_BYTES):
+        """Initialise le tampon.
+
+        Args:
+            deadline: Âge maximal (s) d'un fragment retransmis
+            max_bytes: Octets gardés au plus par flux
+        """
+        self.deadline = deadline
+        self.max_bytes = max_bytes
+        self._streams = {}  # {stream_id: deque((seq, envoi, fragments, octets))}
+        self._bytes = {}  # {stream_id: octets gardés}
+        self._lock = threading.Lock()  # Envoi (thread d'envoi) et NACK (thread de commandes)
+
+        # Stats
+        self.requests = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.deadline_misses = 0
+
+    def add(self, stream_id: int, seq: int, datagrams: list, now: float):
+        """Mémorise les fragments d'un message envoyé.
+
+        Args:
+            stream_id: Identifiant du flux
+            seq: Numéro du message
+            datagrams: Fragments de données (chunk_frame)
+            now: Instant d'envoi (horloge monotone)
+        """
+        if not self.deadline:
+            return
+        size = sum(map(len, datagrams))
+        with self._lock:
+            ring = self._streams.setdefault(stream_id, deque())
+            ring.append((seq, now, datagrams, size))
+            self._bytes[stream_id] = self._bytes.get(stream_id, 0) + size
+            self._prune(stream_id, now)
+
+    def _prune(self, stream_id: int, now: float):
+        """Retire les messages trop anciens, ou au-delà de max_bytes (verrou pris)."""
+        ring = self._streams[stream_id]
+        while ring and (now - ring[0][1] > self.deadline or self._bytes[stream_id] > self.max_bytes):
+            self._bytes[stream_id] -= ring.popleft()[3]
+
+    def lookup(self, stream_id: int, seq: int, ranges: list, now: float) -> list:
+        """Retourne les fragments demandés par un NACK.
+
+        Args:
+            stream_id: Identifiant du flux
+            seq: Numéro du message
+            ranges: Plages [premier fragment, nombre] demandées
+            now: Instant courant (horloge monotone)
+
+        Returns:
+            Fragments à renvoyer (vide si le message est sorti du tampon)
+        """
+        with self._lock:
+            self.requests += 1
+            ring = self._streams.get(stream_id)
+            if ring is not None:
+                self._prune(stream_id, now)
+            entry = next((e for e in ring if e[0] == seq), None) if ring else None
+            if entry is None:
+                # Trop tard (ou message inconnu) : la frame ne sera pas réparée
+                self.deadline_misses += 1
+                return []
+            datagrams = entry[2]
+            wanted = []
+            for first, count in ranges:
+                wanted.extend(datagrams[max(0, first):max(0, first + count)])
+                if len(wanted) > MAX_NACK_CHUNKS:
+                    break
+            wanted = wanted[:MAX_NACK_CHUNKS]
+            self.chunks += len(wanted)
+            self.bytes += sum(map(len, wanted))
+            return wanted
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques des retransmissions.
+
+        Returns:
+            Dictionnaire {requests, chunks, bytes, deadline_misses, buffered_bytes}
+        """
+        with self._lock:
+            buffered = sum(self._bytes.values())
+        return {
+            'requests': self.requests,
+            'chunks': self.chunks,
+            'bytes': self.bytes,
+            'deadline_misses': self.deadline_misses,
+            'buffered_bytes': buffered,
+        }
@@ -11,6 +11,7 @@ from typing import Dict, Optional
 from PySide6.QtCore import QObject, Signal
 
 from ..config import VIDEO_PORT, COMMAND_PORT
+from ..common.protocol import TIER_FULL, TIERS
 from .monitor_manager import MonitorManager
 from .video_streamer import VideoStreamer
 from .command_handler import CommandHandler
@@ -107,6 +108,14 @@ class ScreenServer(QObject):
         """Info du moniteur sélectionné."""
         return self.monitor_manager.monitor_info
     
+    # =========================================================================
+    # API publique - Statistiques
+    # =========================================================================
+    
+    def get_stream_stats(self) -> dict:
+        """Retourne les statistiques du pipeline vidéo."""
+        return self.video_streamer.get_stats()
+    
     # =========================================================================
     # API publique - Démarrage/Arrêt
     # =========================================================================
@@ -183,7 +192,7 @@ class ScreenServer(QObject):
         self.video_thread.start()
         
         # Démarrer la découverte réseau
-        self.discovery = DiscoveryBroadcaster(self._sharer_name)
+        self.discovery = DiscoveryBroadcaster(self._sharer_name, self.video_streamer.multicast_info())
         self.discovery.start()
         
         self.status_changed.emit("Streaming vidéo démarré")
@@ -228,15 +237,17 @@ class ScreenServer(QObject):
     # =========================================================================
     
     def _video_loop(self):
-        """Boucle principale de streaming vidéo."""
+        """Boucle de capture (premier étage du pipeline vidéo)."""
         try:
             logger.info("Video streamer thread started")
+            governor = self.video_streamer.frame_governor
             
             while self.is_running and self.is_streaming:
                 success = self.video_streamer.capture_and_send()
                 if not success:
                     break
-                time.sleep(0.01)  # ~100 FPS max
+                # Échéance suivante sur horloge monotone (cadence adaptative)
+                governor.wait()
                 
         except Exception as e:
             self.error_occurred.emit(f"Erreur vidéo: {e}")
@@ -295,21 +306,24 @@ class ScreenServer(QObject):
         try:
             logger.debug(f"Start handling commands for {client_id}")
             
+            # Les commandes sont des lignes JSON ; une ligne peut arriver en plusieurs recv()
+            pending = b""
             while self.is_running:
-                data = conn.recv(1024)
+                data = conn.recv(4096)
                 if not data:
                     break
                 
                 logger.debug(f"Received {len(data)} bytes from {addr}")
                 
-                try:
-                    command_str = data.decode('utf-8')
-                except Exception:
-                    logger.exception("Failed to decode command bytes")
-                    continue
-                
-                for command_json in command_str.split('\n'):
-                    if not command_json:
+                *lines, pending = (pending + data).split(b'\n')
+                for line in lines:
+                    if not line:
+                        continue
+                    
+                    try:
+                        command_json = line.decode('utf-8')
+                    except Exception:
+                        logger.exception("Failed to decode command bytes")
                         continue
                     
                     try:
@@ -342,8 +356,20 @@ class ScreenServer(QObject):
             # Enregistrement du client avec son port vidéo
             try:
                 video_port = int(command.get('video_port', VIDEO_PORT))
-                self.video_streamer.add_client(client_id, (addr[0], video_port))
-                logger.info(f"Registered client {client_id} -> {(addr[0], video_port)}")
+                caps = command.get('caps') or []
+                tier = command.get('tier', TIER_FULL)
+                if tier not in TIERS:
+                    logger.warning(f"Unknown tier {tier!r} from {client_id}, using {TIER_FULL}")
+                    tier = TIER_FULL
+                fec = command.get('fec')
+                self.video_streamer.add_client(client_id, (addr[0], video_port), caps, tier, fec)
+                logger.info(
+                    f"Registered client {client_id} -> {(addr[0], video_port)} caps={caps} tier={tier} fec={fec}"
+                )
+                # Réponse : groupe multicast à rejoindre (None = unicast seul)
+                self._send_control(client_id, {
+                    "type": "registered", "multicast": self.video_streamer.multicast_info(),
+                })
                 
                 # Démarrer le streaming si pas déjà actif
                 if not self.is_streaming:
@@ -351,10 +377,48 @@ class ScreenServer(QObject):
                     self.start_streaming()
             except Exception as e:
                 logger.exception(f"Failed to process register: {e}")
+        elif command.get('type') == 'subscribe':
+            # Changement de tier (vignette / plein écran) sans reconnexion
+            tier = command.get('tier')
+            if tier in TIERS:
+                self.video_streamer.set_client_tier(client_id, tier)
+            else:
+                logger.warning(f"Unknown tier {tier!r} from {client_id}")
+        elif command.get('type') == 'fec':
+            # Taux de parité FEC choisi par le client ('auto' : suit la perte mesurée)
+            if not self.video_streamer.set_client_fec(client_id, command.get('ratio')):
+                logger.warning(f"Invalid FEC ratio {command.get('ratio')!r} from {client_id}")
+        elif command.get('type') == 'multicast':
+            # Le client a rejoint le groupe (flux commun) ou l'a quitté (retour à l'unicast)
+            self.video_streamer.set_client_multicast(client_id, bool(command.get('joined')))
+        elif command.get('type') == 'nack':
+            # Fragments perdus : renvoyés depuis le tampon de retransmission s'il est encore temps
+            self.video_streamer.on_nack(client_id, command.get('frames'))
+        elif command.get('type') == 'keyframe_request':
+            # Le client a perdu des messages : il repart d'une frame complète
+            self.video_streamer.request_keyframe(client_id)
+        elif command.get('type') == 'receiver_report':
+            # Rapport de réception : pilote la qualité envoyée à ce client
+            self.video_streamer.on_receiver_report(client_id, command)
         else:
             # Commande de contrôle (souris, clavier)
             self.command_handler.execute(command)
     
+    def _send_control(self, client_id: str, message: dict):
+        """Envoie un message à un client sur sa connexion de commandes."""
+        try:
+            payload = (json.dumps(message) + "\n").encode("utf-8")
+        except Exception:
+            return
+        with self._command_conns_lock:
+            conn = self._command_conns.get(client_id)
+            if conn is None:
+                return
+            try:
+                conn.sendall(payload)
+            except Exception as e:
+                logger.debug(f"Could not send {message.get('type')} to {client_id}: {e}")
+    
     def _broadcast_control(self, message: dict):
         """Envoie un message à tous les clients connectés."""
         try:
@@ -0,0 +1,287 @@
+"""
+Détection du défilement - Décalage d'un bloc de l'écran entre deux frames
+
+Chaque ligne (ou colonne) de la zone modifiée est résumée par une
+empreinte 64 bits. Les lignes présentes une seule fois dans les deux
+frames votent pour un décalage ; le bloc de lignes qui correspond avec le
+décalage élu est vérifié pixel à pixel. Le client le recopie alors dans
+son image (TILE_CODEC_COPY) et seule la bande découverte est encodée.
+
+Sur un niveau redimensionné, un défilement de quelques pixels de la
+capture ne tombe pas sur un nombre entier de pixels : aucune ligne n'est
+identique. Le décalage entier le plus proche est alors cherché sur des
+profils de lignes (moyennes par bandes verticales) et la copie est
+acceptée si l'écart moyen du bloc reste faible. Les tuiles ainsi
+approchées sont renvoyées exactement quand le défilement s'arrête.
+"""
+from math import gcd
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# Lignes uniques communes aux deux frames qui doivent s'accorder sur le décalage
+MIN_VOTES = 8
+# Hauteur (ou largeur) minimale du bloc recopié, en pixels
+MIN_COPY_LINES = 32
+# Côté minimal (pixels) de la zone modifiée examinée
+MIN_AREA_SIDE = 64
+# Écart moyen (par canal) toléré entre une copie approchée et la frame
+MOVE_MAX_ERROR = 8.0
+# Décalage maximal (pixels par frame) cherché sur les profils de lignes
+MAX_APPROX_SHIFT = 128
+# Bandes verticales des profils de lignes
+PROFILE_BANDS = 8
+# Frames sans détection après un échec (doublé à chaque échec : vidéo plein écran)
+MAX_BACKOFF = 16
+
+# Poids des mots de 64 bits d'une ligne (impairs, tirés une fois pour toutes)
+_WEIGHTS = np.random.default_rng(0x5C011).integers(1, 2 ** 63, size=8192, dtype=np.uint64) | np.uint64(1)
+
+
+class Move(NamedTuple):
+    """Bloc recopié d'une position de la frame précédente vers une autre."""
+    src_x: int
+    src_y: int
+    x: int
+    y: int
+    width: int
+    height: int
+    exact: bool = True  # False : copie approchée (niveau redimensionné)
+
+    @property
+    def rect(self) -> tuple:
+        """Rectangle de destination (x, y, largeur, hauteur)."""
+        return self.x, self.y, self.width, self.height
+
+
+class ScrollDetector:
+    """Détecte le défilement d'un flux entre l'image du client et la frame courante.
+
+    Après un échec sur une grande zone modifiée (vidéo, changement de
+    fenêtre), la détection est suspendue quelques frames.
+    """
+
+    def __init__(self):
+        """Initialise le détecteur."""
+        self._skip = 0
+        self._backoff = 0
+
+        # Stats
+        self.attempts = 0
+        self.exact_moves = 0
+        self.approximate_moves = 0
+
+    def detect(self, previous: np.ndarray, frame: np.ndarray, damage=None,
+               scale: tuple = (1.0, 1.0)) -> Optional[Move]:
+        """Cherche un bloc décalé verticalement, sinon horizontalement.
+
+        Args:
+            previous: Frame précédente (image du client)
+            frame: Frame courante, de même forme
+            damage: Zones modifiées signalées par le backend de capture
+                (None = inconnues, toute la frame est examinée)
+            scale: Facteurs (x, y) entre la capture et la frame redimensionnée
+
+        Returns:
+            Move vérifié, ou None si aucun défilement n'est détecté
+        """
+        if previous is None or previous.shape != frame.shape:
+            return None
+        if self._skip > 0:
+            self._skip -= 1
+            return None
+        bounds = _changed_bounds(previous, frame, damage, scale)
+        if bounds is None:
+            return None
+        self.attempts += 1
+        move = _detect_in(previous, frame, bounds)
+        if move is None:
+            self._backoff = min(MAX_BACKOFF, self._backoff * 2 or 1)
+            self._skip = self._backoff
+            return None
+        self._backoff = 0
+        if move.exact:
+            self.exact_moves += 1
+        else:
+            self.approximate_moves += 1
+        return move
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques du détecteur.
+
+        Returns:
+            Dictionnaire {attempts, exact_moves, approximate_moves}
+        """
+        return {
+            'attempts': self.attempts,
+            'exact_moves': self.exact_moves,
+            'approximate_moves': self.approximate_moves,
+        }
+
+
+def _detect_in(previous: np.ndarray, frame: np.ndarray, bounds: tuple) -> Optional[Move]:
+    """Cherche un décalage exact, puis approché, des lignes puis des colonnes d'une zone."""
+    x, y, w, h = bounds
+    before, current = previous[y:y + h, x:x + w], frame[y:y + h, x:x + w]
+    for find in (_find_exact, _find_approximate):
+        exact = find is _find_exact
+        block = find(before, current)
+        if block is not None:
+            top, bottom, shift = block
+            return Move(x, y + top + shift, x, y + top, w, bottom - top, exact)
+        # Colonnes : défilement horizontal, sur la zone transposée
+        block = find(before.transpose(1, 0, 2), current.transpose(1, 0, 2))
+        if block is not None:
+            left, right, shift = block
+            return Move(x + left + shift, y, x + left, y, right - left, h, exact)
+    return None
+
+
+def _changed_bounds(previous: np.ndarray, frame: np.ndarray, damage, scale: tuple):
+    """Rectangle englobant les pixels modifiés (dans les zones signalées si connues)."""
+    height, width = frame.shape[:2]
+    x0, y0, x1, y1 = 0, 0, width, height
+    if damage is not None:
+        if not damage:
+            return None
+        sx, sy = scale
+        x0 = max(0, int(min(r[0] for r in damage) * sx))
+        y0 = max(0, int(min(r[1] for r in damage) * sy))
+        x1 = min(width, int(np.ceil(max(r[0] + r[2] for r in damage) * sx)))
+        y1 = min(height, int(np.ceil(max(r[1] + r[3] for r in damage) * sy)))
+        if x1 - x0 < MIN_AREA_SIDE or y1 - y0 < MIN_AREA_SIDE:
+            return None
+    # Comparaison de lignes entières, par mots de 64 bits quand c'est possible
+    # (np.any sur l'axe des canaux est plusieurs dizaines de fois plus lent)
+    channels = frame.shape[2]
+    current, before = frame[y0:y1].reshape(y1 - y0, -1), previous[y0:y1].reshape(y1 - y0, -1)
+    unit = 1
+    if width * channels % 8 == 0 and current.flags.c_contiguous and before.flags.c_contiguous:
+        current, before, unit = current.view(np.uint64), before.view(np.uint64), 8
+    changed = current != before
+    rows = np.flatnonzero(changed.any(axis=1))
+    if len(rows) < MIN_AREA_SIDE:
+        return None
+    cols = np.flatnonzero(changed.any(axis=0))
+    left = max(x0, int(cols[0]) * unit // channels)
+    right = min(x1, -(-(int(cols[-1]) + 1) * unit // channels))
+    if right - left < MIN_AREA_SIDE:
+        return None
+    return left, y0 + int(rows[0]), right - left, int(rows[-1] - rows[0]) + 1
+
+
+def _line_hashes(region: np.ndarray) -> np.ndarray:
+    """Empreinte 64 bits de chaque ligne d'une région (lignes, pixels, canaux)."""
+    lines = np.ascontiguousarray(region).reshape(region.shape[0], -1).view(np.uint64)
+    # Somme pondérée modulo 2^64 des mots de la ligne
+    return (lines * _WEIGHTS[:lines.shape[1]]).sum(axis=1, dtype=np.uint64)
+
+
+def _find_exact(previous: np.ndarray, current: np.ndarray):
+    """Cherche le décalage exact des lignes d'une région.
+
+    Args:
+        previous: Région de la frame précédente (lignes, pixels, canaux)
+        current: Même région de la frame courante
+
+    Returns:
+        Tuple (première ligne, ligne de fin, décalage) tel que
+        current[ligne] == previous[ligne + décalage] sur le bloc, ou None
+    """
+    # Les mots de 64 bits imposent une longueur de ligne multiple de 8 octets
+    step = 8 // gcd(current.shape[2], 8)
+    usable = current.shape[1] - current.shape[1] % step
+    if usable * current.shape[2] // 8 > len(_WEIGHTS) or usable == 0:
+        return None
+    hp = _line_hashes(previous[:, :usable])
+    hc = _line_hashes(current[:, :usable])
+
+    shift = _vote_shift(hp, hc)
+    if shift is None:
+        return None
+    block = _matching_block(hp, hc, shift)
+    if block is None:
+        return None
+    top, bottom = block
+    # Une empreinte ne prouve rien : vérification des pixels, sur toute la largeur
+    if not np.array_equal(current[top:bottom], previous[top + shift:bottom + shift]):
+        return None
+    return top, bottom, shift
+
+
+def _vote_shift(hp: np.ndarray, hc: np.ndarray) -> Optional[int]:
+    """Décalage le plus fréquent entre les lignes uniques des deux régions."""
+    values_p, index_p, counts_p = np.unique(hp, return_index=True, return_counts=True)
+    values_c, index_c, counts_c = np.unique(hc, return_index=True, return_counts=True)
+    # Les lignes répétées (interlignes, aplats) ne disent rien du décalage
+    unique_p, unique_c = counts_p == 1, counts_c == 1
+    _, a, b = np.intersect1d(values_p[unique_p], values_c[unique_c], assume_unique=True, return_indices=True)
+    shifts = index_p[unique_p][a] - index_c[unique_c][b]
+    shifts = shifts[shifts != 0]
+    if len(shifts) < MIN_VOTES:
+        return None
+    values, counts = np.unique(shifts, return_counts=True)
+    best = int(np.argmax(counts))
+    if counts[best] < MIN_VOTES:
+        return None
+    return int(values[best])
+
+
+def _matching_block(hp: np.ndarray, hc: np.ndarray, shift: int):
+    """Plus long bloc de lignes identiques avec ce décalage (lignes de la région courante)."""
+    count = len(hc)
+    lo, hi = max(0, -shift), min(count, count - shift)
+    if hi - lo < MIN_COPY_LINES:
+        return None
+    match = np.concatenate(([False], hc[lo:hi] == hp[lo + shift:hi + shift], [False]))
+    edges = np.flatnonzero(np.diff(match.astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+    if len(starts) == 0:
+        return None
+    longest = int(np.argmax(ends - starts))
+    if ends[longest] - starts[longest] < MIN_COPY_LINES:
+        return None
+    return lo + int(starts[longest]), lo + int(ends[longest])
+
+
+def _line_profiles(region: np.ndarray) -> np.ndarray:
+    """Moyenne des pixels de chaque ligne, par bande verticale (lignes, bandes)."""
+    band = region.shape[1] // PROFILE_BANDS
+    usable = region[:, :band * PROFILE_BANDS]
+    sums = usable.reshape(region.shape[0], PROFILE_BANDS, -1).sum(axis=2, dtype=np.int64)
+    return sums / float(band * region.shape[2])
+
+
+def _find_approximate(previous: np.ndarray, current: np.ndarray):
+    """Cherche le décalage entier le plus proche d'un défilement rééchantillonné.
+
+    Args:
+        previous: Région de la frame précédente (lignes, pixels, canaux)
+        current: Même région de la frame courante
+
+    Returns:
+        Tuple (première ligne, ligne de fin, décalage) du bloc dont l'écart
+        moyen reste sous MOVE_MAX_ERROR, ou None
+    """
+    count = current.shape[0]
+    if current.shape[1] < PROFILE_BANDS or count < MIN_COPY_LINES * 2:
+        return None
+    pp, pc = _line_profiles(previous), _line_profiles(current)
+    best, best_error = None, None
+    limit = min(MAX_APPROX_SHIFT, count - MIN_COPY_LINES)
+    for shift in range(-limit, limit + 1):
+        if shift == 0:
+            continue
+        lo, hi = max(0, -shift), min(count, count - shift)
+        error = float(np.abs(pc[lo:hi] - pp[lo + shift:hi + shift]).mean())
+        if best_error is None or error < best_error:
+            best, best_error = shift, error
+    if best is None:
+        return None
+    lo, hi = max(0, -best), min(count, count - best)
+    # Écart réel du bloc, sur une ligne et une colonne sur deux
+    block = current[lo:hi:2, ::2].astype(np.int16)
+    source = previous[lo + best:hi + best:2, ::2].astype(np.int16)
+    if float(np.abs(block - source).mean()) > MOVE_MAX_ERROR:
+        return None
+    return lo, hi, best
@@ -0,0 +1,307 @@
+"""
+Files d'envoi par client - Un spectateur lent ne retarde pas les autres
+
+Chaque client a sa file de messages à envoyer (un message = les
+datagrammes d'une frame pour ce client), bornée à SEND_QUEUE_DEPTH : quand
+elle est pleine, le message le plus ancien est jeté (il serait de toute
+façon dépassé par le suivant). Un thread d'envoi vide les files à tour de
+rôle, un message par client et par tour, sur un socket non bloquant :
+un tampon noyau plein ne bloque jamais l'étage d'envoi, il attend que le
+socket redevienne disponible en écriture.
+
+Sous Linux, un tour part en appels sendmmsg groupés (voir batch_send) :
+quelques appels système par frame au lieu d'un sendto par datagramme et
+par client.
+
+Les erreurs d'envoi (hôte injoignable, port fermé...) sont comptées par
+client et journalisées au plus une fois par ERROR_LOG_INTERVAL.
+"""
+import errno
+import logging
+import select
+import threading
+import time
+from collections import deque
+
+from ..config import SEND_QUEUE_DEPTH, SENDMMSG
+from .batch_send import HAS_SENDMMSG, MIN_BATCH_DATAGRAMS, BatchSender
+
+logger = logging.getLogger("screenshare.server.send_queue")
+
+# Secondes entre deux messages d'erreur pour un même client
+ERROR_LOG_INTERVAL = 10.0
+# Attente maximale (s) d'un socket plein ou d'un nouveau message (permet de vérifier l'arrêt)
+SEND_WAIT_TIMEOUT = 0.2
+# Erreurs d'un socket qui n'est plus utilisable (10038 : WSAENOTSOCK sous Windows)
+_FATAL_ERRNOS = {errno.EBADF, errno.ENOTSOCK}
+_FATAL_WINERRORS = {10038}
+
+
+class _ClientQueue:
+    """File d'envoi d'un client (accès sous le verrou de ClientSendQueues)."""
+
+    def __init__(self, address: tuple):
+        self.address = address
+        self.messages = deque()  # [(datagrammes, octets)]
+        self.current = None  # Message en cours d'envoi : [datagrammes, prochain indice]
+        self.queued_bytes = 0
+
+        # Stats
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.drops = 0
+        self.dropped_bytes = 0
+        self.errors = 0
+
+        # Journalisation limitée des erreurs
+        self.last_error_log = None
+        self.suppressed_errors = 0
+
+
+class ClientSendQueues:
+    """Files d'envoi bornées par client, vidées par un thread sur un socket non bloquant."""
+
+    def __init__(self, depth: int = SEND_QUEUE_DEPTH, on_drop=None, on_fatal=None, batch: bool = SENDMMSG):
+        """Initialise les files.
+
+        Args:
+            depth: Messages en attente au plus par client
+            on_drop: Fonction optionnelle on_drop(client_id), appelée quand
+                un message d'un client est jeté (sa suite de messages est rompue)
+            on_fatal: Fonction optionnelle on_fatal(erreur), appelée quand le
+                socket n'est plus utilisable (le thread d'envoi s'arrête)
+            batch: Envoi groupé par sendmmsg quand il est disponible
+        """
+        self.depth = max(1, depth)
+        self.batch = batch and HAS_SENDMMSG
+        self._on_drop = on_drop
+        self._on_fatal = on_fatal
+        self._queues = {}  # {client_id: _ClientQueue}
+        self._cond = threading.Condition()
+        self._socket = None
+        self._batch = None
+        self._thread = None
+        self._running = False
+        self._turn = 0  # Rotation du premier client servi à chaque tour
+
+        # Stats
+        self.send_calls = 0  # Appels système d'envoi (sendto ou sendmmsg)
+
+    def start(self, sock):
+        """Démarre le thread d'envoi.
+
+        Args:
+            sock: Socket UDP, passé en mode non bloquant
+        """
+        sock.setblocking(False)
+        self._socket = sock
+        self._batch = BatchSender(sock) if self.batch else None
+        self._running = True
+        self._thread = threading.Thread(target=self._send_loop, name="ss-send", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread d'envoi et vide les files."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        self._socket = None
+        self._batch = None
+        with self._cond:
+            for queue in self._queues.values():
+                queue.messages.clear()
+                queue.current = None
+                queue.queued_bytes = 0
+
+    def put(self, client_id: str, address: tuple, datagrams: list) -> bool:
+        """Ajoute un message à la file d'un client, en jetant le plus ancien si elle est pleine.
+
+        Args:
+            client_id: Identifiant du client
+            address: Tuple (ip, port) du client
+            datagrams: Datagrammes du message, envoyés dans l'ordre
+
+        Returns:
+            False si un message en attente a été jeté pour faire de la place
+        """
+        size = sum(map(len, datagrams))
+        dropped = False
+        with self._cond:
+            queue = self._queues.get(client_id)
+            if queue is None:
+                queue = self._queues[client_id] = _ClientQueue(address)
+            queue.address = address
+            while len(queue.messages) >= self.depth:
+                _, old_size = queue.messages.popleft()
+                queue.queued_bytes -= old_size
+                queue.drops += 1
+                queue.dropped_bytes += old_size
+                dropped = True
+            queue.messages.append((datagrams, size))
+            queue.queued_bytes += size
+            self._cond.notify()
+        if dropped and self._on_drop is not None:
+            self._on_drop(client_id)
+        return not dropped
+
+    def remove(self, client_id: str):
+        """Oublie la file d'un client (messages en attente compris)."""
+        with self._cond:
+            self._queues.pop(client_id, None)
+
+    def bytes_sent(self, client_id: str) -> int:
+        """Octets réellement envoyés à un client (les messages jetés n'en font pas partie)."""
+        with self._cond:
+            queue = self._queues.get(client_id)
+            return queue.bytes_sent if queue is not None else 0
+
+    def _send_loop(self):
+        """Thread d'envoi : un message par client et par tour, tant qu'il y a à envoyer."""
+        while True:
+            with self._cond:
+                while self._running and not any(q.current or q.messages for q in self._queues.values()):
+                    self._cond.wait(SEND_WAIT_TIMEOUT)
+                if not self._running:
+                    return
+                for queue in self._queues.values():
+                    if queue.current is None and queue.messages:
+                        datagrams, size = queue.messages.popleft()
+                        queue.queued_bytes -= size
+                        queue.current = [datagrams, 0]
+                ready = [(client_id, q) for client_id, q in self._queues.items() if q.current is not None]
+            # Un socket plein en cours de tour ne pénalise pas toujours les mêmes clients
+            self._turn = (self._turn + 1) % max(1, len(ready))
+            ready = ready[self._turn:] + ready[:self._turn]
+
+            blocked = False
+            if self._batch is not None:
+                batched = [(client_id, q) for client_id, q in ready if self._batch.accepts(q.address)]
+                if sum(len(q.current[0]) - q.current[1] for _, q in batched) >= MIN_BATCH_DATAGRAMS:
+                    ready = [(client_id, q) for client_id, q in ready if not self._batch.accepts(q.address)]
+                    status = self._send_batch(batched)
+                    if status is None:
+                        return
+                    blocked = not status
+            for client_id, queue in ready:
+                status = self._send_current(client_id, queue)
+                if status is None:
+                    return
+                blocked = blocked or not status
+            if blocked:
+                # Tampon noyau plein : attendre qu'il se vide plutôt que boucler
+                try:
+                    select.select([], [self._socket], [], SEND_WAIT_TIMEOUT)
+                except (OSError, ValueError, TypeError):
+                    return
+
+    def _send_current(self, client_id: str, queue: _ClientQueue):
+        """Envoie le message en cours d'un client.
+
+        Returns:
+            True si le message est terminé (envoyé ou abandonné sur erreur),
+            False si le socket est plein, None si le socket est inutilisable
+        """
+        datagrams, index = queue.current
+        start, sent = index, 0
+        try:
+            while index < len(datagrams):
+                self._socket.sendto(datagrams[index], queue.address)
+                sent += len(datagrams[index])
+                index += 1
+        except (BlockingIOError, InterruptedError):
+            self.send_calls += index - start + 1
+            with self._cond:
+                queue.current[1] = index
+                queue.bytes_sent += sent
+            return False
+        except OSError as e:
+            self.send_calls += index - start + 1
+            if e.errno in _FATAL_ERRNOS or getattr(e, 'winerror', None) in _FATAL_WINERRORS:
+                self._fatal(e)
+                return None
+            # Client injoignable : le reste du message est abandonné
+            with self._cond:
+                queue.errors += 1
+                queue.bytes_sent += sent
+                queue.current = None
+            self._log_error(client_id, queue, e)
+            return True
+        self.send_calls += index - start
+        with self._cond:
+            queue.bytes_sent += sent
+            queue.messages_sent += 1
+            queue.current = None
+        return True
+
+    def _send_batch(self, ready: list):
+        """Envoie le message en cours de plusieurs clients en appels sendmmsg.
+
+        Returns:
+            True si tous les messages sont terminés (envoyés ou abandonnés sur
+            erreur), False si le socket est plein, None si le socket est inutilisable
+        """
+        calls = self._batch.calls
+        try:
+            results, blocked = self._batch.send([(q.address, q.current[0], q.current[1]) for _, q in ready])
+        except OSError as e:
+            self._fatal(e)
+            return None
+        finally:
+            self.send_calls += self._batch.calls - calls
+        for (client_id, queue), (index, size, error) in zip(ready, results):
+            with self._cond:
+                queue.bytes_sent += size
+                if error is not None:
+                    queue.errors += 1
+                    queue.current = None
+                elif index >= len(queue.current[0]):
+                    queue.messages_sent += 1
+                    queue.current = None
+                else:
+                    queue.current[1] = index
+            if error is not None:
+                self._log_error(client_id, queue, error)
+        return not blocked
+
+    def _fatal(self, error: OSError):
+        """Arrête le thread d'envoi sur un socket inutilisable."""
+        logger.error(f"Video socket unusable ({error}), stopping sender")
+        with self._cond:
+            self._running = False
+        if self._on_fatal is not None:
+            self._on_fatal(error)
+
+    def _log_error(self, client_id: str, queue: _ClientQueue, error: OSError):
+        """Journalise une erreur d'envoi, au plus une fois par ERROR_LOG_INTERVAL et par client."""
+        now = time.monotonic()
+        if queue.last_error_log is not None and now - queue.last_error_log < ERROR_LOG_INTERVAL:
+            queue.suppressed_errors += 1
+            return
+        suppressed = f" ({queue.suppressed_errors} similar errors suppressed)" if queue.suppressed_errors else ""
+        logger.warning(f"Error sending to {client_id} at {queue.address}: {error}{suppressed}")
+        queue.last_error_log = now
+        queue.suppressed_errors = 0
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques des files.
+
+        Returns:
+            Dictionnaire {client_id: {backlog, backlog_bytes, sent, sent_bytes,
+            drops, dropped_bytes, errors}}
+        """
+        with self._cond:
+            return {
+                client_id: {
+                    'backlog': len(q.messages) + (q.current is not None),
+                    'backlog_bytes': q.queued_bytes,
+                    'sent': q.messages_sent,
+                    'sent_bytes': q.bytes_sent,
+                    'drops': q.drops,
+                    'dropped_bytes': q.dropped_bytes,
+                    'errors': q.errors,
+                }
+                for client_id, q in self._queues.items()
+            }
@@ -0,0 +1,153 @@
+"""
+Niveau de flux - État d'encodage d'une variante (résolution, qualité, cadence)
+"""
+from ..common.raw_codec import available_methods
+from ..config import TILE_SIZE, FULL_REFRESH_INTERVAL, KEYFRAME_INTERVAL, TARGET_FPS, TILE_CACHE, SCROLL_DETECTION
+from .delta_encoder import DeltaEncoder
+from .h264_encoder import H264Encoder
+from .scroll_detector import ScrollDetector
+from .tile_cache import TileCache
+from .tile_classifier import LosslessTileEncoder
+from .tile_diff import TileDiffer
+
+# Variantes d'encodage d'un niveau
+VARIANT_JPEG = 'jpeg'  # Tuiles JPEG modifiées
+VARIANT_DELTA = 'delta'  # Keyframes JPEG puis tuiles delta
+VARIANT_H264 = 'h264'  # Flux H.264 (PyAV / libx264)
+VARIANT_RAW = 'raw'  # Tuiles brutes LZ4/zstd (réseau local, CPU minimal)
+
+# Bits de l'identifiant de flux distinguant les variantes d'un niveau
+VARIANT_FLAGS = {VARIANT_JPEG: 0, VARIANT_DELTA: 0x100, VARIANT_H264: 0x200, VARIANT_RAW: 0x300}
+LEVEL_MASK = 0xFF
+# Bit des flux tuiles dont le texte et les aplats partent sans perte
+LOSSLESS_FLAG = 0x400
+
+
+def stream_key(level_id: int, variant: str = VARIANT_JPEG, lossless: bool = False) -> int:
+    """Identifiant de flux d'un niveau dans une variante d'encodage."""
+    return level_id | VARIANT_FLAGS[variant] | (LOSSLESS_FLAG if lossless else 0)
+
+
+def stream_variant(stream_id: int) -> str:
+    """Variante d'encodage d'un identifiant de flux."""
+    flags = stream_id & ~(LEVEL_MASK | LOSSLESS_FLAG)
+    return next(v for v, f in VARIANT_FLAGS.items() if f == flags)
+
+
+def stream_lossless(stream_id: int) -> bool:
+    """Indique si un flux code le texte et les aplats sans perte."""
+    return bool(stream_id & LOSSLESS_FLAG)
+
+
+class StreamLevel:
+    """Variante du flux partagée par les clients qui la reçoivent.
+
+    Chaque niveau a son propre comparateur de tuiles, ses numéros de frame
+    et son identifiant de flux dans les en-têtes de fragment : un client
+    qui change de niveau reçoit d'abord une frame complète. Chaque variante
+    d'encodage (delta, H.264, brut) d'un niveau est un flux distinct, reçu
+    par les clients qui l'ont négociée.
+    """
+
+    def __init__(self, level_id: int, width: int, quality: int, fps: float = None,
+                 variant: str = VARIANT_JPEG, lossless: bool = False):
+        """Initialise le niveau.
+
+        Args:
+            level_id: Identifiant du niveau
+            width: Largeur des frames encodées
+            quality: Qualité JPEG des tuiles
+            fps: Cadence maximale (None = cadence de capture)
+            variant: VARIANT_JPEG, VARIANT_DELTA, VARIANT_H264 ou VARIANT_RAW
+            lossless: Choix du codec par tuile selon le contenu (variantes tuiles)
+        """
+        self.level_id = level_id
+        self.width = width
+        self.quality = quality
+        self.fps = fps
+        self.variant = variant
+        self.differ = TileDiffer(TILE_SIZE)
+        self.delta = DeltaEncoder(TILE_SIZE) if variant == VARIANT_DELTA else None
+        self.h264 = H264Encoder(quality, fps or TARGET_FPS) if variant == VARIANT_H264 else None
+        self.lossless = LosslessTileEncoder() if lossless and variant in (VARIANT_JPEG, VARIANT_DELTA) else None
+        # Méthode de compression des tuiles brutes : la plus rapide disponible
+        self.raw = available_methods()[0] if variant == VARIANT_RAW else None
+        # Références aux tuiles déjà dans le cache des clients (variantes tuiles)
+        self.cache = TileCache(self.stream_id, TILE_SIZE) if TILE_CACHE and variant != VARIANT_H264 else None
+        # Défilement envoyé comme copie de bloc (variantes tuiles)
+        self.scroll = ScrollDetector() if SCROLL_DETECTION and variant != VARIANT_H264 else None
+        # Tuiles du client issues d'une copie approchée, à renvoyer exactement
+        self.approximate = False
+        self.moved = False  # Dernière frame encodée avec une copie de bloc
+        # Les pertes d'un flux delta ou H.264 sont réparées sur demande du client
+        self.refresh_interval = FULL_REFRESH_INTERVAL if variant in (VARIANT_JPEG, VARIANT_RAW) else KEYFRAME_INTERVAL
+        self.last_keyframe_request = 0.0
+        self.tile_seq = 0
+        self.force_full = True
+        self.last_full_refresh = 0.0
+        self.last_encoded_at = None
+        self.frame_size = None  # (largeur, hauteur) de la dernière frame encodée
+        # Zones modifiées des captures sautées (cadence réduite), None = inconnues
+        self.pending_damage = []
+
+        # Stats
+        self.frames_encoded = 0
+        self.bytes_encoded = 0
+
+    @property
+    def stream_id(self) -> int:
+        """Identifiant de flux dans les en-têtes de fragment."""
+        return stream_key(self.level_id, self.variant, self.lossless is not None)
+
+    def is_due(self, now: float) -> bool:
+        """Indique si une frame doit être encodée à cet instant (cadence du niveau)."""
+        if self.fps is None or self.last_encoded_at is None or self.force_full:
+            return True
+        # Tolérance de 10 % pour ne pas sauter une échéance à cause de la gigue de capture
+        return now - self.last_encoded_at >= 0.9 / self.fps
+
+    def needs_refresh(self, now: float, interval: float) -> bool:
+        """Indique si le niveau doit être encodé même sur un écran inchangé.
+
+        Args:
+            now: Instant courant
+            interval: Délai maximal entre deux frames complètes
+        """
+        return (self.force_full or self.differ.has_pending or self.pending_damage != [] or self.approximate
+                or now - self.last_full_refresh >= interval)
+
+    def add_damage(self, damage):
+        """Cumule les zones modifiées d'une capture non encodée."""
+        if damage is None or self.pending_damage is None:
+            self.pending_damage = None
+        else:
+            self.pending_damage = self.pending_damage + damage
+
+    def take_damage(self, damage):
+        """Retourne les zones cumulées plus celles de la capture courante, puis les oublie."""
+        pending = self.pending_damage
+        self.pending_damage = []
+        if damage is None or pending is None:
+            return None
+        return pending + damage
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques du niveau."""
+        stats = {
+            'width': self.width,
+            'quality': self.quality,
+            'fps': self.fps,
+            'frames_encoded': self.frames_encoded,
+            'bytes_encoded': self.bytes_encoded,
+        }
+        if self.delta is not None:
+            stats['delta'] = self.delta.get_stats()
+        if self.h264 is not None:
+            stats['h264'] = self.h264.get_stats()
+        if self.lossless is not None:
+            stats['lossless'] = self.lossless.get_stats()
+        if self.cache is not None:
+            stats['cache'] = self.cache.get_stats()
+        if self.scroll is not None:
+            stats['scroll'] = self.scroll.get_stats()
+        return stats
@@ -0,0 +1,152 @@
+"""
+Cache de tuiles - Références aux tuiles déjà connues des clients
+
+Une tuile de la grille est identifiée par une empreinte de ses pixels
+source (blake2b 64 bits, salée par l'identifiant du flux : une tuile n'est
+référencée que dans le flux qui l'a encodée). Le serveur demande au
+client de mémoriser les tuiles qu'il envoie (TILE_CODEC_CACHE_STORE,
+après les tuiles du message) ; le client rend dans ses rapports de
+réception la liste des tuiles mémorisées et de celles évincées de son
+LRU. Une tuile connue de tous les abonnés d'un flux part alors comme une
+référence de 8 octets (TILE_CODEC_CACHE_REF) au lieu d'être réencodée.
+
+Les tuiles modifiées par deux frames rapprochées (vidéo, défilement) ne
+sont ni cherchées ni mémorisées : leur contenu ne revient pas.
+"""
+import hashlib
+import struct
+import threading
+
+import numpy as np
+
+# Taille des clés de tuile (octets)
+KEY_SIZE = 8
+# Délai (s) en dessous duquel une tuile modifiée par deux frames est animée
+ANIMATION_WINDOW = 0.25
+
+
+def tile_key(region: np.ndarray, stream_id: int) -> bytes:
+    """Empreinte des pixels d'une tuile.
+
+    Args:
+        region: Pixels BGR (ou BGRA) de la tuile
+        stream_id: Flux qui encode la tuile
+
+    Returns:
+        Clé de KEY_SIZE octets
+    """
+    digest = hashlib.blake2b(digest_size=KEY_SIZE, salt=struct.pack('!H', stream_id & 0xFFFF))
+    digest.update(struct.pack('!HHB', *region.shape))
+    digest.update(np.ascontiguousarray(region))
+    return digest.digest()
+
+
+class KnownTiles:
+    """Clés des tuiles qu'un client a confirmé garder en cache."""
+
+    def __init__(self):
+        """Initialise l'ensemble (vide)."""
+        self._lock = threading.Lock()  # Rapports (thread de commandes) et encodage
+        self.keys = frozenset()
+
+    def acknowledge(self, stored: list, evicted: list):
+        """Applique la partie 'tile_cache' d'un rapport de réception.
+
+        Args:
+            stored: Clés (hexadécimal) mémorisées depuis le rapport précédent
+            evicted: Clés (hexadécimal) sorties du cache du client
+        """
+        try:
+            added = {bytes.fromhex(key) for key in stored or ()}
+            removed = {bytes.fromhex(key) for key in evicted or ()}
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            # Ensemble remplacé (et non modifié) : l'encodage en garde une vue stable
+            self.keys = frozenset((self.keys - removed) | added)
+
+
+class TileCache:
+    """Recherche des tuiles d'un flux dans le cache de ses abonnés."""
+
+    def __init__(self, stream_id: int, tile_size: int):
+        """Initialise le cache du flux.
+
+        Args:
+            stream_id: Identifiant du flux (sel des clés)
+            tile_size: Côté des tuiles de la grille
+        """
+        self.stream_id = stream_id
+        self.tile_size = tile_size
+        self._known = frozenset()
+        self._previous = None  # Tuiles modifiées à la frame précédente
+        self._previous_at = None
+        self._animated = None  # Tuiles modifiées par deux frames rapprochées
+        self._lock = threading.Lock()  # Les bandes sont encodées en parallèle
+
+        # Stats
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+        self.animated_tiles = 0
+
+    def begin_frame(self, dirty: np.ndarray, full: bool, known: list, now: float):
+        """Prépare la recherche pour une frame.
+
+        Args:
+            dirty: Masque (lignes, colonnes) des tuiles encodées
+            full: Frame complète (le masque ne dit rien de l'activité)
+            known: KnownTiles des abonnés du flux qui ont un cache
+            now: Horodatage de la capture
+        """
+        keys = [tiles.keys for tiles in known]
+        self._known = frozenset.intersection(*keys) if keys else frozenset()
+        previous = self._previous
+        if (full or previous is None or previous.shape != dirty.shape
+                or now - self._previous_at > ANIMATION_WINDOW):
+            self._animated = None
+        else:
+            self._animated = previous & dirty
+        self._previous = None if full else dirty.copy()
+        self._previous_at = now
+
+    def lookup(self, frame: np.ndarray, x: int, y: int, w: int, h: int):
+        """Cherche une tuile de la grille dans le cache des abonnés.
+
+        Args:
+            frame: Frame redimensionnée du flux
+            x, y, w, h: Tuile (alignée sur la grille)
+
+        Returns:
+            Tuple (clé, connue des abonnés) ; clé None pour une tuile animée,
+            à encoder sans la mémoriser
+        """
+        animated = self._animated
+        ts = self.tile_size
+        if animated is not None and animated[y // ts, x // ts]:
+            with self._lock:
+                self.animated_tiles += 1
+            return None, False
+        key = tile_key(frame[y:y + h, x:x + w], self.stream_id)
+        hit = key in self._known
+        with self._lock:
+            self.lookups += 1
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return key, hit
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques du cache.
+
+        Returns:
+            Dictionnaire {lookups, hits, hit_rate, misses, animated_tiles}
+        """
+        return {
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            'misses': self.misses,
+            'animated_tiles': self.animated_tiles,
+        }
@@ -0,0 +1,114 @@
+"""
+Classement des tuiles - Choix du codec selon le contenu (texte, aplat, image)
+
+Quelques statistiques peu coûteuses suffisent à distinguer le contenu
+d'une tuile : nombre de couleurs distinctes (sur un pixel sur
+SAMPLE_STRIDE dans chaque direction), uniformité et densité de contours
+(sur le canal vert). Le texte et les aplats partent sans perte, les
+images (photos, vidéo, dégradés) en JPEG.
+"""
+import threading
+from typing import Optional
+
+import numpy as np
+
+from ..common.lossless_codec import pack_lossless
+
+TILE_FLAT = 'flat'
+TILE_TEXT = 'text'
+TILE_IMAGE = 'image'
+
+# Pas d'échantillonnage du comptage de couleurs
+SAMPLE_STRIDE = 4
+# Couleurs distinctes (échantillon) en dessous desquelles la tuile est du texte ou de l'interface
+TEXT_MAX_COLORS = 32
+# Texte lissé (anti-aliasing) : plus de couleurs, mais beaucoup de contours francs
+SMOOTH_TEXT_MAX_COLORS = 96
+TEXT_EDGE_DENSITY = 0.08
+# Écart sur le canal vert entre pixels voisins compté comme contour
+EDGE_THRESHOLD = 48
+# Débit (bits par pixel) au-delà duquel le sans perte coûte trop cher face au JPEG
+LOSSLESS_MAX_BPP = 6.0
+
+
+def count_colors(region: np.ndarray) -> int:
+    """Nombre de couleurs distinctes d'une région BGR (ou BGRA, alpha ignoré)."""
+    pixels = region[..., :3].astype(np.uint32)
+    keys = np.sort(pixels[..., 0] | (pixels[..., 1] << 8) | (pixels[..., 2] << 16), axis=None)
+    return 1 + int(np.count_nonzero(keys[1:] != keys[:-1]))
+
+
+def classify_tile(region: np.ndarray) -> str:
+    """Classe une tuile selon son contenu.
+
+    Args:
+        region: Pixels BGR (ou BGRA) de la tuile
+
+    Returns:
+        TILE_FLAT, TILE_TEXT ou TILE_IMAGE
+    """
+    colors = count_colors(region[::SAMPLE_STRIDE, ::SAMPLE_STRIDE])
+    if colors == 1:
+        return TILE_FLAT
+    if colors <= TEXT_MAX_COLORS:
+        return TILE_TEXT
+    if colors > SMOOTH_TEXT_MAX_COLORS or region.shape[1] < 2:
+        return TILE_IMAGE
+    # Le canal vert suffit comme approximation de la luminance
+    green = region[..., 1].astype(np.int16)
+    edges = np.count_nonzero(np.abs(np.diff(green, axis=1)) >= EDGE_THRESHOLD)
+    return TILE_TEXT if edges >= TEXT_EDGE_DENSITY * green.size else TILE_IMAGE
+
+
+class LosslessTileEncoder:
+    """Code sans perte les tuiles de texte et d'aplat d'un flux.
+
+    Les images, et les tuiles dont la version sans perte dépasse
+    LOSSLESS_MAX_BPP, sont laissées au JPEG.
+    """
+
+    def __init__(self):
+        """Initialise l'encodeur."""
+        self._lock = threading.Lock()  # Les bandes sont encodées en parallèle
+
+        # Stats
+        self.tiles = {TILE_FLAT: 0, TILE_TEXT: 0, TILE_IMAGE: 0}
+        self.lossless_bytes = 0
+        self.fallback_tiles = 0
+
+    def encode(self, region: np.ndarray) -> Optional[bytes]:
+        """Encode une tuile sans perte si son contenu s'y prête.
+
+        Args:
+            region: Pixels BGR (ou BGRA) de la tuile
+
+        Returns:
+            Données sans perte, ou None si la tuile doit être envoyée en JPEG
+        """
+        kind = classify_tile(region)
+        data = None
+        if kind != TILE_IMAGE:
+            data = pack_lossless(region)
+            if len(data) * 8 > LOSSLESS_MAX_BPP * region.shape[0] * region.shape[1]:
+                data = None
+        with self._lock:
+            self.tiles[kind] += 1
+            if data is not None:
+                self.lossless_bytes += len(data)
+            elif kind != TILE_IMAGE:
+                self.fallback_tiles += 1
+        return data
+
+    def get_stats(self) -> dict:
+        """Retourne les statistiques de l'encodeur.
+
+        Returns:
+            Dictionnaire {flat_tiles, text_tiles, image_tiles, lossless_bytes, fallback_tiles}
+        """
+        return {
+            'flat_tiles': self.tiles[TILE_FLAT],
+            'text_tiles': self.tiles[TILE_TEXT],
+            'image_tiles': self.tiles[TILE_IMAGE],
+            'lossless_bytes': self.lossless_bytes,
+            'fallback_tiles': self.fallback_tiles,
+        }
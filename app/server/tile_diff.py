@@ -0,0 +1,235 @@
+"""
+Détection des zones modifiées - Comparaison par tuiles entre deux frames
+"""
+import zlib
+import numpy as np
+
+
+def frame_fingerprint(frame: np.ndarray, stride: int = 4) -> int:
+    """Calcule une empreinte CRC32 d'une ligne sur `stride` de la frame.
+
+    Les lignes sont prises sur toute leur largeur : un changement d'au moins
+    `stride` pixels de haut (texte, curseur) modifie toujours l'empreinte.
+    Aucune copie n'est faite pour une frame contiguë.
+
+    Args:
+        frame: Frame capturée (avant redimensionnement)
+        stride: Écart entre deux lignes échantillonnées
+
+    Returns:
+        Empreinte 32 bits
+    """
+    if not frame.flags.c_contiguous:
+        frame = np.ascontiguousarray(frame)
+    crc = 0
+    for row in range(0, frame.shape[0], max(1, stride)):
+        crc = zlib.crc32(frame[row], crc)
+    return crc
+
+
+class TileDiffer:
+    """Compare chaque frame à la précédente sur une grille de tuiles fixes."""
+
+    def __init__(self, tile_size: int = 64):
+        """Initialise le comparateur.
+
+        Args:
+            tile_size: Côté d'une tuile en pixels
+        """
+        self.tile_size = tile_size
+        self._previous = None
+        self._pending = None  # Tuiles à renvoyer (messages perdus avant envoi)
+
+    def reset(self):
+        """Oublie la frame précédente (le prochain diff sera complet)."""
+        self._previous = None
+        self._pending = None
+
+    @property
+    def reference(self):
+        """Dernière frame mémorisée (image du client), None avant la première."""
+        return self._previous
+
+    def move(self, src_x: int, src_y: int, x: int, y: int, w: int, h: int):
+        """Applique à la frame mémorisée la copie de bloc envoyée au client.
+
+        Args:
+            src_x, src_y: Position du bloc source
+            x, y, w, h: Rectangle de destination
+        """
+        if self._previous is not None:
+            # numpy gère le recouvrement de la source et de la destination
+            self._previous[y:y + h, x:x + w] = self._previous[src_y:src_y + h, src_x:src_x + w]
+
+    def approximate_tiles(self, frame: np.ndarray, rect: tuple, max_error: float) -> np.ndarray:
+        """Tuiles d'une copie approchée assez proches de la frame pour être gardées.
+
+        Args:
+            frame: Frame courante
+            rect: Rectangle (x, y, largeur, hauteur) recopié chez le client
+            max_error: Écart moyen maximal (par canal) d'une tuile gardée
+
+        Returns:
+            Masque booléen (lignes, colonnes) des tuiles entièrement dans le
+            rectangle dont la frame mémorisée (copie du client) reste proche
+        """
+        keep = np.zeros(self.grid_shape(frame), dtype=bool)
+        previous = self._previous
+        if previous is None or previous.shape != frame.shape:
+            return keep
+        ts = self.tile_size
+        x, y, w, h = rect
+        # Tuiles entièrement couvertes : les autres contiennent aussi la bande découverte
+        c0, r0 = -(-x // ts), -(-y // ts)
+        c1 = (x + w) // ts if x + w < frame.shape[1] else -(-(x + w) // ts)
+        r1 = (y + h) // ts if y + h < frame.shape[0] else -(-(y + h) // ts)
+        if c1 <= c0 or r1 <= r0:
+            return keep
+        y0, y1, x0, x1 = r0 * ts, min(r1 * ts, frame.shape[0]), c0 * ts, min(c1 * ts, frame.shape[1])
+        current, before = frame[y0:y1, x0:x1], previous[y0:y1, x0:x1]
+        # Écart absolu sans débordement des uint8
+        error = np.maximum(current, before) - np.minimum(current, before)
+        sums = np.add.reduceat(error.sum(axis=2, dtype=np.uint32), np.arange(0, y1 - y0, ts), axis=0)
+        sums = np.add.reduceat(sums, np.arange(0, x1 - x0, ts), axis=1)
+        heights = np.minimum(ts, (y1 - y0) - np.arange(0, y1 - y0, ts))
+        widths = np.minimum(ts, (x1 - x0) - np.arange(0, x1 - x0, ts))
+        counts = np.outer(heights, widths) * frame.shape[2]
+        keep[r0:r1, c0:c1] = sums <= counts * max_error
+        return keep
+
+    @property
+    def has_pending(self) -> bool:
+        """True si des tuiles perdues avant envoi attendent d'être renvoyées."""
+        return self._pending is not None
+
+    def grid_shape(self, frame: np.ndarray) -> tuple:
+        """Retourne le nombre de tuiles (lignes, colonnes) pour une frame."""
+        h, w = frame.shape[:2]
+        ts = self.tile_size
+        return (h + ts - 1) // ts, (w + ts - 1) // ts
+
+    def diff(self, frame: np.ndarray, full: bool = False, damage=None,
+             scale: tuple = (1.0, 1.0), keep: np.ndarray = None) -> np.ndarray:
+        """Calcule le masque des tuiles modifiées et mémorise la frame.
+
+        Args:
+            frame: Frame BGR courante
+            full: Force toutes les tuiles à modifiées
+            damage: Zones modifiées signalées par le backend de capture
+                (None = inconnues, comparaison des pixels)
+            scale: Facteurs (x, y) entre la capture et la frame redimensionnée
+            keep: Tuiles d'une copie approchée laissées telles quelles chez le
+                client (non envoyées ; la frame mémorisée garde la copie)
+
+        Returns:
+            Masque booléen (lignes, colonnes) des tuiles modifiées
+        """
+        grid = self.grid_shape(frame)
+        previous = self._previous
+
+        if full or previous is None or previous.shape != frame.shape:
+            dirty = np.ones(grid, dtype=bool)
+            if previous is None or previous.shape != frame.shape:
+                self._previous = frame.copy()
+            else:
+                np.copyto(previous, frame)
+        elif damage is not None:
+            # Zones fournies par le backend : aucune comparaison de pixels
+            dirty = self._damage_mask(damage, frame.shape, scale)
+            for x, y, w, h in self.dirty_rects(dirty, frame.shape):
+                previous[y:y + h, x:x + w] = frame[y:y + h, x:x + w]
+        else:
+            # Pixels modifiés (tous canaux), puis réduction par bloc de tuiles
+            changed = np.any(frame != previous, axis=2) if frame.ndim == 3 else frame != previous
+            ts = self.tile_size
+            rows = np.arange(0, frame.shape[0], ts)
+            cols = np.arange(0, frame.shape[1], ts)
+            dirty = np.logical_or.reduceat(changed, rows, axis=0)
+            dirty = np.logical_or.reduceat(dirty, cols, axis=1)
+            kept = []
+            if keep is not None:
+                if self._pending is not None and self._pending.shape == keep.shape:
+                    keep = keep & ~self._pending
+                dirty &= ~keep
+                kept = [(rect, previous[rect[1]:rect[1] + rect[3], rect[0]:rect[0] + rect[2]].copy())
+                        for rect in self.dirty_rects(keep, frame.shape)]
+            np.copyto(previous, frame)
+            for (x, y, w, h), pixels in kept:
+                previous[y:y + h, x:x + w] = pixels
+
+        if self._pending is not None:
+            if self._pending.shape == dirty.shape:
+                dirty |= self._pending
+            self._pending = None
+        return dirty
+
+    def _damage_mask(self, damage: list, frame_shape: tuple, scale: tuple) -> np.ndarray:
+        """Convertit des rectangles de capture en masque de tuiles.
+
+        Args:
+            damage: Rectangles (x, y, largeur, hauteur) en coordonnées de capture
+            frame_shape: Forme de la frame redimensionnée
+            scale: Facteurs (x, y) capture -> frame redimensionnée
+
+        Returns:
+            Masque booléen (lignes, colonnes)
+        """
+        h, w = frame_shape[:2]
+        rows, cols = (h + self.tile_size - 1) // self.tile_size, (w + self.tile_size - 1) // self.tile_size
+        mask = np.zeros((rows, cols), dtype=bool)
+        sx, sy = scale
+        # Marge pour l'interpolation du redimensionnement qui déborde du rectangle
+        margin = 2
+        for x, y, rw, rh in damage:
+            if rw <= 0 or rh <= 0:
+                continue
+            x0 = max(0, int(x * sx) - margin)
+            y0 = max(0, int(y * sy) - margin)
+            x1 = min(w, int(np.ceil((x + rw) * sx)) + margin)
+            y1 = min(h, int(np.ceil((y + rh) * sy)) + margin)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            mask[y0 // self.tile_size:(y1 - 1) // self.tile_size + 1,
+                 x0 // self.tile_size:(x1 - 1) // self.tile_size + 1] = True
+        return mask
+
+    def mark_dirty(self, mask: np.ndarray):
+        """Réinjecte des tuiles dont la mise à jour n'a pas été envoyée.
+
+        Args:
+            mask: Masque booléen (lignes, colonnes) des tuiles à renvoyer
+        """
+        if mask is None:
+            return
+        if self._pending is None or self._pending.shape != mask.shape:
+            self._pending = mask.copy()
+        else:
+            self._pending |= mask
+
+    def dirty_rects(self, dirty: np.ndarray, frame_shape: tuple) -> list:
+        """Convertit un masque de tuiles en rectangles.
+
+        Les tuiles modifiées contiguës d'une même rangée sont fusionnées pour
+        limiter le surcoût d'en-tête de chaque JPEG.
+
+        Args:
+            dirty: Masque booléen (lignes, colonnes)
+            frame_shape: Forme de la frame (hauteur, largeur, ...)
+
+        Returns:
+            Liste de tuples (x, y, largeur, hauteur)
+        """
+        h, w = frame_shape[:2]
+        ts = self.tile_size
+        rects = []
+        for row in np.flatnonzero(dirty.any(axis=1)):
+            cols = np.flatnonzero(dirty[row])
+            # Début de chaque suite de colonnes contiguës
+            breaks = np.flatnonzero(np.diff(cols) != 1) + 1
+            y = int(row) * ts
+            rh = min(ts, h - y)
+            for run in np.split(cols, breaks):
+                x = int(run[0]) * ts
+                rw = min((int(run[-1]) + 1) * ts, w) - x
+                rects.append((x, y, rw, rh))
+        return rects
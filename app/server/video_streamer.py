@@ -2,33 +2,88 @@
 Streamer vidéo - Capture et envoi des frames
 """
 import cv2
-import imutils
 import numpy as np
 import socket
+import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-try:
-    import pyscreenshot as ImageGrab
-except ImportError:
-    from PIL import ImageGrab
-
-try:
-    import mss
-    HAS_MSS = True
-except ImportError:
-    HAS_MSS = False
-
-from ..config import DEFAULT_WIDTH, JPEG_QUALITY
+from ..config import (
+    DEFAULT_WIDTH, JPEG_QUALITY, MIN_JPEG_QUALITY,
+    MAX_DATAGRAM_SIZE, MAX_FRAME_BYTES, ENCODER_THREADS, KEEPALIVE_INTERVAL,
+    IDLE_REFRESH_INTERVAL, FINGERPRINT_STRIDE, ADAPTIVE_QUALITY, DELTA_CODEC, VIDEO_CODEC,
+    LOSSLESS_TILES, TILE_SIZE, MULTICAST_GROUP, MULTICAST_PORT, MULTICAST_TTL, MULTICAST_INTERFACE,
+)
+from ..common.protocol import (
+    CAP_TILES, CAP_CHUNKS, CAP_DELTA, CAP_H264, CAP_LOSSLESS, CAP_RAW_LZ4, CAP_RAW_ZSTD, CAP_TILE_CACHE,
+    CAP_COPY_RECT, CAP_FEC_XOR, CAP_FEC_RS, CAP_NACK, CAP_MULTICAST, TIER_FULL, FLAG_FULL, TILE_CODEC_JPEG, TILE_CODEC_DELTA, TILE_CODEC_H264, TILE_CODEC_LOSSLESS,
+    TILE_CODEC_RAW, TILE_CODEC_CACHE_REF, TILE_CODEC_CACHE_STORE, TILE_CODEC_COPY,
+    Tile, pack_tiles, pack_keepalive, pack_copy,
+    chunk_frame, parity_frame,
+)
+from ..common.fec import FEC_RS, FEC_XOR
+from ..common.multicast import configure_sender
+from ..common.raw_codec import RAW_LZ4, RAW_ZSTD, available_methods, pack_raw
+from .capture import create_capture
+from .frame_governor import FrameRateGovernor
+from .pipeline import LatestSlot
+from .quality_control import STREAM_LEVELS, ClientQualityController, level_width
+from .rate_model import JpegRateModel
+from .retransmit import RetransmitBuffer
+from .scroll_detector import MOVE_MAX_ERROR
+from .send_queue import ClientSendQueues
+from .h264_encoder import HAS_PYAV
+from .jpeg_encoder import create_jpeg_encoder
+from .stream_level import (
+    LEVEL_MASK, VARIANT_DELTA, VARIANT_H264, VARIANT_JPEG, VARIANT_RAW, StreamLevel, stream_key,
+    stream_lossless, stream_variant,
+)
+from .tile_cache import KnownTiles
+from .tile_diff import frame_fingerprint
 
 logger = logging.getLogger("screenshare.server.video")
 
-# Taille maximale UDP
+# Taille maximale UDP (frames JPEG brutes des anciens clients, non fragmentées)
 MAX_UDP_PAYLOAD = 60000
 
+# Délai minimal (s) entre deux keyframes demandées par les clients d'un flux
+KEYFRAME_REQUEST_INTERVAL = 0.5
+
+# Capacité annoncée par les clients qui décodent chaque méthode de tuiles brutes
+RAW_METHOD_CAPS = {RAW_LZ4: CAP_RAW_LZ4, RAW_ZSTD: CAP_RAW_ZSTD}
+
+# Surface minimale (pixels) d'une bande encodée en parallèle
+MIN_STRIPE_AREA = 65536
+
+# Délai d'attente des étages du pipeline (permet de vérifier l'arrêt)
+STAGE_WAIT_TIMEOUT = 0.2
+
+# Messages incomplets pris en compte au plus par NACK
+MAX_NACK_FRAMES = 32
+
+# File d'envoi du groupe multicast (aucun client_id n'a cette forme)
+MULTICAST_QUEUE = '<multicast>'
+
 
 class VideoStreamer:
-    """Gère la capture d'écran et l'envoi des frames vidéo."""
+    """Gère la capture d'écran et l'envoi des frames vidéo.
+
+    Le traitement est découpé en trois étages reliés par des buffers
+    « le plus récent gagne » : la capture (appelée par le thread vidéo du
+    serveur), l'encodage et l'envoi, chacun sur son propre thread. L'envoi
+    dépose les datagrammes dans la file de chaque client (ClientSendQueues),
+    vidée par un thread dédié sur un socket non bloquant.
+
+    Les clients tuiles sont répartis sur des niveaux de qualité
+    (StreamLevel) : vignette pour le tier thumbnail, sinon niveau choisi par
+    leur contrôleur à partir de leurs rapports de réception. Chaque niveau
+    utilisé est encodé une fois par frame, quel que soit son nombre d'abonnés.
+    
+    En mode multicast, les clients qui ont rejoint le groupe reçoivent un
+    flux commun, envoyé une seule fois par frame : niveau du membre le plus
+    économe, variante et parité que tous les membres décodent.
+    """
     
     def __init__(self, monitor_manager):
         """Initialise le streamer vidéo.
@@ -40,27 +95,110 @@ class VideoStreamer:
         self.socket = None
         self.is_streaming = False
         self.connected_clients = {}  # {client_id: (ip, port)}
-        self._mss_context = None
+        self.client_caps = {}  # {client_id: set(capacités)}
+        
+        # Backend de capture persistant (tous moniteurs, y compris « Tous les écrans »)
+        self._capture = create_capture(monitor_manager)
+        
+        # Pipeline capture -> encodage -> envoi
+        self._capture_slot = LatestSlot(
+            "capture", merge=self._merge_captures, on_discard=self._discard_capture
+        )
+        self._encode_slot = LatestSlot("encode")
+        self._encode_thread = None
+        self._send_thread = None
+        
+        # Mises à jour partielles par tuiles, un état par niveau de qualité utilisé
+        self._levels = {}  # {stream_id: StreamLevel}
+        # Numéros tile_seq des niveaux abandonnés : un niveau recréé les poursuit,
+        # sinon le client prendrait ses messages pour des retardataires
+        self._retired_seqs = {}
+        # Dernier numéro de transport par flux, attribué par l'étage d'envoi : un
+        # paquet écrasé avant envoi ne laisse pas de trou que le client prendrait pour une perte
+        self._message_seqs = {}  # {stream_id: message_seq}
+        self._controllers = {}  # {client_id: ClientQualityController}
+        self._known_tiles = {}  # {client_id: KnownTiles} des clients qui ont un cache de tuiles
+        # Fragments envoyés récemment, renvoyés sur NACK
+        self._retransmit = RetransmitBuffer()
+        # Files d'envoi par client : un client lent ou injoignable ne retarde pas les autres
+        self._send_queues = ClientSendQueues(on_drop=self._on_send_drop, on_fatal=self._on_socket_error)
+        # Clients qui reçoivent le flux principal par le groupe multicast
+        self._multicast = set()
+        # Octets du groupe déjà envoyés à l'arrivée de chaque membre, et reçus par les anciens membres
+        self._multicast_base = {}  # {client_id: octets du groupe à l'adhésion}
+        self._multicast_credit = {}  # {client_id: octets reçus du groupe avant de le quitter}
+        
+        # Cadence de capture (appliquée par la boucle vidéo du serveur)
+        self.frame_governor = FrameRateGovernor()
+        self._dirty_sum = 0.0
+        self._dirty_samples = 0
+        
+        # Suppression des frames identiques (écran statique)
+        self._last_fingerprint = None
+        self._last_legacy = None  # Dernier JPEG brut, renvoyé comme keep-alive
+        self._last_input_at = None
+        self._last_packet_at = 0.0
+        
+        # Buffers réutilisés par l'étage d'encodage (redimensionnement, conversion)
+        self._frame_buffers = {}
+        
+        # Encodage parallèle des bandes (l'encodeur JPEG libère le GIL)
+        self._encoder_pool = None
+        self._jpeg = create_jpeg_encoder()
+        
+        # Choix qualité/échelle des frames JPEG brutes (anciens clients)
+        self._rate_model = JpegRateModel(JPEG_QUALITY, MIN_JPEG_QUALITY)
         
         # Stats
         self.frame_count = 0
+        self.captured_count = 0
+        self.encoded_count = 0
+        self.unchanged_count = 0
+        self.keepalive_count = 0
+        self.fec_datagrams = 0
+        self.idle_seconds = 0.0
         self.last_log_time = time.time()
     
     def start(self):
-        """Démarre le streaming (crée le socket)."""
+        """Démarre le streaming (crée le socket et les étages du pipeline)."""
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if MULTICAST_GROUP:
+            try:
+                configure_sender(self.socket, MULTICAST_TTL, MULTICAST_INTERFACE)
+            except OSError as e:
+                logger.warning(f"Multicast setup failed ({e}), clients stay on unicast")
         self.is_streaming = True
+        if VIDEO_CODEC == 'h264' and not HAS_PYAV:
+            logger.warning("SS_VIDEO_CODEC=h264 but PyAV is not installed, using JPEG tiles")
         self.frame_count = 0
+        self.captured_count = 0
+        self.encoded_count = 0
+        self.unchanged_count = 0
+        self.keepalive_count = 0
+        self.idle_seconds = 0.0
         self.last_log_time = time.time()
+        self._last_fingerprint = None
+        self._last_legacy = None
+        self._last_input_at = None
+        self._dirty_sum = 0.0
+        self._dirty_samples = 0
+        self.frame_governor.reset()
+        self._capture_slot.reset()
+        self._encode_slot.reset()
+        for stream_id, level in self._levels.items():
+            self._retired_seqs[stream_id] = level.tile_seq
+        self._levels = {}
+        if ENCODER_THREADS > 1:
+            self._encoder_pool = ThreadPoolExecutor(
+                max_workers=ENCODER_THREADS, thread_name_prefix="ss-encode"
+            )
+        logger.info(f"Using {self._capture.name} for screen capture")
         
-        # Initialiser mss si disponible et moniteur spécifique sélectionné
-        if HAS_MSS and self.monitor_manager.selected_monitor > 0:
-            try:
-                self._mss_context = mss.mss()
-                logger.info("Using mss for screen capture")
-            except Exception as e:
-                logger.warning(f"Failed to create mss context: {e}, falling back to PIL")
-                self._mss_context = None
+        self._encode_thread = threading.Thread(target=self._encode_loop, daemon=True)
+        self._send_thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._send_queues.start(self.socket)
+        self._encode_thread.start()
+        self._send_thread.start()
         
         logger.info("Video streamer started")
     
@@ -68,12 +206,21 @@ class VideoStreamer:
         """Arrête le streaming."""
         self.is_streaming = False
         
-        if self._mss_context:
-            try:
-                self._mss_context.close()
-            except Exception:
-                pass
-            self._mss_context = None
+        # Réveiller et attendre les étages avant de fermer le socket
+        self._capture_slot.close()
+        self._encode_slot.close()
+        for thread in (self._encode_thread, self._send_thread):
+            if thread and thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+        self._encode_thread = None
+        self._send_thread = None
+        self._send_queues.stop()
+        
+        if self._encoder_pool:
+            self._encoder_pool.shutdown(wait=False)
+            self._encoder_pool = None
+        
+        self._capture.close()
         
         if self.socket:
             try:
@@ -84,14 +231,44 @@ class VideoStreamer:
         
         logger.info("Video streamer stopped")
     
-    def add_client(self, client_id: str, address: tuple):
+    def add_client(self, client_id: str, address: tuple, caps=None, tier: str = TIER_FULL, fec=None):
         """Ajoute un client pour recevoir le flux.
         
         Args:
             client_id: Identifiant unique du client
             address: Tuple (ip, port)
+            caps: Capacités annoncées par le client (None = ancien client, JPEG brut)
+            tier: Tier de flux demandé (clients tuiles uniquement)
+            fec: Taux de parité demandé ('auto', 0 à 1 ; None = 'auto')
         """
+        caps = set(caps or ())
         self.connected_clients[client_id] = address
+        self.client_caps[client_id] = caps
+        # Nouvelle session : compteurs d'envoi repartant de zéro pour le contrôleur
+        self._send_queues.remove(client_id)
+        self._leave_multicast(client_id)
+        self._multicast_credit.pop(client_id, None)
+        if CAP_TILES in caps and CAP_CHUNKS in caps:
+            # Les flux bruts utilisent la méthode la plus rapide du serveur
+            methods = available_methods()
+            raw_capable = bool(methods) and RAW_METHOD_CAPS[methods[0]] in caps
+            # Reed-Solomon répare plusieurs pertes par groupe, XOR une seule
+            fec_method = FEC_RS if CAP_FEC_RS in caps else FEC_XOR if CAP_FEC_XOR in caps else None
+            controller = ClientQualityController(
+                client_id, adaptive=ADAPTIVE_QUALITY, tier=tier, raw_capable=raw_capable, fec_method=fec_method,
+            )
+            if fec is not None and not controller.set_fec(fec):
+                logger.warning(f"Invalid FEC ratio {fec!r} from {client_id}, using auto")
+            self._controllers[client_id] = controller
+            if CAP_TILE_CACHE in caps:
+                self._known_tiles[client_id] = KnownTiles()
+            else:
+                self._known_tiles.pop(client_id, None)
+            # Le nouveau client doit recevoir une frame complète
+            self._request_full(self._client_stream(client_id))
+        else:
+            self._controllers.pop(client_id, None)
+            self._known_tiles.pop(client_id, None)
     
     def remove_client(self, client_id: str):
         """Retire un client.
@@ -101,9 +278,265 @@ class VideoStreamer:
         """
         if client_id in self.connected_clients:
             del self.connected_clients[client_id]
+        self.client_caps.pop(client_id, None)
+        self._controllers.pop(client_id, None)
+        self._known_tiles.pop(client_id, None)
+        self._send_queues.remove(client_id)
+        self._leave_multicast(client_id)
+        self._multicast_credit.pop(client_id, None)
+    
+    def on_receiver_report(self, client_id: str, report: dict):
+        """Traite un rapport de réception et ajuste le niveau du client.
+        
+        Args:
+            client_id: Identifiant du client
+            report: Rapport envoyé sur le canal de commandes
+        """
+        controller = self._controllers.get(client_id)
+        if controller is None:
+            return
+        known = self._known_tiles.get(client_id)
+        tile_cache = report.get('tile_cache')
+        if known is not None and isinstance(tile_cache, dict):
+            known.acknowledge(tile_cache.get('stored'), tile_cache.get('evicted'))
+        if controller.on_report(report, self._client_bytes_sent(client_id)):
+            # Nouveau niveau : le client repart d'une frame complète
+            self._request_full(self._client_stream(client_id))
+    
+    def set_client_tier(self, client_id: str, tier: str):
+        """Abonne un client à un autre tier, sans reconnexion.
+        
+        Args:
+            client_id: Identifiant du client
+            tier: TIER_FULL ou TIER_THUMBNAIL
+        """
+        controller = self._controllers.get(client_id)
+        if controller is not None and controller.set_tier(tier):
+            self._request_full(self._client_stream(client_id))
+    
+    def on_nack(self, client_id: str, frames) -> int:
+        """Renvoie à un client les fragments qu'il n'a pas reçus.
+        
+        Args:
+            client_id: Identifiant du client
+            frames: Messages incomplets [[flux, seq, [[premier fragment, nombre], ...]], ...]
+            
+        Returns:
+            Nombre de fragments renvoyés
+        """
+        address = self.connected_clients.get(client_id)
+        if address is None or not self.socket or not isinstance(frames, list):
+            return 0
+        now = time.monotonic()
+        datagrams = []
+        for entry in frames[:MAX_NACK_FRAMES]:
+            try:
+                stream_id, seq, ranges = int(entry[0]), int(entry[1]), [(int(a), int(b)) for a, b in entry[2]]
+            except (TypeError, ValueError, IndexError):
+                continue
+            datagrams.extend(self._retransmit.lookup(stream_id, seq, ranges, now))
+        if datagrams:
+            # Compté comme envoyé par la file : la perte mesurée par le contrôleur reste juste
+            self._send_queues.put(client_id, address, datagrams)
+        return len(datagrams)
+    
+    def multicast_info(self):
+        """Groupe multicast annoncé aux clients (réponse à 'register', découverte).
+        
+        Returns:
+            Dictionnaire {group, port, ttl}, ou None si le mode multicast est désactivé
+        """
+        if not MULTICAST_GROUP:
+            return None
+        return {'group': MULTICAST_GROUP, 'port': MULTICAST_PORT, 'ttl': MULTICAST_TTL}
+    
+    def set_client_multicast(self, client_id: str, joined: bool) -> bool:
+        """Fait passer un client du groupe multicast à l'unicast, ou l'inverse.
+        
+        Args:
+            client_id: Identifiant du client
+            joined: True si le client a rejoint le groupe, False s'il l'a quitté
+            
+        Returns:
+            True si le client reçoit désormais le flux par le groupe
+        """
+        if not joined:
+            if client_id in self._multicast:
+                self._leave_multicast(client_id)
+                logger.info(f"Client {client_id} left the multicast group, back to unicast")
+                # Le client repart d'une frame complète sur son propre flux
+                self._request_full(self._client_stream(client_id))
+            return False
+        if not MULTICAST_GROUP or client_id not in self._controllers:
+            return False
+        if CAP_MULTICAST not in self.client_caps.get(client_id, ()):
+            return False
+        if client_id not in self._multicast:
+            self._multicast_base[client_id] = self._send_queues.bytes_sent(MULTICAST_QUEUE)
+            self._multicast.add(client_id)
+            logger.info(f"Client {client_id} joined the multicast group {MULTICAST_GROUP}:{MULTICAST_PORT}")
+            # Le flux commun peut changer (niveau, variante) : tous les membres repartent d'une frame complète
+            self._request_full(self._multicast_stream())
+        return True
+    
+    def _leave_multicast(self, client_id: str):
+        """Retire un client du groupe, en gardant les octets qu'il en a reçus."""
+        self._multicast.discard(client_id)
+        base = self._multicast_base.pop(client_id, None)
+        if base is not None:
+            received = self._send_queues.bytes_sent(MULTICAST_QUEUE) - base
+            self._multicast_credit[client_id] = self._multicast_credit.get(client_id, 0) + received
+    
+    def _on_multicast(self, client_id: str) -> bool:
+        """Indique si le client reçoit le flux principal par le groupe (les vignettes restent en unicast)."""
+        if client_id not in self._multicast:
+            return False
+        controller = self._controllers.get(client_id)
+        return controller is not None and controller.tier == TIER_FULL
+    
+    def _multicast_members(self) -> list:
+        """Clients servis par le groupe multicast."""
+        return [c for c in list(self._multicast) if self._on_multicast(c)]
+    
+    def _client_bytes_sent(self, client_id: str) -> int:
+        """Octets envoyés à un client, par sa file unicast et par le groupe multicast."""
+        sent = self._send_queues.bytes_sent(client_id) + self._multicast_credit.get(client_id, 0)
+        base = self._multicast_base.get(client_id)
+        if base is not None:
+            sent += self._send_queues.bytes_sent(MULTICAST_QUEUE) - base
+        return sent
+    
+    def set_client_fec(self, client_id: str, ratio) -> bool:
+        """Change le taux de parité FEC envoyé à un client.
+        
+        Args:
+            client_id: Identifiant du client
+            ratio: Fragments de parité par fragment de données (0 désactive), ou 'auto'
+            
+        Returns:
+            False si le client est inconnu ou la valeur invalide
+        """
+        controller = self._controllers.get(client_id)
+        return controller is not None and controller.set_fec(ratio)
+    
+    def request_keyframe(self, client_id: str):
+        """Traite une demande de keyframe d'un client qui a perdu des messages.
+        
+        Les demandes sont limitées à une par KEYFRAME_REQUEST_INTERVAL et par
+        flux : les clients d'un même flux qui perdent la même frame n'en
+        déclenchent qu'une.
+        
+        Args:
+            client_id: Identifiant du client
+        """
+        level = self._levels.get(self._client_stream(client_id))
+        if level is None:
+            return
+        now = time.monotonic()
+        if now - level.last_keyframe_request < KEYFRAME_REQUEST_INTERVAL:
+            return
+        level.last_keyframe_request = now
+        level.force_full = True
+        logger.debug(f"Keyframe requested by {client_id} on stream {level.stream_id}")
+    
+    def _on_send_drop(self, client_id: str):
+        """Un message en attente d'un client a été jeté : sa suite de tuiles est rompue."""
+        if client_id == MULTICAST_QUEUE:
+            # Tous les membres ont perdu le message : le premier qui le signale déclenchera la keyframe
+            members = self._multicast_members()
+            if members:
+                self.request_keyframe(members[0])
+        elif self._client_uses_tiles(client_id):
+            # Sans attendre que le client constate le trou et demande une keyframe
+            self.request_keyframe(client_id)
+    
+    def _on_socket_error(self, error: OSError):
+        """Le socket vidéo n'est plus utilisable : arrêt du streaming."""
+        logger.error(f"Video socket error ({error}), stopping video streamer")
+        self.is_streaming = False
+    
+    def _request_full(self, stream_id: int):
+        """Demande une frame complète sur un flux (créé à la prochaine frame s'il n'existe pas)."""
+        level = self._levels.get(stream_id)
+        if level is not None:
+            level.force_full = True
+    
+    def _client_stream(self, client_id: str):
+        """Flux reçu par un client tuiles (None pour un ancien client).
+        
+        Le niveau vient du contrôleur de qualité ; la variante (H.264,
+        delta) et les tuiles sans perte sont choisies parmi ce que le client
+        a négocié à l'enregistrement et que le serveur propose. Le mode brut,
+        décidé par le contrôleur selon le débit du lien, passe avant tout.
+        Les membres du groupe multicast reçoivent le flux commun.
+        """
+        controller = self._controllers.get(client_id)
+        if controller is None:
+            return None
+        if self._on_multicast(client_id):
+            return self._multicast_stream()
+        caps = self.client_caps.get(client_id, ())
+        if controller.uses_raw:
+            return stream_key(controller.stream_level, VARIANT_RAW)
+        return self._stream_for(controller.stream_level, caps)
+    
+    def _multicast_stream(self):
+        """Flux du groupe multicast : niveau du membre le plus économe, capacités communes à tous.
+        
+        Le mode brut, réservé aux liens mesurés comme très rapides, n'est
+        pas utilisé pour le groupe.
+        """
+        members = self._multicast_members()
+        if not members:
+            return None
+        caps = set.intersection(*(set(self.client_caps.get(c, ())) for c in members))
+        controllers = [self._controllers.get(c) for c in members]
+        level = max((c.stream_level for c in controllers if c is not None), default=None)
+        return None if level is None else self._stream_for(level, caps)
+    
+    def _stream_for(self, level: int, caps) -> int:
+        """Flux d'un niveau dans la meilleure variante que des capacités permettent."""
+        if VIDEO_CODEC == 'h264' and HAS_PYAV and CAP_H264 in caps:
+            variant = VARIANT_H264
+        elif DELTA_CODEC and CAP_DELTA in caps:
+            variant = VARIANT_DELTA
+        else:
+            variant = VARIANT_JPEG
+        lossless = LOSSLESS_TILES and CAP_LOSSLESS in caps and variant != VARIANT_H264
+        return stream_key(level, variant, lossless)
+    
+    def _active_levels(self) -> list:
+        """Crée les flux utilisés par au moins un client et oublie les autres.
+        
+        Returns:
+            Liste des StreamLevel à encoder, du meilleur au plus économe
+        """
+        used = {self._client_stream(c) for c in list(self._controllers)} - {None}
+        for stream_id in [s for s in self._levels if s not in used]:
+            level = self._levels.pop(stream_id)
+            self._retired_seqs[stream_id] = level.tile_seq
+        for stream_id in used:
+            if stream_id not in self._levels:
+                level_id = stream_id & LEVEL_MASK
+                spec = STREAM_LEVELS[level_id]
+                level = StreamLevel(
+                    level_id, level_width(spec), spec.quality, spec.fps,
+                    variant=stream_variant(stream_id), lossless=stream_lossless(stream_id),
+                )
+                level.tile_seq = self._retired_seqs.pop(stream_id, 0)
+                self._levels[stream_id] = level
+        return [self._levels[s] for s in sorted(used)]
+    
+    def _client_uses_tiles(self, client_id: str) -> bool:
+        """Indique si le client reçoit les tuiles fragmentées (sinon JPEG brut)."""
+        caps = self.client_caps.get(client_id, ())
+        return CAP_TILES in caps and CAP_CHUNKS in caps
     
     def capture_and_send(self) -> bool:
-        """Capture une frame et l'envoie aux clients.
+        """Capture une frame et la transmet à l'étage d'encodage.
+        
+        L'encodage et l'envoi sont réalisés par les threads du pipeline ;
+        cet appel ne fait que la capture et ne bloque jamais sur eux.
         
         Returns:
             True si succès, False si erreur fatale
@@ -124,164 +557,816 @@ class VideoStreamer:
             if frame is None:
                 return True  # Pas d'erreur fatale, juste pas de frame
             
-            # Redimensionner
-            frame = imutils.resize(frame, width=DEFAULT_WIDTH)
-            
-            # Encoder en JPEG
-            jpeg_bytes = self._encode_frame(frame)
-            if jpeg_bytes is None:
-                return True
-            
-            # Envoyer aux clients
-            self._send_to_clients(jpeg_bytes)
-            
-            # Log périodique
-            self._log_stats()
-            
+            self.captured_count += 1
+            self._capture_slot.put((frame, time.monotonic(), self._capture.damage()))
+            self.frame_governor.adapt(self._activity())
             return True
             
         except Exception as e:
             logger.debug(f"Error in capture_and_send: {e}")
             return True
     
+    def _discard_capture(self, captured: tuple):
+        """Rend au pool du backend la frame d'une capture jamais encodée (arrêt du streaming)."""
+        self._capture.release(captured[0])
+    
+    def _merge_captures(self, displaced: tuple, item: tuple) -> tuple:
+        """Reporte les zones modifiées d'une capture écrasée sur la suivante.
+        
+        La frame écrasée est rendue au pool du backend.
+
+        Args:
+            displaced: Capture (frame, horodatage, zones) jamais encodée
+            item: Nouvelle capture
+
+        Returns:
+            Nouvelle capture dont les zones couvrent les deux
+        """
+        frame, captured_at, damage = item
+        self._capture.release(displaced[0])
+        previous = displaced[2]
+        if damage is None or previous is None:
+            return frame, captured_at, None
+        return frame, captured_at, previous + damage
+
+    def _encode_loop(self):
+        """Étage d'encodage : redimensionne et encode la frame la plus récente."""
+        while self.is_streaming:
+            captured = self._capture_slot.get(timeout=STAGE_WAIT_TIMEOUT)
+            if captured is None:
+                continue
+            captured_frame, captured_at, damage = captured
+            
+            try:
+                wants_legacy = any(not self._client_uses_tiles(c) for c in list(self.connected_clients))
+                levels = self._active_levels()
+                
+                # Écran inchangé : ni redimensionnement ni encodage
+                unchanged = self._is_unchanged(captured_frame, captured_at, damage)
+                if unchanged and not self._needs_encode(captured_at, levels, wants_legacy):
+                    self._send_keepalive(captured_at, levels)
+                    continue
+                
+                packet = {
+                    'legacy': None, 'tiles': {}, 'dirty': {}, 'moved': set(),
+                    'timestamp': int(captured_at * 1000),
+                }
+                
+                # Redimensionnement et conversion en BGR, une fois par largeur
+                prepared = {}
+                # Un encodeur qui accepte le BGRA évite la conversion aux flux tout JPEG
+                bgra = self._jpeg.accepts_bgra
+                
+                # Frame complète en JPEG pour les anciens clients
+                if wants_legacy:
+                    frame, _ = self._prepared(captured_frame, DEFAULT_WIDTH, prepared, bgra)
+                    packet['legacy'] = self._last_legacy = self._encode_frame(frame)
+                
+                # Tuiles modifiées de chaque niveau utilisé par les clients compatibles
+                for level in levels:
+                    if unchanged and not level.needs_refresh(captured_at, IDLE_REFRESH_INTERVAL):
+                        continue
+                    if not level.is_due(captured_at):
+                        # Cadence réduite : les zones modifiées seront encodées plus tard
+                        level.add_damage(damage)
+                        continue
+                    frame, scale = self._prepared(
+                        captured_frame, level.width, prepared, bgra and level.variant == VARIANT_JPEG
+                    )
+                    if level.h264 is not None:
+                        level.take_damage(damage)
+                        messages, dirty = self._encode_h264(level, frame, captured_at)
+                    else:
+                        messages, dirty = self._encode_tiles(
+                            level, frame, level.take_damage(damage), scale, captured_at
+                        )
+                    packet['dirty'][level.stream_id] = dirty
+                    if level.moved:
+                        packet['moved'].add(level.stream_id)
+                    if messages:
+                        packet['tiles'][level.stream_id] = messages
+                
+                if not packet['legacy'] and not packet['tiles']:
+                    continue
+                
+                self.encoded_count += 1
+                self._put_packet(packet, captured_at)
+            except Exception as e:
+                logger.debug(f"Error in encode stage: {e}")
+            finally:
+                self._capture.release(captured_frame)
+    
+    def _put_packet(self, packet: dict, captured_at: float):
+        """Transmet un paquet à l'étage d'envoi."""
+        self._last_packet_at = captured_at
+        displaced = self._encode_slot.put(packet)
+        if displaced is not None:
+            # Tuiles jamais envoyées : à renvoyer avec la prochaine frame
+            for stream_id, dirty in displaced['dirty'].items():
+                level = self._levels.get(stream_id)
+                if level is not None and (level.h264 is not None or stream_id in displaced['moved']):
+                    # Frame H.264 perdue, ou copie de bloc jamais appliquée par le
+                    # client : les frames suivantes en dépendent
+                    level.force_full = True
+                elif level is not None:
+                    level.differ.mark_dirty(dirty)
+                    if level.delta is not None:
+                        level.delta.invalidate(dirty)
+    
+    def _activity(self) -> dict:
+        """Compteurs cumulés utilisés par le régulateur de cadence."""
+        return {
+            'changed': self.encoded_count,
+            'unchanged': self.unchanged_count,
+            'drops': self._capture_slot.drop_count,
+            'dirty_sum': self._dirty_sum,
+            'dirty_samples': self._dirty_samples,
+        }
+    
+    def _is_unchanged(self, frame: np.ndarray, captured_at: float, damage) -> bool:
+        """Indique si la capture est identique à la précédente.
+        
+        Les zones signalées par le backend suffisent quand elles sont
+        connues ; sinon une empreinte est calculée sur la frame brute.
+        Le temps passé sur un écran inchangé est cumulé dans idle_seconds.
+        
+        Args:
+            frame: Frame capturée (avant redimensionnement)
+            captured_at: Horodatage de la capture
+            damage: Zones modifiées signalées par le backend (None = inconnues)
+        """
+        if damage is None:
+            fingerprint = (frame.shape, frame_fingerprint(frame, FINGERPRINT_STRIDE))
+            unchanged = fingerprint == self._last_fingerprint
+        else:
+            fingerprint = None
+            unchanged = not damage
+        self._last_fingerprint = fingerprint
+        
+        if unchanged:
+            self.unchanged_count += 1
+            if self._last_input_at is not None:
+                self.idle_seconds += captured_at - self._last_input_at
+        self._last_input_at = captured_at
+        return unchanged
+    
+    def _needs_encode(self, now: float, levels: list, wants_legacy: bool) -> bool:
+        """Indique si une frame inchangée doit tout de même être encodée.
+        
+        C'est le cas pour un nouveau client, des tuiles perdues à renvoyer,
+        des zones modifiées pas encore encodées (niveau à cadence réduite)
+        ou le rafraîchissement complet périodique de l'écran statique.
+        """
+        if wants_legacy and self._last_legacy is None:
+            return True
+        return any(level.needs_refresh(now, IDLE_REFRESH_INTERVAL) and level.is_due(now) for level in levels)
+    
+    def _send_keepalive(self, now: float, levels: list):
+        """Envoie un message « rien n'a changé » à basse fréquence.
+        
+        Les clients tuiles reçoivent un en-tête sans tuile, les anciens
+        clients le dernier JPEG (sans le réencoder).
+        """
+        if now - self._last_packet_at < KEEPALIVE_INTERVAL:
+            return
+        tiles = {
+            level.stream_id: [pack_keepalive(level.tile_seq, *level.frame_size)]
+            for level in levels if level.frame_size
+        }
+        if not tiles and not self._last_legacy:
+            return
+        self.keepalive_count += 1
+        self._put_packet({
+            'legacy': self._last_legacy, 'tiles': tiles, 'dirty': {}, 'moved': set(),
+            'timestamp': int(now * 1000),
+        }, now)
+    
+    def _send_loop(self):
+        """Étage d'envoi : transmet la dernière frame encodée aux clients."""
+        while self.is_streaming:
+            packet = self._encode_slot.get(timeout=STAGE_WAIT_TIMEOUT)
+            if packet is None:
+                continue
+            
+            try:
+                # Envoyer aux clients
+                self._send_to_clients(packet)
+                
+                # Log périodique
+                self._log_stats()
+            except Exception as e:
+                logger.debug(f"Error in send stage: {e}")
+    
     def _capture_frame(self) -> np.ndarray:
         """Capture une frame de l'écran.
         
         Returns:
             Frame en format BGR numpy array, ou None en cas d'erreur
         """
-        capture_bbox = self.monitor_manager.get_capture_bbox()
-        use_mss = self._mss_context is not None and self.monitor_manager.selected_monitor > 0
+        return self._capture.grab()
+    
+    def _frame_buffer(self, name: str, shape: tuple) -> np.ndarray:
+        """Retourne un buffer réutilisé de l'étage d'encodage.
         
-        try:
-            if use_mss:
-                return self._capture_with_mss()
-            else:
-                return self._capture_with_pil(capture_bbox)
-        except Exception as e:
-            logger.debug(f"Capture failed: {e}")
-            # Fallback vers PIL
-            return self._capture_with_pil(capture_bbox)
+        Le buffer n'est réalloué que si la géométrie change.
+        
+        Args:
+            name: Nom du buffer
+            shape: Forme attendue
+        """
+        buffer = self._frame_buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self._frame_buffers[name] = buffer
+        return buffer
     
-    def _capture_with_mss(self) -> np.ndarray:
-        """Capture avec mss.
+    def _prepare_frame(self, frame: np.ndarray, width: int = DEFAULT_WIDTH, keep_alpha: bool = False) -> np.ndarray:
+        """Redimensionne la capture à la largeur donnée et la convertit en BGR.
         
+        Le résultat est écrit dans des buffers réutilisés (un jeu par
+        largeur) : il reste valide jusqu'à la frame suivante.
+        
+        Args:
+            frame: Frame capturée (BGR ou BGRA)
+            width: Largeur de sortie
+            keep_alpha: Garde une capture BGRA telle quelle (encodeur BGRA)
+            
         Returns:
-            Frame en format BGR
+            Frame BGR (ou BGRA si keep_alpha) redimensionnée
         """
-        monitor = self._mss_context.monitors[self.monitor_manager.selected_monitor]
-        sct_img = self._mss_context.grab(monitor)
-        frame = np.array(sct_img, dtype=np.uint8)
-        # mss retourne BGRA, convertir en BGR
-        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        source_h, source_w = frame.shape[:2]
+        height = int(source_h * width / float(source_w))
+        channels = frame.shape[2]
+        
+        # Redimensionner avant de convertir : la conversion porte sur moins de pixels
+        if (source_w, source_h) != (width, height):
+            resized = self._frame_buffer(f'resized-{width}', (height, width, channels))
+            cv2.resize(frame, (width, height), dst=resized, interpolation=cv2.INTER_AREA)
+            frame = resized
+        if channels == 4 and not keep_alpha:
+            bgr = self._frame_buffer(f'bgr-{width}', (height, width, 3))
+            cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=bgr)
+            frame = bgr
+        return frame
     
-    def _capture_with_pil(self, bbox: tuple = None) -> np.ndarray:
-        """Capture avec PIL/pyscreenshot.
+    def _prepared(self, captured: np.ndarray, width: int, cache: dict, keep_alpha: bool = False) -> tuple:
+        """Retourne la capture préparée à une largeur, en la calculant au plus une fois.
         
         Args:
-            bbox: Bounding box optionnelle (left, top, right, bottom)
+            captured: Frame capturée
+            width: Largeur voulue
+            cache: Frames déjà préparées pour cette capture {(largeur, keep_alpha): (frame, échelle)}
+            keep_alpha: Accepte une frame BGRA (encodeur JPEG BGRA)
             
         Returns:
-            Frame en format BGR
+            Tuple (frame BGR ou BGRA, facteurs (x, y) capture -> frame)
         """
-        if bbox:
-            img_pil = ImageGrab.grab(bbox=bbox)
-        else:
-            img_pil = ImageGrab.grab()
-        frame = np.array(img_pil, dtype=np.uint8)
-        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        key = (width, keep_alpha)
+        if key not in cache:
+            other = cache.get((width, not keep_alpha))
+            if other is not None and (keep_alpha or other[0].shape[2] == 3):
+                # Même largeur déjà préparée : en BGR, elle convient aussi à l'encodeur BGRA
+                cache[key] = other
+            elif other is not None:
+                # Frame BGRA déjà redimensionnée : seule la conversion reste à faire
+                cache[key] = (self._prepare_frame(other[0], width), other[1])
+            else:
+                frame = self._prepare_frame(captured, width, keep_alpha)
+                source_h, source_w = captured.shape[:2]
+                cache[key] = (frame, (frame.shape[1] / source_w, frame.shape[0] / source_h))
+        return cache[key]
     
-    def _encode_frame(self, frame: np.ndarray) -> bytes:
-        """Encode une frame en JPEG.
+    def _encode_tiles(self, level: StreamLevel, frame: np.ndarray, damage=None,
+                      scale: tuple = (1.0, 1.0), now: float = None) -> tuple:
+        """Encode uniquement les tuiles modifiées depuis la frame précédente du niveau.
         
         Args:
-            frame: Frame BGR à encoder
+            level: Niveau de qualité encodé
+            frame: Frame BGR (ou BGRA) redimensionnée à la largeur du niveau
+            damage: Zones modifiées signalées par le backend (None = inconnues)
+            scale: Facteurs (x, y) entre la capture et la frame redimensionnée
+            now: Horodatage de la capture
             
         Returns:
-            Bytes JPEG, ou None en cas d'erreur
+            Tuple (liste des messages à envoyer ou None, masque des tuiles
+            encodées ou recopiées)
         """
-        encode_params = [
-            cv2.IMWRITE_JPEG_QUALITY, int(JPEG_QUALITY),
-            cv2.IMWRITE_JPEG_OPTIMIZE, 1,
-            cv2.IMWRITE_JPEG_PROGRESSIVE, 1,
+        now = time.monotonic() if now is None else now
+        full = level.force_full or (now - level.last_full_refresh) >= level.refresh_interval
+        level.force_full = False
+        level.last_encoded_at = now
+        level.frame_size = (frame.shape[1], frame.shape[0])
+        
+        move = self._detect_move(level, frame, full, damage, scale)
+        keep = None
+        if move is not None or level.approximate:
+            # Zone signalée entièrement modifiée (ou tuiles approchées à reprendre) :
+            # seule la comparaison des pixels avec l'image du client isole les écarts
+            damage = None
+        if move is not None and not move.exact:
+            keep = level.differ.approximate_tiles(frame, move.rect, MOVE_MAX_ERROR)
+        dirty = level.differ.diff(frame, full=full, damage=damage, scale=scale, keep=keep)
+        level.approximate = keep is not None and bool(keep.any())
+        level.moved = move is not None
+        if not full:
+            self._dirty_sum += float(dirty.mean())
+            self._dirty_samples += 1
+        if not dirty.any() and move is None:
+            return None, dirty
+        if level.delta is not None and not full and level.delta.is_scene_change(dirty):
+            # Changement de scène : une keyframe coûte moins que les deltas
+            dirty[:] = True
+        if dirty.all():
+            full = True
+            level.last_full_refresh = now
+            if level.delta is not None:
+                level.delta.keyframe(frame)
+            move = None  # Toutes les tuiles repartent
+            level.approximate = level.moved = False
+        cache = self._begin_cache(level, dirty, full, now)
+        
+        rects = level.differ.dirty_rects(dirty, frame.shape)
+        # La copie doit précéder toutes les tuiles de la frame : un seul message
+        stripes = self._split_stripes(rects) if move is None else [rects]
+        
+        level.tile_seq += 1
+        flags = FLAG_FULL if full else 0
+        parts = len(stripes)
+        # Keyframe en JPEG, puis tuiles delta pour les clients qui les ont négociées
+        delta = level.delta if not full else None
+        jobs = [
+            (frame, rects, level.tile_seq, flags, part, parts, level.quality, delta, level.lossless, level.raw, cache,
+             move)
+            for part, rects in enumerate(stripes)
         ]
+        if self._encoder_pool and parts > 1:
+            messages = list(self._encoder_pool.map(lambda job: self._encode_stripe(*job), jobs))
+        else:
+            messages = [self._encode_stripe(*job) for job in jobs]
         
-        encoded, buffer = cv2.imencode('.jpg', frame, encode_params)
-        if not encoded:
-            logger.debug("cv2.imencode returned False")
+        level.frames_encoded += 1
+        level.bytes_encoded += sum(len(message) for message in messages)
+        return messages, dirty
+    
+    def _subscribers(self, level: StreamLevel) -> list:
+        """Clients tuiles qui reçoivent le flux d'un niveau."""
+        return [c for c in list(self._controllers) if self._client_stream(c) == level.stream_id]
+    
+    def _detect_move(self, level: StreamLevel, frame: np.ndarray, full: bool, damage, scale: tuple):
+        """Détecte un défilement et l'applique aux références du niveau.
+        
+        Args:
+            level: Niveau encodé
+            frame: Frame redimensionnée du niveau
+            full: Frame complète (aucune détection)
+            damage: Zones modifiées signalées par le backend (None = inconnues)
+            scale: Facteurs (x, y) entre la capture et la frame redimensionnée
+            
+        Returns:
+            Move à envoyer avant les tuiles, ou None
+        """
+        if full or level.scroll is None:
+            return None
+        subscribers = self._subscribers(level)
+        if not subscribers or any(CAP_COPY_RECT not in self.client_caps.get(c, ()) for c in subscribers):
             return None
+        move = level.scroll.detect(level.differ.reference, frame, damage, scale)
+        if move is None:
+            return None
+        level.differ.move(move.src_x, move.src_y, *move.rect)
+        if level.delta is not None:
+            level.delta.move(move.src_x, move.src_y, *move.rect)
+        return move
+    
+    def _begin_cache(self, level: StreamLevel, dirty: np.ndarray, full: bool, now: float):
+        """Prépare le cache de tuiles du niveau pour la frame encodée.
         
-        jpeg_bytes = buffer.tobytes()
+        Args:
+            level: Niveau encodé
+            dirty: Masque des tuiles encodées
+            full: Frame complète
+            now: Horodatage de la capture
+            
+        Returns:
+            TileCache du niveau, ou None si aucun abonné n'a de cache de tuiles
+        """
+        if level.cache is None:
+            return None
+        known = [self._known_tiles[c] for c in self._subscribers(level) if c in self._known_tiles]
+        if not known:
+            return None
+        level.cache.begin_frame(dirty, full, known, now)
+        return level.cache
+    
+    def _encode_h264(self, level: StreamLevel, frame: np.ndarray, now: float) -> tuple:
+        """Encode la frame complète du niveau en H.264.
         
-        # Si trop gros pour UDP, réduire progressivement
-        if len(jpeg_bytes) > MAX_UDP_PAYLOAD:
-            jpeg_bytes = self._downscale_to_fit(frame, encode_params)
+        Args:
+            level: Niveau de variante H.264
+            frame: Frame BGR redimensionnée à la largeur du niveau
+            now: Horodatage de la capture
+            
+        Returns:
+            Tuple (liste des messages à envoyer ou None, None)
+        """
+        keyframe = level.force_full or (now - level.last_full_refresh) >= level.refresh_interval
+        level.force_full = False
+        level.last_encoded_at = now
+        
+        # yuv420p impose des dimensions paires
+        height, width = frame.shape[0] & ~1, frame.shape[1] & ~1
+        if (height, width) != frame.shape[:2]:
+            frame = np.ascontiguousarray(frame[:height, :width])
+        level.frame_size = (width, height)
         
-        return jpeg_bytes
+        data, keyframe = level.h264.encode(frame, keyframe, int(now * 1000))
+        if keyframe:
+            level.last_full_refresh = now
+        if not data:
+            return None, None
+        
+        level.tile_seq += 1
+        message = pack_tiles(
+            level.tile_seq, width, height, [Tile(0, 0, width, height, TILE_CODEC_H264, data)],
+            FLAG_FULL if keyframe else 0,
+        )
+        level.frames_encoded += 1
+        level.bytes_encoded += len(message)
+        return [message], None
     
-    def _downscale_to_fit(self, frame: np.ndarray, encode_params: list) -> bytes:
-        """Réduit la taille de la frame jusqu'à tenir dans UDP.
+    def _split_stripes(self, rects: list) -> list:
+        """Regroupe les rectangles modifiés en bandes horizontales de surface proche.
+        
+        Chaque bande devient un message indépendant, encodé par un worker du
+        pool et décodable par le client même si une autre bande est perdue.
         
         Args:
-            frame: Frame originale
-            encode_params: Paramètres d'encodage JPEG
+            rects: Rectangles (x, y, largeur, hauteur) triés par y
             
         Returns:
-            Bytes JPEG de taille réduite
+            Liste de listes de rectangles (au moins une)
         """
-        cur_w = frame.shape[1]
-        jpeg_bytes = None
+        total = sum(w * h for _, _, w, h in rects)
+        count = min(max(1, ENCODER_THREADS), len(rects), max(1, total // MIN_STRIPE_AREA))
+        if count <= 1:
+            return [rects]
         
-        while cur_w > 200:
-            cur_w = max(200, int(cur_w * 0.9))
-            try:
-                smaller = imutils.resize(frame, width=cur_w)
-                encoded, buffer = cv2.imencode('.jpg', smaller, encode_params)
-                if not encoded:
-                    break
-                jpeg_bytes = buffer.tobytes()
-                
-                if len(jpeg_bytes) <= MAX_UDP_PAYLOAD:
-                    logger.debug(f"Downscaled to {cur_w} => {len(jpeg_bytes)} bytes")
-                    break
-            except Exception as e:
-                logger.debug(f"Downscale error: {e}")
+        stripes = [[]]
+        target = total / count
+        area = 0
+        for rect in rects:
+            # Ne couper qu'entre deux rangées de tuiles pour garder des bandes
+            if area >= target * len(stripes) and len(stripes) < count and rect[1] != stripes[-1][-1][1]:
+                stripes.append([])
+            stripes[-1].append(rect)
+            area += rect[2] * rect[3]
+        return stripes
+    
+    def _encode_stripe(self, frame: np.ndarray, rects: list, seq: int, flags: int,
+                       part: int, parts: int, quality: int = JPEG_QUALITY, delta=None,
+                       lossless=None, raw: int = None, cache=None, move=None) -> bytes:
+        """Encode les rectangles d'une bande en un message de tuiles.
+        
+        Args:
+            frame: Frame BGR (ou BGRA) redimensionnée
+            rects: Rectangles (x, y, largeur, hauteur) de la bande
+            seq: Numéro de frame
+            flags: Drapeaux du message
+            part: Index de la bande
+            parts: Nombre de bandes de la frame
+            quality: Qualité JPEG du niveau
+            delta: DeltaEncoder du flux (None = tuiles JPEG uniquement)
+            lossless: LosslessTileEncoder du flux (None = pas de tuiles sans perte)
+            raw: Méthode des tuiles brutes (RAW_LZ4, RAW_ZSTD ; None = tuiles encodées)
+            cache: TileCache du flux (None = pas de références aux tuiles connues)
+            move: Bloc à recopier par le client avant les tuiles (défilement)
+            
+        Returns:
+            Message binaire
+        """
+        tiles = []
+        if move is not None:
+            tiles.append(Tile(*move.rect, TILE_CODEC_COPY, pack_copy(move.src_x, move.src_y)))
+        # Tuiles à mémoriser par le client, une fois celles du message décodées
+        stores = []
+        for rect in rects:
+            if cache is not None:
+                runs = self._encode_cached(frame, *rect, cache, delta, tiles)
+            else:
+                runs = [(rect, [])]
+            for (x, y, w, h), run_stores in runs:
+                if raw is not None:
+                    tiles.append(Tile(x, y, w, h, TILE_CODEC_RAW, pack_raw(frame[y:y + h, x:x + w], raw)))
+                    stores.extend(run_stores)
+                    continue
+                if delta is not None:
+                    data = delta.encode(frame, x, y, w, h)
+                    if data == b'':
+                        continue  # Aucun bloc modifié dans le rectangle
+                    if data is not None:
+                        # Un delta dépend de l'image du client : pas de mémorisation
+                        tiles.append(Tile(x, y, w, h, TILE_CODEC_DELTA, data))
+                        continue
+                if lossless is not None:
+                    # Texte et aplats sans perte, le reste du rectangle en JPEG
+                    jpeg_rects = self._encode_lossless(frame, x, y, w, h, lossless, tiles)
+                else:
+                    jpeg_rects = [(x, y, w, h)]
+                for x, y, w, h in jpeg_rects:
+                    data = self._jpeg.encode(frame[y:y + h, x:x + w], quality)
+                    if data is None:
+                        logger.debug(f"JPEG encode failed for tile {(x, y, w, h)}")
+                        continue
+                    tiles.append(Tile(x, y, w, h, TILE_CODEC_JPEG, data))
+                stores.extend(run_stores)
+        tiles.extend(stores)
+        return pack_tiles(seq, frame.shape[1], frame.shape[0], tiles, flags, part, parts)
+    
+    def _encode_cached(self, frame: np.ndarray, x: int, y: int, w: int, h: int,
+                       cache, delta, tiles: list) -> list:
+        """Remplace les tuiles d'un rectangle connues des clients par des références.
+        
+        Les tuiles restantes et contiguës sont regroupées, comme dans
+        dirty_rects(), avec les demandes de mémorisation de chacune.
+        
+        Args:
+            frame: Frame BGR (ou BGRA) redimensionnée
+            x, y, w, h: Rectangle (suite de tuiles d'une rangée)
+            cache: TileCache du flux
+            delta: DeltaEncoder du flux (référence mise à jour pour les tuiles du cache)
+            tiles: Liste des tuiles du message, complétée par les références
+            
+        Returns:
+            Liste de (rectangle à encoder, tuiles TILE_CODEC_CACHE_STORE)
+        """
+        runs = []
+        for tx in range(x, x + w, TILE_SIZE):
+            tw = min(TILE_SIZE, x + w - tx)
+            key, hit = cache.lookup(frame, tx, y, tw, h)
+            if hit:
+                tiles.append(Tile(tx, y, tw, h, TILE_CODEC_CACHE_REF, key))
+                if delta is not None:
+                    delta.update(frame, tx, y, tw, h)
+                continue
+            store = [Tile(tx, y, tw, h, TILE_CODEC_CACHE_STORE, key)] if key is not None else []
+            if runs and runs[-1][0][0] + runs[-1][0][2] == tx:
+                (rx, _, rw, _), run_stores = runs[-1]
+                runs[-1] = ((rx, y, rw + tw, h), run_stores + store)
+            else:
+                runs.append(((tx, y, tw, h), store))
+        return runs
+    
+    def _encode_lossless(self, frame: np.ndarray, x: int, y: int, w: int, h: int,
+                         lossless, tiles: list) -> list:
+        """Code sans perte les tuiles de texte et d'aplat d'un rectangle.
+        
+        Le classement se fait tuile par tuile ; les tuiles laissées au JPEG
+        et contiguës sont regroupées, comme dans dirty_rects().
+        
+        Args:
+            frame: Frame BGR (ou BGRA) redimensionnée
+            x, y, w, h: Rectangle (suite de tuiles d'une rangée)
+            lossless: LosslessTileEncoder du flux
+            tiles: Liste des tuiles du message, complétée par les tuiles sans perte
+            
+        Returns:
+            Rectangles restant à encoder en JPEG
+        """
+        jpeg_rects = []
+        for tx in range(x, x + w, TILE_SIZE):
+            tw = min(TILE_SIZE, x + w - tx)
+            data = lossless.encode(frame[y:y + h, tx:tx + tw])
+            if data is not None:
+                tiles.append(Tile(tx, y, tw, h, TILE_CODEC_LOSSLESS, data))
+            elif jpeg_rects and jpeg_rects[-1][0] + jpeg_rects[-1][2] == tx:
+                jx, _, jw, _ = jpeg_rects[-1]
+                jpeg_rects[-1] = (jx, y, jw + tw, h)
+            else:
+                jpeg_rects.append((tx, y, tw, h))
+        return jpeg_rects
+    
+    def _encode_frame(self, frame: np.ndarray) -> bytes:
+        """Encode une frame en JPEG tenant dans un seul datagramme UDP.
+        
+        Qualité et échelle sont choisies par le modèle de débit en un seul
+        essai ; au plus un réencodage correctif est fait si la prédiction
+        est dépassée.
+        
+        Args:
+            frame: Frame BGR (ou BGRA) à encoder
+            
+        Returns:
+            Bytes JPEG, ou None en cas d'erreur ou si la frame ne tient pas
+        """
+        h, w = frame.shape[:2]
+        complexity = self._rate_model.complexity(frame)
+        quality, scale = self._rate_model.choose(w, h, complexity, MAX_UDP_PAYLOAD)
+        
+        for corrective in (False, True):
+            scaled = frame if scale >= 1.0 else cv2.resize(
+                frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA
+            )
+            buffer = self._jpeg.encode(scaled, quality)
+            if buffer is None:
+                logger.debug("JPEG encode failed")
+                return None
+            
+            pixels = scaled.shape[0] * scaled.shape[1]
+            self._rate_model.observe(pixels, quality, complexity, len(buffer), MAX_UDP_PAYLOAD, corrective)
+            if len(buffer) <= MAX_UDP_PAYLOAD:
+                if scale < 1.0 or quality < JPEG_QUALITY:
+                    logger.debug(f"Encoded at q={quality} width={scaled.shape[1]} => {len(buffer)} bytes")
+                return buffer
+            
+            if corrective:
                 break
+            
+            # Prédiction dépassée : correction à partir de la taille obtenue
+            logger.debug(f"Rate model miss: q={quality} scale={scale:.2f} => {len(buffer)} bytes")
+            quality, scale = self._rate_model.correct(quality, scale, len(buffer), MAX_UDP_PAYLOAD)
         
-        return jpeg_bytes
+        logger.debug(f"Frame still above {MAX_UDP_PAYLOAD} bytes after correction, dropped")
+        return None
     
-    def _send_to_clients(self, jpeg_bytes: bytes):
+    def _send_to_clients(self, packet: dict):
         """Envoie les données à tous les clients connectés.
         
         Args:
-            jpeg_bytes: Données JPEG à envoyer
+            packet: Frame encodée {'legacy': bytes JPEG,
+                'tiles': {niveau: [message]}, ...}
         """
+        chunks = {}
+        for stream_id, messages in packet['tiles'].items():
+            framed = chunks[stream_id] = []
+            for message in messages:
+                if len(message) > MAX_FRAME_BYTES:
+                    logger.warning(f"Tile message too large ({len(message)} bytes), skipped")
+                    self._request_full(stream_id)
+                    continue
+                # Numéroté à l'envoi : seuls les messages réellement envoyés se suivent
+                seq = self._message_seqs[stream_id] = self._message_seqs.get(stream_id, 0) + 1
+                framed.append((seq, message, chunk_frame(
+                    stream_id, seq, message, MAX_DATAGRAM_SIZE, packet['timestamp']
+                )))
+        if any(CAP_NACK in self.client_caps.get(c, ()) for c in list(self.connected_clients)):
+            now = time.monotonic()
+            for stream_id, framed in chunks.items():
+                for seq, _, data in framed:
+                    self._retransmit.add(stream_id, seq, data, now)
+        # Datagrammes par flux et par réglage FEC, calculés une fois pour tous les clients
+        streams = {}
+        
+        members = self._multicast_members()
+        stream_id = self._multicast_stream() if members else None
+        if stream_id is not None and self.is_streaming and self.socket:
+            # Une seule copie pour tout le groupe
+            key = (stream_id,) + self._multicast_fec(members)
+            datagrams = streams[key] = self._stream_datagrams(chunks.get(stream_id, ()), packet['timestamp'], *key)
+            if datagrams:
+                self._send_queues.put(MULTICAST_QUEUE, (MULTICAST_GROUP, MULTICAST_PORT), datagrams)
+                self.frame_count += 1
+        
         for client_id, client_addr in list(self.connected_clients.items()):
             if not self.is_streaming or not self.socket:
                 break
+            if self._on_multicast(client_id):
+                continue
             
-            try:
-                self.socket.sendto(jpeg_bytes, client_addr)
-                self.frame_count += 1
-                
-                if self.frame_count % 100 == 0:
-                    logger.info(f"Sent {self.frame_count} frames (latest to {client_addr})")
-                    
-            except OSError as e:
-                logger.exception(f"Error sending to {client_addr}: {e}")
-                win_err = getattr(e, 'winerror', None)
-                if win_err == 10038:
-                    logger.error("Socket invalid (10038) — stopping video streamer")
-                    self.is_streaming = False
-                    break
-            except Exception as e:
-                logger.exception(f"Unexpected error sending to {client_addr}: {e}")
+            stream_id = self._client_stream(client_id)
+            if stream_id is not None:
+                key = (stream_id,) + self._client_fec(client_id)
+                datagrams = streams.get(key)
+                if datagrams is None:
+                    datagrams = streams[key] = self._stream_datagrams(
+                        chunks.get(stream_id, ()), packet['timestamp'], *key
+                    )
+            else:
+                datagrams = [packet['legacy']] if packet['legacy'] else None
+            if not datagrams:
+                continue
+            
+            # Le thread des files envoie ; un client en retard perd ses messages les plus anciens
+            self._send_queues.put(client_id, client_addr, datagrams)
+            self.frame_count += 1
+            
+            if self.frame_count % 100 == 0:
+                logger.info(f"Sent {self.frame_count} frames (latest to {client_addr})")
+    
+    def _client_fec(self, client_id: str) -> tuple:
+        """Réglage FEC d'un client : (taux de parité, méthode), (0.0, None) sans parité."""
+        controller = self._controllers.get(client_id)
+        ratio = controller.fec_ratio if controller is not None else 0.0
+        return (ratio, controller.fec_method) if ratio > 0 else (0.0, None)
+    
+    def _multicast_fec(self, members: list) -> tuple:
+        """Réglage FEC du groupe : le plus fort taux demandé, avec une méthode que tous les membres décodent."""
+        caps = [self.client_caps.get(c, ()) for c in members]
+        if all(CAP_FEC_RS in c for c in caps):
+            method = FEC_RS
+        elif all(CAP_FEC_XOR in c for c in caps):
+            method = FEC_XOR
+        else:
+            return 0.0, None
+        ratio = max((self._client_fec(c)[0] for c in members), default=0.0)
+        return (ratio, method) if ratio > 0 else (0.0, None)
+    
+    def _stream_datagrams(self, framed: list, timestamp: int, stream_id: int, ratio: float, method) -> list:
+        """Datagrammes d'un flux, chaque message suivi de sa parité.
+        
+        Args:
+            framed: Messages fragmentés [(seq, message, fragments)]
+            timestamp: Horodatage d'émission en millisecondes
+            stream_id: Identifiant du flux
+            ratio: Fragments de parité par fragment de données
+            method: FEC_XOR, FEC_RS ou None (pas de parité)
+            
+        Returns:
+            Liste de datagrammes
+        """
+        datagrams = []
+        for seq, message, data in framed:
+            datagrams.extend(data)
+            if method is not None:
+                parity = parity_frame(stream_id, seq, message, MAX_DATAGRAM_SIZE, timestamp, ratio, method)
+                datagrams.extend(parity)
+                self.fec_datagrams += len(parity)
+        return datagrams
+    
+    def get_stats(self) -> dict:
+        """Retourne les statistiques du streamer et de chaque étage.
+        
+        Returns:
+            Dictionnaire avec les compteurs globaux et, par étage,
+            la profondeur de file et le nombre de frames écrasées
+        """
+        return {
+            'frames_captured': self.captured_count,
+            'frames_encoded': self.encoded_count,
+            'frames_sent': self.frame_count,
+            'frames_unchanged': self.unchanged_count,
+            'keepalives': self.keepalive_count,
+            'fec_datagrams': self.fec_datagrams,
+            'idle_seconds': round(self.idle_seconds, 1),
+            'clients': len(self.connected_clients),
+            'capture': self._capture.get_stats(),
+            'stages': {
+                'capture': self._capture_slot.get_stats(),
+                'encode': self._encode_slot.get_stats(),
+            },
+            'jpeg': {'backend': self._jpeg.name, 'subsampling': self._jpeg.subsampling},
+            'rate_model': self._rate_model.get_stats(),
+            'retransmit': self._retransmit.get_stats(),
+            'send_queues': self._send_queues.get_stats(),
+            'send_calls': self._send_queues.send_calls,
+            'multicast_members': len(self._multicast_members()),
+            'frame_rate': self.frame_governor.get_stats(),
+            'levels': {stream_id: level.get_stats() for stream_id, level in list(self._levels.items())},
+            'quality': {client_id: c.get_stats() for client_id, c in list(self._controllers.items())},
+        }
     
     def _log_stats(self):
         """Log les statistiques périodiques."""
         if time.time() - self.last_log_time > 10:
+            stats = self.get_stats()
+            stages = stats['stages']
+            logger.info(
+                f"Video streamer stats: backend={stats['capture']['backend']}, "
+                f"captured={stats['frames_captured']}, "
+                f"encoded={stats['frames_encoded']}, frames_sent={stats['frames_sent']}, "
+                f"unchanged={stats['frames_unchanged']}, idle={stats['idle_seconds']}s, "
+                f"clients={stats['clients']} (multicast={stats['multicast_members']}), "
+                f"capture_drops={stages['capture']['drops']}, "
+                f"encode_drops={stages['encode']['drops']}"
+            )
+            fps = stats['frame_rate']
             logger.info(
-                f"Video streamer stats: frames_sent={self.frame_count}, "
-                f"clients={len(self.connected_clients)}"
+                f"Frame rate: target={fps['target_fps']}, current={fps['current_fps']}, "
+                f"achieved={fps['achieved_fps']}, deadline_misses={fps['deadline_misses']}, "
+                f"state={fps['state']}"
             )
+            for client_id, quality in stats['quality'].items():
+                logger.info(
+                    f"Client {client_id}: tier={quality['tier']}, level={quality['level']}, loss={quality['loss']:.1%}, "
+                    f"jitter={quality['jitter_ms']}ms, decode={quality['decode_ms']}ms, fec={quality['fec_ratio']}, "
+                    f"received={quality['received_kbps']}kbps, capacity={quality['capacity_kbps']}kbps"
+                )
+            for client_id, queue in stats['send_queues'].items():
+                if queue['backlog'] or queue['drops'] or queue['errors']:
+                    logger.info(
+                        f"Send queue {client_id}: backlog={queue['backlog']} ({queue['backlog_bytes'] // 1024} KiB), "
+                        f"drops={queue['drops']} ({queue['dropped_bytes'] // 1024} KiB), errors={queue['errors']}"
+                    )
+            retransmit = stats['retransmit']
+            if retransmit['requests']:
+                logger.info(
+                    f"Retransmissions: nacks={retransmit['requests']}, chunks={retransmit['chunks']} "
+                    f"({retransmit['bytes'] // 1024} KiB), deadline_misses={retransmit['deadline_misses']}"
+                )
+            rate = stats['rate_model']
+            if rate['predictions']:
+                logger.info(
+                    f"Rate model: misses={rate['misses']}/{rate['predictions']} "
+                    f"({rate['miss_rate']:.1%}), failures={rate['failures']}, "
+                    f"mean_error={rate['mean_error']:.1%}"
+                )
             self.last_log_time = time.time()
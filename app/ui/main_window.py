@@ -10,6 +10,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, Signal, QTimer
 
 from ..config import app_state
+from ..common.protocol import TIER_FULL, TIER_THUMBNAIL
 from app.client.screen_client import ScreenClient
 from app.client.multi_screen_client import MultiScreenClient
 from ..server import ScreenServer
@@ -236,8 +237,8 @@ class MainWindow(QMainWindow):
         """Ajoute une connexion à un écran distant"""
         screen_id = f"{name}_{ip}"
         
-        # Créer le client
-        client = ScreenClient()
+        # Créer le client (affiché en vignette tant qu'il n'est pas zoomé)
+        client = ScreenClient(tier=TIER_THUMBNAIL)
         
         if client.connect_to_server(ip):
             # Stocker le client
@@ -316,11 +317,15 @@ class MainWindow(QMainWindow):
                     old_client.frame_received.disconnect(old_viewer.update_frame)
                 except:
                     pass
+                old_client.set_tier(TIER_THUMBNAIL)
             # Retirer du layout et supprimer
             self.zoom_layout.removeWidget(old_viewer)
             old_viewer.deleteLater()
             del self.screen_viewers[self.current_zoomed_screen]
         
+        # Passer au flux principal pour la vue zoom
+        client.set_tier(TIER_FULL)
+        
         # Créer le nouveau viewer
         viewer = ScreenViewer(screen_id, client)
         viewer.close_requested.connect(self.close_zoom)
@@ -399,6 +404,8 @@ class MainWindow(QMainWindow):
                     client.frame_received.disconnect(viewer.update_frame)
                 except:
                     pass
+                # Retour à la liste : le flux vignette suffit
+                client.set_tier(TIER_THUMBNAIL)
             # Retirer du layout et supprimer
             self.zoom_layout.removeWidget(viewer)
             viewer.deleteLater()
@@ -172,6 +172,10 @@ class ScreenViewer(QWidget):
         
     def update_frame(self, image: QImage):
         self.current_image = image
+        if self.client:
+            # Fitted view: the client may decode the stream at a reduced scale
+            vp = self._viewport_size() if self.fit_to_window else QSize(0, 0)
+            self.client.set_display_size(vp.width(), vp.height())
         if image and not image.isNull():
             if self.fit_to_window:
                 new_zoom = self._fit_zoom_for_image(image)
@@ -0,0 +1,92 @@
+"""
+Benchmark of the video fan-out to many viewers over loopback.
+Usage:
+    python tools/bench_fanout.py [--viewers 1,8,16,32,64] [--frames N] [--size BYTES] [--streams N]
+
+Sends the same tile messages (--size bytes each, split into datagrams by
+chunk_frame) to N loopback receivers through the server's per-client send
+queues, once with the sendto loop and once with the batched sendmmsg path
+(Linux only). The viewers are spread over --streams distinct datagram lists,
+like clients on different quality levels. All frames are queued up front;
+the time until every queue is drained gives the frames/s the send thread
+sustains against the viewer count, with the system calls per frame.
+Receivers are not read: the kernel discards what overflows their buffers,
+which costs the sender nothing.
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.common.protocol import chunk_frame
+from app.config import MAX_DATAGRAM_SIZE
+from app.server.batch_send import HAS_SENDMMSG
+from app.server.send_queue import ClientSendQueues
+
+
+def run(viewers, frames, messages, batch):
+    receivers = []
+    for _ in range(viewers):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        receivers.append(sock)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+    # Every frame stays queued: the send thread alone sets the pace
+    queues = ClientSendQueues(depth=frames, batch=batch)
+    queues.start(sender)
+
+    started = time.perf_counter()
+    for frame in range(frames):
+        datagrams = messages[frame % len(messages)]
+        for index, receiver in enumerate(receivers):
+            queues.put(f"viewer-{index}", receiver.getsockname(), datagrams[index % len(datagrams)])
+    while any(s['sent'] < frames for s in queues.get_stats().values()):
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - started
+
+    calls = queues.send_calls
+    queues.stop()
+    sender.close()
+    for sock in receivers:
+        sock.close()
+    return elapsed, calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--viewers', default='1,8,16,32,64', help="comma-separated viewer counts")
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--size', type=int, default=40000, help="tile message size in bytes")
+    parser.add_argument('--streams', type=int, default=2, help="distinct datagram lists (quality levels)")
+    args = parser.parse_args()
+
+    # Two alternating messages per stream, as successive frames
+    messages = [
+        [chunk_frame(stream, seq, os.urandom(args.size), MAX_DATAGRAM_SIZE, seq) for stream in range(args.streams)]
+        for seq in range(2)
+    ]
+    per_frame = len(messages[0][0])
+    print(f"{args.frames} frames of {args.size} bytes ({per_frame} datagrams), {args.streams} streams, "
+          f"sendmmsg {'available' if HAS_SENDMMSG else 'unavailable'}")
+
+    modes = [('sendto', False)] + ([('sendmmsg', True)] if HAS_SENDMMSG else [])
+    for viewers in (int(v) for v in args.viewers.split(',')):
+        line, times = [], {}
+        for name, batch in modes:
+            elapsed, calls = run(viewers, args.frames, messages, batch)
+            times[name] = elapsed
+            datagrams = args.frames * viewers * per_frame
+            line.append(f"{name}: {args.frames / elapsed:7.1f} frames/s "
+                        f"{datagrams / elapsed / 1000:6.0f} kdgram/s {calls / args.frames:7.1f} calls/frame")
+        if 'sendmmsg' in times:
+            line.append(f"speedup x{times['sendto'] / times['sendmmsg']:.2f}")
+        print(f"[{viewers:>3} viewers] " + " | ".join(line))
+
+
+if __name__ == '__main__':
+    main()
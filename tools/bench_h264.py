@@ -0,0 +1,104 @@
+"""
+Benchmark of the H.264 stream (PyAV / libx264) against the JPEG tile path.
+Usage:
+    python tools/bench_h264.py [--scene idle|scroll|video|all] [--frames N] [--fps N]
+
+Feeds the same synthetic frames to a JPEG tile StreamLevel (cv2.imencode)
+and to an H.264 StreamLevel (ultrafast / zerolatency), decodes every message
+with the client's FrameCanvas and prints, per path, the bitrate at the given
+frame rate, the CPU time per frame of the encoder and of the decoder, and
+the PSNR of the client canvas against the source frames. CPU only; the
+encoders run on the calling thread.
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from app.client.frame_canvas import FrameCanvas
+from app.config import DEFAULT_WIDTH, JPEG_QUALITY
+from app.server.capture import SyntheticCapture
+from app.server.h264_encoder import HAS_PYAV
+from app.server.monitor_manager import MonitorManager
+from app.server.stream_level import VARIANT_H264, VARIANT_JPEG, StreamLevel
+from app.server.video_streamer import VideoStreamer
+
+
+def psnr(a, b):
+    if a is None or b is None or a.shape != b.shape:
+        return float('nan')
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def run(scene, frames, fps):
+    monitor_manager = MonitorManager()
+    streamer = VideoStreamer(monitor_manager)
+    streamer._encoder_pool = None
+    capture = SyntheticCapture(monitor_manager, scene=scene)
+    capture.open()
+
+    paths = {
+        'jpeg tiles': StreamLevel(0, DEFAULT_WIDTH, JPEG_QUALITY, variant=VARIANT_JPEG),
+        'h264': StreamLevel(0, DEFAULT_WIDTH, JPEG_QUALITY, variant=VARIANT_H264),
+    }
+    results = {name: {'bytes': 0, 'encode': 0.0, 'decode': 0.0, 'psnr': []} for name in paths}
+    canvases = {name: FrameCanvas() for name in paths}
+
+    for index in range(frames):
+        captured = capture.grab()
+        damage = capture.damage()
+        frame = streamer._prepare_frame(captured, DEFAULT_WIDTH)
+        scale = (frame.shape[1] / captured.shape[1], frame.shape[0] / captured.shape[0])
+        now = index / fps
+        for name, level in paths.items():
+            started = time.process_time()
+            if level.h264 is not None:
+                messages, _ = streamer._encode_h264(level, frame, now)
+            else:
+                messages, _ = streamer._encode_tiles(level, frame, damage, scale, now)
+            results[name]['encode'] += time.process_time() - started
+
+            started = time.process_time()
+            for _, message in messages or ():
+                results[name]['bytes'] += len(message)
+                canvases[name].apply(message)
+            results[name]['decode'] += time.process_time() - started
+            canvas = canvases[name].canvas
+            if canvas is not None:
+                results[name]['psnr'].append(psnr(canvas, frame[:canvas.shape[0], :canvas.shape[1]]))
+        capture.release(captured)
+    capture.close()
+
+    for name, result in results.items():
+        seconds = frames / fps
+        quality = np.mean([p for p in result['psnr'] if np.isfinite(p)] or [float('inf')])
+        print(f"[{scene}] {name:10s} {result['bytes'] * 8 / seconds / 1e6:7.2f} Mbit/s "
+              f"encode={result['encode'] * 1000 / frames:6.1f} ms/frame "
+              f"decode={result['decode'] * 1000 / frames:6.1f} ms/frame "
+              f"PSNR={quality:.1f} dB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scene', default='all', choices=['all', 'idle', 'scroll', 'video'])
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--fps', type=float, default=30.0, help="frame rate used to convert bytes to bitrate")
+    args = parser.parse_args()
+
+    if not HAS_PYAV:
+        print("PyAV is not installed (pip install av)")
+        sys.exit(1)
+
+    scenes = ['idle', 'scroll', 'video'] if args.scene == 'all' else [args.scene]
+    for scene in scenes:
+        run(scene, args.frames, args.fps)
+
+
+if __name__ == '__main__':
+    main()
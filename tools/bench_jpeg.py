@@ -0,0 +1,135 @@
+"""
+Benchmark of the JPEG encoder backends and of the client's reduced-scale decoding.
+Usage:
+    python tools/bench_jpeg.py [--scene idle|scroll|video] [--frames N] [--quality Q]
+
+Encodes every tile of each frame (full refresh) through VideoStreamer's tile
+path with each encoder mode: OpenCV and libjpeg-turbo (when the library can
+be loaded), for each chroma subsampling and, for libjpeg-turbo, with and
+without the fast DCT. The synthetic frames are converted to BGRA first, as
+delivered by the X11/mss capture backends, so the timing includes the
+BGRA -> BGR conversion for the encoders that need it. Then decodes the
+messages with the client's FrameCanvas at scale 1/1, 1/2, 1/4 and 1/8.
+Prints ms/frame, bytes/frame and the PSNR against the source frame.
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2
+import numpy as np
+
+from app.client.frame_canvas import FrameCanvas
+from app.client.jpeg_decoder import DECODE_SCALES, JpegDecoder
+from app.config import DEFAULT_WIDTH
+from app.server.capture import SyntheticCapture
+from app.server.jpeg_encoder import SUBSAMPLINGS, OpenCVJpegEncoder, TurboJpegEncoder
+from app.server.monitor_manager import MonitorManager
+from app.server.stream_level import StreamLevel
+from app.server.video_streamer import VideoStreamer
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def encoder_modes():
+    modes = [(f"opencv {s}", OpenCVJpegEncoder(s)) for s in SUBSAMPLINGS]
+    try:
+        for subsampling in SUBSAMPLINGS:
+            for fast_dct in (False, True):
+                name = f"turbojpeg {subsampling}{' fastdct' if fast_dct else ''}"
+                modes.append((name, TurboJpegEncoder(subsampling, fast_dct)))
+    except RuntimeError as e:
+        print(f"turbojpeg modes skipped: {e}")
+    return modes
+
+
+def grab_frames(scene, frames):
+    monitor_manager = MonitorManager()
+    capture = SyntheticCapture(monitor_manager, scene=scene)
+    capture.open()
+    result = []
+    for _ in range(frames):
+        captured = capture.grab()
+        result.append(cv2.cvtColor(captured, cv2.COLOR_BGR2BGRA))
+        capture.release(captured)
+    capture.close()
+    return result
+
+
+def bench_encode(streamer, encoder, captures, quality):
+    streamer._jpeg = encoder
+    level = StreamLevel(0, DEFAULT_WIDTH, quality)
+    messages, elapsed, sources = [], 0.0, []
+    for captured in captures:
+        started = time.perf_counter()
+        frame = streamer._prepare_frame(captured, DEFAULT_WIDTH, encoder.accepts_bgra)
+        level.force_full = True
+        encoded, _ = streamer._encode_tiles(level, frame)
+        elapsed += time.perf_counter() - started
+        messages.append([message for _, message in encoded])
+        sources.append(frame[..., :3].copy())
+    return messages, sources, elapsed
+
+
+def bench_decode(decoder, messages, sources, scale):
+    canvas = FrameCanvas()
+    canvas._jpeg = decoder
+    height, width = sources[0].shape[:2]
+    canvas.set_display_size(width // scale, height // scale)
+    elapsed, quality = 0.0, []
+    for frame_messages, source in zip(messages, sources):
+        started = time.perf_counter()
+        for message in frame_messages:
+            canvas.apply(message)
+        elapsed += time.perf_counter() - started
+        reference = source if scale == 1 else cv2.resize(
+            source, (canvas.canvas.shape[1], canvas.canvas.shape[0]), interpolation=cv2.INTER_AREA
+        )
+        quality.append(psnr(canvas.canvas, reference))
+    return elapsed, np.mean(quality)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scene', default='scroll', choices=['idle', 'scroll', 'video'])
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--quality', type=int, default=90)
+    args = parser.parse_args()
+
+    monitor_manager = MonitorManager()
+    streamer = VideoStreamer(monitor_manager)
+    streamer._encoder_pool = None
+    captures = grab_frames(args.scene, args.frames)
+    print(f"scene={args.scene} frames={args.frames} source={captures[0].shape[1]}x{captures[0].shape[0]} BGRA "
+          f"width={DEFAULT_WIDTH} quality={args.quality}")
+
+    reference = None
+    for name, encoder in encoder_modes():
+        messages, sources, elapsed = bench_encode(streamer, encoder, captures, args.quality)
+        size = sum(len(m) for frame in messages for m in frame) / len(messages)
+        _, quality = bench_decode(JpegDecoder('opencv'), messages, sources, 1)
+        print(f"encode {name:24s} {elapsed * 1000 / len(messages):7.2f} ms/frame "
+              f"{size / 1024:8.1f} KiB/frame PSNR={quality:.1f} dB")
+        if reference is None:
+            reference = (messages, sources)
+
+    messages, sources = reference
+    decoders = [JpegDecoder('opencv')]
+    if JpegDecoder('auto').name == 'turbojpeg':
+        decoders.append(JpegDecoder('turbojpeg'))
+    for decoder in decoders:
+        for scale in DECODE_SCALES:
+            elapsed, quality = bench_decode(decoder, messages, sources, scale)
+            print(f"decode {decoder.name:9s} 1/{scale}  {elapsed * 1000 / len(messages):7.2f} ms/frame "
+                  f"PSNR={quality:.1f} dB (vs. source reduced to 1/{scale})")
+
+
+if __name__ == '__main__':
+    main()
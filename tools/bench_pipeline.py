@@ -0,0 +1,225 @@
+"""
+Benchmark of the video pipeline on a synthetic capture source.
+Usage:
+    python tools/bench_pipeline.py [--scene idle|scroll|video|switch|all] [--seconds N] [--fps N] [--reports]
+                                     [--thumbnails N] [--delta] [--lossless] [--raw]
+
+Runs a VideoStreamer without any screen (SS_CAPTURE_BACKEND=synthetic) and a
+loopback receiver built from the client's FrameAssembler and FrameCanvas, then
+prints frame rates, bytes on the wire, pipeline drops and the PSNR of the
+client canvas against the last frame encoded by the server. With --reports the
+receiver also feeds receiver reports to the server's quality control loop.
+With --thumbnails N, N more receivers subscribe to the thumbnail tier and the
+encoded bytes of each tier are printed (each tier is encoded once). With
+--delta the main receiver negotiates the keyframe + delta codec. With
+--lossless it also negotiates the lossless tiles for text and flat
+areas, and the tile classification counters are printed. With --raw the
+receiver also advertises the raw LZ4/zstd tiles; the switch to the raw
+mode depends on the link rate measured by the receiver, so --raw implies
+--reports. The receiver always keeps a tile cache; its stored and evicted
+tiles are sent back with the reports, so the server only references cached
+tiles with --reports (the switch scene, an Alt-Tab between two windows,
+shows the hit rate).
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from app.common.protocol import (
+    CAP_TILES, CAP_CHUNKS, CAP_DELTA, CAP_LOSSLESS, CAP_RAW_LZ4, CAP_RAW_ZSTD, CAP_TILE_CACHE, CAP_COPY_RECT,
+    TIER_THUMBNAIL, is_chunk,
+)
+from app.client.frame_assembler import FrameAssembler
+from app.client.frame_canvas import FrameCanvas
+from app.client.receiver_stats import ReceiverStats
+from app.server.capture import SyntheticCapture
+from app.server.frame_governor import FrameRateGovernor
+from app.server.monitor_manager import MonitorManager
+from app.server.video_streamer import VideoStreamer
+
+
+class LoopbackReceiver:
+    """UDP receiver reproducing the client's chunk path."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.address = self.sock.getsockname()
+        self.assembler = FrameAssembler()
+        self.canvas = FrameCanvas()
+        self.stats = ReceiverStats()
+        self.on_report = None
+        self.datagrams = 0
+        self.bytes = 0
+        self.frames = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while self.running:
+            try:
+                data, _ = self.sock.recvfrom(65536)
+            except socket.timeout:
+                self._report()
+                continue
+            except OSError:
+                break
+            self.datagrams += 1
+            self.bytes += len(data)
+            if not is_chunk(data):
+                continue
+            self.stats.on_datagram(len(data))
+            self._report()
+            result = self.assembler.push(data)
+            while result is not None:
+                self.stats.on_message(result[0].timestamp)
+                started = time.perf_counter()
+                if self.canvas.apply(result[1]):
+                    self.frames += 1
+                self.stats.on_decode(time.perf_counter() - started)
+                result = self.assembler.pop_ready()
+
+    def _report(self):
+        if self.on_report is not None and self.stats.report_due():
+            report = self.stats.build_report(self.assembler.get_stats())
+            tile_cache = self.canvas.tile_cache.take_report()
+            if tile_cache:
+                report['tile_cache'] = tile_cache
+            self.on_report(report)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=1.0)
+        self.sock.close()
+
+
+def psnr(a, b):
+    if a is None or b is None or a.shape != b.shape:
+        return float('nan')
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def run(scene, seconds, fps, reports, thumbnails=0, delta=False, lossless=False, raw=False):
+    monitor_manager = MonitorManager()
+    streamer = VideoStreamer(monitor_manager)
+    streamer._capture = SyntheticCapture(monitor_manager, scene=scene)
+    streamer.frame_governor = FrameRateGovernor(target_fps=fps)
+    receiver = LoopbackReceiver()
+    receiver.start()
+    streamer.start()
+    caps = [CAP_TILES, CAP_CHUNKS, CAP_TILE_CACHE, CAP_COPY_RECT] + ([CAP_DELTA] if delta else []) + ([CAP_LOSSLESS] if lossless else [])
+    caps += [CAP_RAW_LZ4, CAP_RAW_ZSTD] if raw else []
+    streamer.add_client('bench', receiver.address, caps=caps)
+    if reports:
+        receiver.on_report = lambda report: streamer.on_receiver_report('bench', report)
+    viewers = []
+    for index in range(thumbnails):
+        viewer = LoopbackReceiver()
+        viewer.start()
+        streamer.add_client(f'thumb{index}', viewer.address, caps=[CAP_TILES, CAP_CHUNKS], tier=TIER_THUMBNAIL)
+        viewers.append(viewer)
+
+    # Same loop as ScreenServer._video_loop
+    start = time.monotonic()
+    deadline = start + seconds
+    while time.monotonic() < deadline:
+        streamer.capture_and_send()
+        streamer.frame_governor.wait()
+    # Let the last frame drain through the pipeline
+    time.sleep(0.5)
+    elapsed = time.monotonic() - start
+
+    stats = streamer.get_stats()
+    stream = streamer._client_stream('bench')
+    reference = streamer._levels[stream].differ._previous if stream in streamer._levels else None
+    if reference is not None:
+        reference = reference[..., :3]  # BGRA when the JPEG encoder takes the capture as is
+    quality = psnr(receiver.canvas.canvas, reference)
+    streamer.stop()
+    receiver.stop()
+    for viewer in viewers:
+        viewer.stop()
+
+    stages = stats['stages']
+    print(f"[{scene}] captured={stats['frames_captured']} ({stats['frames_captured'] / elapsed:.1f} fps) "
+          f"encoded={stats['frames_encoded']} sent={stats['frames_sent']} "
+          f"displayed={receiver.frames} unchanged={stats['frames_unchanged']} "
+          f"keepalives={stats['keepalives']} idle={stats['idle_seconds']}s")
+    print(f"[{scene}] wire={receiver.bytes / 1024:.0f} KiB ({receiver.bytes * 8 / elapsed / 1e6:.2f} Mbit/s) "
+          f"datagrams={receiver.datagrams} drops capture={stages['capture']['drops']} "
+          f"encode={stages['encode']['drops']} incomplete={receiver.assembler.frames_incomplete}")
+    rate = stats['frame_rate']
+    print(f"[{scene}] frame rate target={rate['target_fps']} current={rate['current_fps']} "
+          f"achieved={rate['achieved_fps']} deadline_misses={rate['deadline_misses']} state={rate['state']}")
+    if reports:
+        control = stats['quality']['bench']
+        print(f"[{scene}] quality level={control['level']} reports={control['reports']} "
+              f"loss={control['loss']:.1%} jitter={control['jitter_ms']}ms decode={control['decode_ms']}ms")
+        if raw:
+            link = control['link_kbps']
+            print(f"[{scene}] raw mode={control['raw']} switches={control['raw_switches']} "
+                  f"link={'-' if link is None else f'{link / 1000:.0f}'} Mbit/s")
+    print(f"[{scene}] canvas PSNR vs server: {quality:.1f} dB")
+    cache = receiver.canvas.tile_cache.get_stats()
+    print(f"[{scene}] client tile cache entries={cache['entries']} ({cache['bytes'] / 1024:.0f} KiB) "
+          f"hits={cache['hits']} misses={cache['misses']} evictions={cache['evictions']}")
+    for stream_id, level in sorted(stats['levels'].items()):
+        print(f"[{scene}] stream {stream_id}: {level['width']}px q={level['quality']} fps={level['fps'] or 'max'} "
+              f"encoded={level['frames_encoded']} ({level['bytes_encoded'] / 1024:.0f} KiB)")
+        if 'delta' in level:
+            d = level['delta']
+            print(f"[{scene}] stream {stream_id}: keyframes={d['keyframes']} delta tiles={d['delta_tiles']} "
+                  f"({d['delta_bytes'] / 1024:.0f} KiB) jpeg fallbacks={d['fallback_tiles']}")
+        if 'lossless' in level:
+            t = level['lossless']
+            print(f"[{scene}] stream {stream_id}: tiles flat={t['flat_tiles']} text={t['text_tiles']} "
+                  f"image={t['image_tiles']} lossless={t['lossless_bytes'] / 1024:.0f} KiB "
+                  f"jpeg fallbacks={t['fallback_tiles']}")
+        if 'scroll' in level:
+            scroll = level['scroll']
+            print(f"[{scene}] stream {stream_id}: copy-rect exact={scroll['exact_moves']} "
+                  f"approximate={scroll['approximate_moves']} attempts={scroll['attempts']}")
+        if 'cache' in level:
+            c = level['cache']
+            print(f"[{scene}] stream {stream_id}: tile cache lookups={c['lookups']} hits={c['hits']} "
+                  f"hit rate={c['hit_rate']:.1%} animated={c['animated_tiles']}")
+    for index, viewer in enumerate(viewers):
+        shape = viewer.canvas.canvas.shape if viewer.canvas.canvas is not None else None
+        print(f"[{scene}] thumbnail {index}: displayed={viewer.frames} canvas={shape} "
+              f"wire={viewer.bytes / 1024:.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scene', default='all', choices=['all', 'idle', 'scroll', 'video', 'switch'])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--fps', type=float, default=30.0, help="target frame rate of the governor")
+    parser.add_argument('--reports', action='store_true', help="send receiver reports to the quality control loop")
+    parser.add_argument('--thumbnails', type=int, default=0, help="extra receivers on the thumbnail tier")
+    parser.add_argument('--delta', action='store_true', help="negotiate the keyframe + delta codec")
+    parser.add_argument('--lossless', action='store_true', help="negotiate the lossless text tiles")
+    parser.add_argument('--raw', action='store_true', help="advertise the raw LZ4/zstd tiles (implies --reports)")
+    args = parser.parse_args()
+
+    scenes = ['idle', 'scroll', 'video', 'switch'] if args.scene == 'all' else [args.scene]
+    for scene in scenes:
+        run(scene, args.seconds, args.fps, args.reports or args.raw, args.thumbnails, args.delta, args.lossless,
+            args.raw)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+Loopback check of the FEC parity chunks and NACK retransmissions under induced datagram loss.
+Usage:
+    python tools/check_fec_loopback.py [--frames N] [--size BYTES] [--loss RATE] [--burst N]
+                                       [--ratio R] [--min-recovered RATE] [--seed N]
+
+Sends the same messages over a loopback UDP socket five times (no parity,
+XOR parity, Reed-Solomon parity at --ratio, NACKs alone, Reed-Solomon
+parity plus NACKs), dropping datagrams at the sender: each datagram is lost
+with probability --loss, in bursts of --burst datagrams on average (Gilbert
+model, 1 = independent losses). Retransmitted chunks go through the same
+loss model. The receiver is the client's FrameAssembler; its NACKs are
+answered from the server's RetransmitBuffer. For each run the tool prints
+the frames delivered intact, the frames that lost at least one data chunk,
+the share of those rebuilt from parity or retransmissions (recovered-frame
+rate), the parity overhead and the retransmitted share of the data.
+Exits with status 1 when the Reed-Solomon recovered-frame rate is below
+--min-recovered.
+"""
+import os
+import sys
+import time
+import random
+import socket
+import argparse
+import threading
+from queue import Empty, Queue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.client.frame_assembler import FrameAssembler
+from app.common.fec import FEC_RS, FEC_XOR
+from app.common.protocol import chunk_frame, parity_frame
+from app.config import MAX_DATAGRAM_SIZE, NACK_DEADLINE
+from app.server.retransmit import RetransmitBuffer
+
+STREAM_ID = 1
+# Pause between two messages: the loopback socket must not add its own losses
+MESSAGE_INTERVAL = 0.002
+
+
+class GilbertLoss:
+    """Two-state loss model: losses come in bursts of `burst` datagrams on average."""
+
+    def __init__(self, rate, burst, rng):
+        self.rng = rng
+        self.lost = False
+        # P(bad -> good) sets the burst length, P(good -> bad) the average rate
+        self.recover = 1.0 / max(1.0, burst)
+        self.enter = rate * self.recover / max(1e-9, 1.0 - rate)
+
+    def drop(self):
+        self.lost = self.rng.random() < (1.0 - self.recover if self.lost else self.enter)
+        return self.lost
+
+
+class Receiver(threading.Thread):
+    def __init__(self, nack):
+        super().__init__(daemon=True)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.01)
+        self.address = self.sock.getsockname()
+        # Without NACKs, frames are not held back waiting for a retransmission
+        self.assembler = FrameAssembler(timeout=1.0, max_pending=64, nack_deadline=NACK_DEADLINE if nack else 0)
+        # NACK commands for the sender (the command channel of the real client)
+        self.nacks = Queue()
+        self.delivered = {}
+        self.running = True
+
+    def run(self):
+        while self.running:
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                self.assembler.expire()
+            else:
+                completed = self.assembler.push(data)
+                while completed is not None:
+                    header, message = completed
+                    self.delivered[header.seq] = message
+                    completed = self.assembler.pop_ready()
+            frames = self.assembler.take_nacks()
+            if frames:
+                self.nacks.put(frames)
+            completed = self.assembler.pop_ready()
+            while completed is not None:
+                header, message = completed
+                self.delivered[header.seq] = message
+                completed = self.assembler.pop_ready()
+
+    def stop(self):
+        self.running = False
+        self.join()
+        self.sock.close()
+
+
+def answer_nacks(receiver, buffer, sender, model):
+    """Sends back the chunks asked by the receiver's NACKs; returns the datagrams sent."""
+    sent = 0
+    while True:
+        try:
+            frames = receiver.nacks.get_nowait()
+        except Empty:
+            return sent
+        now = time.monotonic()
+        for stream_id, seq, ranges in frames:
+            for datagram in buffer.lookup(stream_id, seq, ranges, now):
+                sent += 1
+                if not model.drop():
+                    sender.sendto(datagram, receiver.address)
+
+
+def run(messages, method, ratio, loss, burst, seed, nack):
+    receiver = Receiver(nack)
+    receiver.start()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    model = GilbertLoss(loss, burst, random.Random(seed))
+    buffer = RetransmitBuffer()
+    hit = set()
+    data_datagrams = parity_datagrams = retransmitted = 0
+    for seq, message in enumerate(messages):
+        datagrams = chunk_frame(STREAM_ID, seq, message, MAX_DATAGRAM_SIZE, seq)
+        data_count = len(datagrams)
+        if nack:
+            buffer.add(STREAM_ID, seq, list(datagrams), time.monotonic())
+        if method is not None:
+            datagrams += parity_frame(STREAM_ID, seq, message, MAX_DATAGRAM_SIZE, seq, ratio, method)
+        data_datagrams += data_count
+        parity_datagrams += len(datagrams) - data_count
+        lost_data = False
+        for index, datagram in enumerate(datagrams):
+            if model.drop():
+                lost_data = lost_data or index < data_count
+                continue
+            sender.sendto(datagram, receiver.address)
+        if lost_data:
+            hit.add(seq)
+        time.sleep(MESSAGE_INTERVAL)
+        retransmitted += answer_nacks(receiver, buffer, sender, model)
+    end = time.monotonic() + 0.3
+    while time.monotonic() < end:
+        retransmitted += answer_nacks(receiver, buffer, sender, model)
+        time.sleep(MESSAGE_INTERVAL)
+    receiver.stop()
+    sender.close()
+
+    intact = sum(receiver.delivered.get(seq) == message for seq, message in enumerate(messages))
+    stats = receiver.assembler.get_stats()
+    return {
+        'intact': intact,
+        'hit': len(hit),
+        # Parity and retransmissions can both repair a frame: count the frames
+        'recovered': sum(receiver.delivered.get(seq) == messages[seq] for seq in hit),
+        'chunks_recovered': stats['chunks_recovered'],
+        'overhead': parity_datagrams / data_datagrams if data_datagrams else 0.0,
+        'retransmitted': retransmitted / data_datagrams if data_datagrams else 0.0,
+        'deadline_misses': buffer.deadline_misses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--size', type=int, default=60000, help="message size in bytes")
+    parser.add_argument('--loss', type=float, default=0.03, help="datagram loss rate")
+    parser.add_argument('--burst', type=float, default=1.0, help="mean loss burst length (datagrams)")
+    parser.add_argument('--ratio', type=float, default=0.2, help="parity datagrams per data datagram")
+    parser.add_argument('--min-recovered', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Sizes around --size: the last chunk of a message is rarely full
+    messages = [rng.randbytes(rng.randint(args.size // 2, args.size)) for _ in range(args.frames)]
+    print(f"{args.frames} messages of up to {args.size} bytes, loss={args.loss:.1%} burst={args.burst:g} "
+          f"ratio={args.ratio:g} datagram={MAX_DATAGRAM_SIZE}")
+
+    results = {}
+    runs = (('none', None, False), ('xor', FEC_XOR, False), ('rs', FEC_RS, False),
+            ('nack', None, True), ('rs+nack', FEC_RS, True))
+    for name, method, nack in runs:
+        r = results[name] = run(messages, method, args.ratio, args.loss, args.burst, args.seed, nack)
+        rate = r['recovered'] / r['hit'] if r['hit'] else 1.0
+        r['rate'] = rate
+        print(f"[{name:>7}] intact={r['intact']}/{args.frames} ({r['intact'] / args.frames:.1%}) "
+              f"hit by loss={r['hit']} recovered={r['recovered']} ({rate:.1%}) "
+              f"chunks rebuilt={r['chunks_recovered']} overhead={r['overhead']:.1%} "
+              f"retransmitted={r['retransmitted']:.1%} deadline misses={r['deadline_misses']}")
+
+    if results['rs']['rate'] < args.min_recovered:
+        print(f"FAIL: Reed-Solomon recovered-frame rate {results['rs']['rate']:.1%} < {args.min_recovered:.1%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
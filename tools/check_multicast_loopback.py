@@ -0,0 +1,192 @@
+"""
+Loopback check of the multicast delivery mode against unicast fan-out.
+Usage:
+    python tools/check_multicast_loopback.py [--viewers N] [--seconds N] [--fps N] [--scene NAME]
+                                             [--group ADDR] [--port N]
+
+Runs a VideoStreamer on a synthetic capture source twice with --viewers
+loopback receivers: once with every viewer on unicast, once with every
+viewer joined to the multicast group (routed through the loopback
+interface, SS_MULTICAST_IF=127.0.0.1). Each receiver is the client's
+FrameAssembler and FrameCanvas reading its unicast socket and, when joined,
+its group socket. In the multicast run the last viewer leaves the group
+halfway through, as the client does when the group stays silent, and must
+keep displaying frames over unicast. The tool prints the frames each viewer
+displayed, the datagrams received per path and the bytes the server sent:
+with multicast they no longer grow with the number of viewers.
+Exits with status 1 when a viewer displayed no frame in a phase.
+"""
+import os
+import sys
+import time
+import socket
+import select
+import argparse
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def configure(args):
+    # Read by app.config at import time
+    os.environ['SS_CAPTURE_BACKEND'] = 'synthetic'
+    os.environ['SS_MULTICAST_GROUP'] = args.group
+    os.environ['SS_MULTICAST_PORT'] = str(args.port)
+    os.environ['SS_MULTICAST_IF'] = '127.0.0.1'
+
+
+class Viewer:
+    """Loopback receiver reproducing the client's unicast + group path."""
+
+    def __init__(self, name):
+        from app.client.frame_assembler import FrameAssembler
+        from app.client.frame_canvas import FrameCanvas
+
+        self.name = name
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        self.sock.bind(('127.0.0.1', 0))
+        self.address = self.sock.getsockname()
+        self.group = None
+        self.assembler = FrameAssembler()
+        self.canvas = FrameCanvas()
+        self.unicast = 0
+        self.multicast = 0
+        self.frames = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def join(self, group, port):
+        from app.common.multicast import open_receiver
+        self.group = open_receiver(group, port, '127.0.0.1', 8 * 1024 * 1024)
+
+    def leave(self):
+        group, self.group = self.group, None
+        if group is not None:
+            group.close()
+
+    def _loop(self):
+        from app.common.protocol import is_chunk, is_parity
+
+        while self.running:
+            group = self.group
+            try:
+                readable, _, _ = select.select([self.sock] + ([group] if group else []), [], [], 0.1)
+            except (OSError, ValueError):
+                continue  # Group left meanwhile
+            for sock in readable:
+                try:
+                    data, _ = sock.recvfrom(65536)
+                except OSError:
+                    continue
+                if sock is self.sock:
+                    self.unicast += 1
+                else:
+                    self.multicast += 1
+                if not (is_chunk(data) or is_parity(data)):
+                    continue
+                result = self.assembler.push(data)
+                while result is not None:
+                    if self.canvas.apply(result[1]):
+                        self.frames += 1
+                    result = self.assembler.pop_ready()
+            self.assembler.expire()
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=1.0)
+        self.leave()
+        self.sock.close()
+
+
+def stream(streamer, seconds):
+    # Same loop as ScreenServer._video_loop
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        streamer.capture_and_send()
+        streamer.frame_governor.wait()
+    time.sleep(0.3)
+
+
+def run(args, multicast):
+    from app.common.protocol import (
+        CAP_TILES, CAP_CHUNKS, CAP_TILE_CACHE, CAP_COPY_RECT, CAP_FEC_XOR, CAP_FEC_RS, CAP_NACK, CAP_MULTICAST,
+    )
+    from app.server.capture import SyntheticCapture
+    from app.server.frame_governor import FrameRateGovernor
+    from app.server.monitor_manager import MonitorManager
+    from app.server.video_streamer import MULTICAST_QUEUE, VideoStreamer
+
+    monitor_manager = MonitorManager()
+    streamer = VideoStreamer(monitor_manager)
+    streamer._capture = SyntheticCapture(monitor_manager, scene=args.scene)
+    streamer.frame_governor = FrameRateGovernor(target_fps=args.fps)
+    streamer.start()
+    caps = [CAP_TILES, CAP_CHUNKS, CAP_TILE_CACHE, CAP_COPY_RECT, CAP_FEC_XOR, CAP_FEC_RS, CAP_NACK, CAP_MULTICAST]
+    info = streamer.multicast_info()
+    viewers = []
+    for index in range(args.viewers):
+        viewer = Viewer(f'viewer{index}')
+        streamer.add_client(viewer.name, viewer.address, caps=caps)
+        if multicast:
+            viewer.join(info['group'], info['port'])
+            streamer.set_client_multicast(viewer.name, True)
+        viewers.append(viewer)
+
+    ok = True
+    phases = [('all joined', None)] if not multicast else [('all joined', None), ('one left', viewers[-1])]
+    for phase, leaving in phases:
+        if leaving is not None:
+            leaving.leave()
+            streamer.set_client_multicast(leaving.name, False)
+        before = {v.name: v.frames for v in viewers}
+        stream(streamer, args.seconds / len(phases))
+        shown = {v.name: v.frames - before[v.name] for v in viewers}
+        if multicast:
+            print(f"  [{phase}] frames per viewer: {shown}")
+        if not all(shown.values()):
+            print(f"  FAIL: a viewer displayed no frame ({phase})")
+            ok = False
+
+    stats = streamer.get_stats()
+    streamer.stop()
+    queues = stats['send_queues']
+    group_bytes = queues.get(MULTICAST_QUEUE, {}).get('sent_bytes', 0)
+    unicast_bytes = sum(q['sent_bytes'] for name, q in queues.items() if name != MULTICAST_QUEUE)
+    for viewer in viewers:
+        viewer.stop()
+        print(f"  {viewer.name}: frames={viewer.frames} unicast datagrams={viewer.unicast} "
+              f"multicast datagrams={viewer.multicast}")
+    total = group_bytes + unicast_bytes
+    print(f"  server sent {total / 1e6:.2f} MB (group {group_bytes / 1e6:.2f} MB, unicast {unicast_bytes / 1e6:.2f} MB), "
+          f"{total / args.seconds / 1e6:.2f} MB/s")
+    return ok, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--viewers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=4.0)
+    parser.add_argument('--fps', type=int, default=20)
+    parser.add_argument('--scene', default='video', help="synthetic capture scene")
+    parser.add_argument('--group', default='239.255.42.99')
+    parser.add_argument('--port', type=int, default=9996)
+    args = parser.parse_args()
+    configure(args)
+
+    print(f"{args.viewers} viewers, {args.seconds:g}s at {args.fps} fps, scene={args.scene}, "
+          f"group={args.group}:{args.port}")
+    print("[unicast]")
+    ok_unicast, unicast = run(args, multicast=False)
+    print("[multicast]")
+    ok_multicast, multicast = run(args, multicast=True)
+    if multicast:
+        print(f"unicast / multicast bytes: x{unicast / multicast:.2f}")
+    if not (ok_unicast and ok_multicast):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
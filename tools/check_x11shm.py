@@ -0,0 +1,108 @@
+"""
+Functional check of the X11 shared memory capture backend.
+Usage (no real screen needed):
+    xvfb-run -s "-screen 0 1280x720x24" python tools/check_x11shm.py
+
+Draws rectangles on the root window with Xlib, then checks that the
+captured frame contains them and that XDamage reported matching rectangles.
+Exits with status 1 on failure.
+"""
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.server.capture import X11ShmCapture, HAS_X11SHM
+from app.server.monitor_manager import MonitorManager
+
+
+class Painter:
+    """Minimal Xlib client filling rectangles on the root window."""
+
+    def __init__(self):
+        x11 = ctypes.CDLL(ctypes.util.find_library('X11'))
+        vp, ul, i = ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int
+        for name, restype, argtypes in (
+            ('XOpenDisplay', vp, [ctypes.c_char_p]),
+            ('XDefaultScreen', i, [vp]),
+            ('XRootWindow', ul, [vp, i]),
+            ('XCreateGC', vp, [vp, ul, ul, vp]),
+            ('XSetForeground', i, [vp, vp, ul]),
+            ('XFillRectangle', i, [vp, ul, vp, i, i, ctypes.c_uint, ctypes.c_uint]),
+            ('XSync', i, [vp, i]),
+            ('XCloseDisplay', i, [vp]),
+        ):
+            func = getattr(x11, name)
+            func.restype, func.argtypes = restype, argtypes
+        self.x11 = x11
+        self.display = x11.XOpenDisplay(None)
+        if not self.display:
+            raise SystemExit("cannot open display (run under xvfb-run)")
+        self.root = x11.XRootWindow(self.display, x11.XDefaultScreen(self.display))
+        self.gc = x11.XCreateGC(self.display, self.root, 0, None)
+
+    def fill(self, x, y, w, h, rgb):
+        self.x11.XSetForeground(self.display, self.gc, rgb)
+        self.x11.XFillRectangle(self.display, self.root, self.gc, x, y, w, h)
+        self.x11.XSync(self.display, 0)
+
+    def close(self):
+        self.x11.XCloseDisplay(self.display)
+
+
+def covers(damage, rect):
+    x, y, w, h = rect
+    return any(dx <= x and dy <= y and dx + dw >= x + w and dy + dh >= y + h
+               for dx, dy, dw, dh in damage)
+
+
+def main():
+    if not HAS_X11SHM or not X11ShmCapture.is_supported():
+        print("X11 shared memory capture not supported on this display")
+        return 1
+
+    monitor_manager = MonitorManager()
+    monitor_manager.selected_monitor = 0
+    capture = X11ShmCapture(monitor_manager)
+    painter = Painter()
+    failures = 0
+
+    painter.fill(0, 0, 4096, 4096, 0x000000)
+    first = capture.grab()
+    print(f"frame {first.shape} format={capture.pixel_format} xdamage={capture.has_damage} "
+          f"damage on first grab={capture.damage()}")
+
+    for rect, rgb in (((100, 50, 200, 120), 0xFF0000), ((640, 400, 33, 17), 0x00FF00)):
+        painter.fill(*rect, rgb)
+        time.sleep(0.05)
+        frame = capture.grab()
+        x, y, w, h = rect
+        pixel = frame[y + h // 2, x + w // 2]
+        expected = (rgb & 0xFF, (rgb >> 8) & 0xFF, (rgb >> 16) & 0xFF)
+        ok = tuple(int(c) for c in pixel[:3]) == expected
+        print(f"rect {rect}: pixel {tuple(pixel[:3])} {'ok' if ok else 'MISMATCH'}")
+        failures += not ok
+        if capture.has_damage:
+            damage = capture.damage()
+            ok = covers(damage, rect)
+            print(f"rect {rect}: damage {damage} {'ok' if ok else 'MISSING'}")
+            failures += not ok
+
+    frame = capture.grab()
+    if capture.has_damage:
+        print(f"idle grab damage: {capture.damage()}")
+        failures += capture.damage() != []
+
+    print(capture.get_stats())
+    capture.close()
+    painter.close()
+    print("FAILED" if failures else "OK")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())